@@ -1,125 +1,227 @@
 from flask import Flask, render_template, request, jsonify
-import joblib
-import numpy as np
-import pandas as pd
-from supabase import create_client
 import os
+import sys
 from dotenv import load_dotenv
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(BASE_DIR))
+from ml_common.batching import MicroBatcher
+from ml_common.cache import PredictionCache, TTLCache, feature_key
+from ml_common.executor import InferencePool
+from ml_common.history import HistoryTable
+from ml_common.introspection import ModelJSON, grouped_importances
+from ml_common.metrics import instrument, stage
+from ml_common.prediction_log import PredictionLogWriter
+from ml_common.registry import ArtifactWatch, registry
+from ml_common.startup import Startup
+from ml_common.storage import open_storage, storage_backend
+from bigmart_scoring import MODEL_FEATURES, encode
+from bigmart_dashboard import DashboardFeed
+
 load_dotenv()
 
 app = Flask(__name__)
 
-# Load model
-model = joblib.load("best_model.pkl")
-
-# Explicit ordered feature list matching training
-MODEL_FEATURES = [
-    "Item_Weight",
-    "Item_Fat_Content",
-    "Item_Visibility",
-    "Item_Type",
-    "Item_MRP",
-    "Outlet_Identifier",
-    "Outlet_Establishment_Year",
-    "Outlet_Size",
-    "Outlet_Location_Type",
-    "Outlet_Type",
-]
+# Model and storage client load after boot (STARTUP_MODE), so the static
+# pages answer while they are still loading
+startup = Startup("bigmart")
+
+
+# Estimator calls run in worker processes when INFERENCE_PROCESSES > 0
+inference_pool = InferencePool.from_env("bigmart")
+
+
+def load_model():
+    with startup.phase("import"):
+        import joblib
+        from ml_common.features import FastModel
+
+    # Load model
+    with startup.phase("unpickle"):
+        model = registry.load("bigmart", os.path.join(BASE_DIR, "best_model.pkl"), joblib.load)
 
-# Supabase client — credentials must be set as environment variables
+    # Rows are scored from NumPy arrays in MODEL_FEATURES order, not DataFrames;
+    # the column list is checked against the booster's feature names here
+    fast_model = inference_pool.attach(FastModel(model, MODEL_FEATURES, "best_model.pkl"))
+    feature_importance_json.get(fast_model)
+    return fast_model
+
+
+# /api/feature-importance body, computed once per loaded model
+CATEGORICALS = [
+    "Item_Fat_Content", "Item_Type", "Outlet_Size",
+    "Outlet_Location_Type", "Outlet_Type", "Outlet_Identifier",
+]
+feature_importance_json = ModelJSON(
+    lambda model: {
+        "success": True,
+        "data": grouped_importances(model, MODEL_FEATURES, CATEGORICALS),
+    }
+)
+
+# Memo of model outputs keyed on the encoded feature row, so repeated
+# simulator positions skip pandas + XGBoost entirely
+prediction_cache = PredictionCache.from_env([os.path.join(BASE_DIR, "best_model.pkl")])
+
+# A retrained best_model.pkl is loaded in the background, checked against
+# MODEL_FEATURES, and swapped in without a restart (MODEL_RELOAD_INTERVAL)
+fast_model = startup.defer(
+    "model",
+    load_model,
+    watch=ArtifactWatch.from_env(["bigmart"]),
+    on_reload=[prediction_cache.clear],
+)
+
+# Storage client — Supabase unless STORAGE_BACKEND=sqlite, in which case
+# predictions go to the embedded database and no credentials are needed
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
 SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
 
-if not SUPABASE_URL or not SUPABASE_KEY:
+if storage_backend() == "supabase" and (not SUPABASE_URL or not SUPABASE_KEY):
     raise RuntimeError(
-        "SUPABASE_URL and SUPABASE_KEY must be set as environment variables. "
+        "SUPABASE_URL and SUPABASE_KEY must be set as environment variables "
+        "(or set STORAGE_BACKEND=sqlite). "
         "Create a .env file locally or set them in your deployment dashboard."
     )
 
-sb = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-# ── Label encoding maps (replicated from training) ──
-ENCODINGS = {
-    "Item_Fat_Content": {
-        "Low Fat": 0,
-        "Regular": 1,
-    },
-    "Item_Type": {
-        "Baking Goods": 0, "Breads": 1, "Breakfast": 2, "Canned": 3,
-        "Dairy": 4, "Frozen Foods": 5, "Fruits and Vegetables": 6,
-        "Hard Drinks": 7, "Health and Hygiene": 8, "Household": 9,
-        "Meat": 10, "Others": 11, "Seafood": 12, "Snack Foods": 13,
-        "Soft Drinks": 14, "Starchy Foods": 15,
-    },
-    "Outlet_Identifier": {
-        "OUT010": 0, "OUT013": 1, "OUT017": 2, "OUT018": 3, "OUT019": 4,
-        "OUT027": 5, "OUT035": 6, "OUT045": 7, "OUT046": 8, "OUT049": 9,
-    },
-    "Outlet_Size": {
-        "High": 0, "Medium": 1, "Small": 2,
-    },
-    "Outlet_Location_Type": {
-        "Tier 1": 0, "Tier 2": 1, "Tier 3": 2,
-    },
-    "Outlet_Type": {
-        "Grocery Store": 0, "Supermarket Type1": 1,
-        "Supermarket Type2": 2, "Supermarket Type3": 3,
-    },
-}
-
-# Normalization guards — catch dirty values before encoding lookup
-NORMALIZERS = {
-    "Item_Fat_Content": {
-        "LF": "Low Fat", "low fat": "Low Fat",
-        "reg": "Regular", "REG": "Regular",
-    },
-    "Outlet_Size": {
-        "high": "High", "medium": "Medium", "small": "Small",
-        "": None,
-    },
-}
-
-
-def normalize(field, value):
-    """Apply normalization map for a field if one exists, else return as-is."""
-    if field in NORMALIZERS:
-        return NORMALIZERS[field].get(value, value)
-    return value
-
-
-def encode(scenario):
-    """Normalize and label-encode all categorical inputs."""
-    def safe_encode(field, raw):
-        val = normalize(field, str(raw).strip() if raw is not None else "")
-        if val is None:
-            raise ValueError(f"Missing value for {field}")
-        if val not in ENCODINGS[field]:
-            raise ValueError(
-                f"Unknown value '{val}' for {field}. "
-                f"Valid options: {list(ENCODINGS[field].keys())}"
-            )
-        return ENCODINGS[field][val]
 
-    return {
-        "Item_Weight":               float(scenario["Item_Weight"]),
-        "Item_Fat_Content":          safe_encode("Item_Fat_Content", scenario.get("Item_Fat_Content")),
-        "Item_Visibility":           float(scenario["Item_Visibility"]),
-        "Item_Type":                 safe_encode("Item_Type", scenario.get("Item_Type")),
-        "Item_MRP":                  float(scenario["Item_MRP"]),
-        "Outlet_Identifier":         safe_encode("Outlet_Identifier", scenario.get("Outlet_Identifier")),
-        "Outlet_Establishment_Year": int(scenario["Outlet_Establishment_Year"]),
-        "Outlet_Size":               safe_encode("Outlet_Size", scenario.get("Outlet_Size")),
-        "Outlet_Location_Type":      safe_encode("Outlet_Location_Type", scenario.get("Outlet_Location_Type")),
-        "Outlet_Type":               safe_encode("Outlet_Type", scenario.get("Outlet_Type")),
-    }
+def load_storage():
+    with startup.phase("client init"):
+        return open_storage(SUPABASE_URL, SUPABASE_KEY)
+
+
+storage = startup.defer("storage", load_storage)
+
+# Predictions are logged from a background thread in bulk inserts
+prediction_log = PredictionLogWriter.from_env(storage, BASE_DIR)
+
+# Keyset-paginated reads of the logged predictions (/api/history)
+prediction_history = HistoryTable(storage, "bigmart_predictions", [
+    "item_weight", "item_fat_content", "item_visibility", "item_type", "item_mrp",
+    "outlet_identifier", "outlet_year", "outlet_size", "outlet_location", "outlet_type",
+    "predicted_sales",
+])
+
+# /api/dashboard aggregates, caught up with newly logged rows at most once
+# per DASHBOARD_CACHE_TTL seconds per worker (a catch-up with nothing new
+# is one small page, so the default is short)
+DASHBOARD_CACHE_TTL = float(os.environ.get("DASHBOARD_CACHE_TTL", 5))
+dashboard_feed = DashboardFeed(prediction_history)
+dashboard_cache = TTLCache(DASHBOARD_CACHE_TTL)
+
+# Upper bound on scenarios accepted by /api/simulate in one call
+SIMULATE_MAX_SCENARIOS = 500
+
+
+def predict_one(row):
+    model = fast_model.get()
+    return float(model.predict(model.vector.fill(row))[0])
+
+
+def predict_rows(rows):
+    model = fast_model.get()
+    return [float(p) for p in model.predict(model.vector.matrix(rows))]
+
+
+# Single-row predictions from concurrent requests share one model call
+# (INFERENCE_BATCH_SIZE rows at most, INFERENCE_BATCH_WAIT_MS window)
+inference_batcher = MicroBatcher.from_env(predict_rows, predict_one)
+
+
+def predict_many(scenarios):
+    """Encode scenarios and predict them with one model call for cache misses."""
+    rows = {}
+    keys = []
+    with stage("encode"):
+        for i, scenario in enumerate(scenarios):
+            try:
+                encoded = encode(scenario)
+            except (ValueError, KeyError, TypeError) as e:
+                if len(scenarios) == 1:
+                    raise
+                raise ValueError(f"Scenario {i}: {e}")
+            key = feature_key(encoded[f] for f in MODEL_FEATURES)
+            rows[key] = encoded
+            keys.append(key)
+
+    model = fast_model.get()
+
+    def compute(missing):
+        if len(missing) == 1:
+            preds = [inference_batcher(rows[missing[0]])]
+        else:
+            preds = model.predict(model.vector.matrix(rows[k] for k in missing))
+        return [round(float(p), 2) for p in preds]
+
+    return prediction_cache.cached_many(keys, compute)
 
 
 def make_prediction(scenario):
     """Encode inputs and run model prediction."""
-    encoded  = encode(scenario)
-    input_df = pd.DataFrame([encoded])[MODEL_FEATURES]
-    return round(float(model.predict(input_df)[0]), 2)
+    return predict_many([scenario])[0]
+
+
+def compare_scenarios(data):
+    """
+    Score named scenarios together and rank them against a baseline.
+
+    Body: {"base": {shared fields}, "scenarios": [{"name": "OUT010",
+    "Outlet_Identifier": "OUT010", ...}, ...], "baseline": "OUT010"}.
+    Each scenario is base updated with its own fields; baseline names one
+    of them (default: the first). The legacy {"a": {...}, "b": {...}} body
+    is read as two scenarios named a and b.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Body must be a JSON object")
+    if "scenarios" not in data and "a" in data and "b" in data:
+        data = {"scenarios": [dict(data["a"], name="a"), dict(data["b"], name="b")]}
+
+    base = data.get("base") or {}
+    scenarios = data.get("scenarios")
+    if not isinstance(base, dict):
+        raise ValueError("'base' must be an object")
+    if not isinstance(scenarios, list) or not scenarios:
+        raise ValueError("'scenarios' must be a non-empty list")
+    if len(scenarios) > SIMULATE_MAX_SCENARIOS:
+        raise ValueError(f"Too many scenarios: {len(scenarios)} (max {SIMULATE_MAX_SCENARIOS})")
+
+    names, merged = [], []
+    for i, scenario in enumerate(scenarios):
+        if not isinstance(scenario, dict):
+            raise ValueError(f"Scenario {i} must be an object")
+        fields = dict(base, **scenario)
+        names.append(str(fields.pop("name", f"Scenario {i + 1}")))
+        merged.append(fields)
+    if len(set(names)) != len(names):
+        raise ValueError("Scenario names must be unique")
+
+    baseline = str(data.get("baseline", names[0]))
+    if baseline not in names:
+        raise ValueError(f"Unknown baseline scenario: {baseline}")
+
+    # One encode pass and one model call for every scenario not cached
+    predictions = predict_many(merged)
+    reference = predictions[names.index(baseline)]
+
+    order = sorted(range(len(names)), key=lambda i: predictions[i], reverse=True)
+    ranks = {i: rank for rank, i in enumerate(order, start=1)}
+    results = []
+    for i, (name, prediction) in enumerate(zip(names, predictions)):
+        delta = round(prediction - reference, 2)
+        results.append({
+            "name": name,
+            "prediction": prediction,
+            "rank": ranks[i],
+            "delta": delta,
+            "delta_pct": round(delta / reference * 100, 1) if reference else None,
+        })
+
+    return {
+        "baseline": baseline,
+        "best": names[order[0]],
+        "ranking": [names[i] for i in order],
+        "results": results,
+    }
 
 
 @app.route("/")
@@ -134,11 +236,7 @@ def predict_page():
 
 @app.route("/dashboard")
 def dashboard():
-    return render_template(
-        "dashboard.html",
-        supabase_url=SUPABASE_URL,
-        supabase_key=SUPABASE_KEY,
-    )
+    return render_template("dashboard.html")
 
 
 @app.route("/simulator")
@@ -159,10 +257,11 @@ def insights():
 @app.route("/api/predict", methods=["POST"])
 def predict():
     try:
-        data       = request.get_json()
+        with stage("parse"):
+            data = request.get_json()
         prediction = make_prediction(data)
 
-        sb.table("bigmart_predictions").insert({
+        prediction_log.submit("bigmart_predictions", {
             "item_weight":      data.get("Item_Weight"),
             "item_fat_content": data.get("Item_Fat_Content"),
             "item_visibility":  data.get("Item_Visibility"),
@@ -174,7 +273,7 @@ def predict():
             "outlet_location":  data.get("Outlet_Location_Type"),
             "outlet_type":      data.get("Outlet_Type"),
             "predicted_sales":  prediction,
-        }).execute()
+        })
 
         return jsonify({"success": True, "prediction": prediction})
 
@@ -184,15 +283,50 @@ def predict():
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+@app.route("/api/simulate", methods=["POST"])
+def simulate_predict():
+    """
+    Simulator predictions — memoized and NOT saved to Supabase, so slider
+    exploration does not pollute the dashboard.
+
+    Body is either one scenario (same fields as /api/predict) or
+    {"scenarios": [...]} for several at once.
+    """
+    try:
+        with stage("parse"):
+            data = request.get_json()
+
+        if isinstance(data, dict) and "scenarios" in data:
+            scenarios = data["scenarios"]
+            if not isinstance(scenarios, list) or not scenarios:
+                raise ValueError("'scenarios' must be a non-empty list")
+            if len(scenarios) > SIMULATE_MAX_SCENARIOS:
+                raise ValueError(
+                    f"Too many scenarios: {len(scenarios)} (max {SIMULATE_MAX_SCENARIOS})"
+                )
+            return jsonify({"success": True, "predictions": predict_many(scenarios)})
+
+        return jsonify({"success": True, "prediction": make_prediction(data)})
+
+    except (ValueError, KeyError, TypeError) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
 @app.route("/api/compare", methods=["POST"])
 def compare_predict():
     try:
-        data   = request.get_json()
-        pred_a = make_prediction(data["a"])
-        pred_b = make_prediction(data["b"])
-        return jsonify({"success": True, "a": pred_a, "b": pred_b})
-
-    except (ValueError, KeyError) as e:
+        with stage("parse"):
+            data = request.get_json()
+        comparison = compare_scenarios(data)
+        if "scenarios" not in data:
+            # Legacy two-way body: keep the "a" / "b" fields of the old response
+            for result in comparison["results"]:
+                comparison[result["name"]] = result["prediction"]
+        return jsonify(dict(comparison, success=True))
+
+    except (ValueError, KeyError, TypeError) as e:
         return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
@@ -201,33 +335,45 @@ def compare_predict():
 @app.route("/api/feature-importance")
 def feature_importance():
     try:
-        importances  = model.feature_importances_
-        categoricals = [
-            "Item_Fat_Content", "Item_Type", "Outlet_Size",
-            "Outlet_Location_Type", "Outlet_Type", "Outlet_Identifier",
-        ]
-        groups = {}
-        for col, score in zip(MODEL_FEATURES, importances):
-            parent = None
-            for cat in categoricals:
-                if col.startswith(cat):
-                    parent = cat.replace("_", " ")
-                    break
-            if parent is None:
-                parent = col.replace("_", " ")
-            groups[parent] = groups.get(parent, 0) + float(score)
-
-        sorted_items = sorted(groups.items(), key=lambda x: x[1], reverse=True)
-        total        = sum(v for _, v in sorted_items)
-        result       = [
-            {"feature": label, "score": round(score, 6), "pct": round(score / total * 100, 1)}
-            for label, score in sorted_items
-        ]
-        return jsonify({"success": True, "data": result})
+        return feature_importance_json.get(fast_model.get()).response(request)
+
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route("/api/dashboard")
+def api_dashboard():
+    """Pre-aggregated dashboard data (see bigmart_dashboard), gzip + ETag."""
+    try:
+        return dashboard_cache.get("dashboard", dashboard_feed.refresh).response(request)
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
 
+
+@app.route("/api/history")
+def api_history():
+    """Logged predictions, newest first; ?limit=, ?cursor= and ?columns= page through them."""
+    try:
+        return jsonify(dict(prediction_history.page_from_args(request.args), success=True))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+# Stage timings, request latency and cache / writer / startup stats at /metrics
+instrument(
+    app,
+    "bigmart",
+    inference_pool=inference_pool.stats,
+    inference_batcher=inference_batcher.stats,
+    dashboard_feed=dashboard_feed.stats,
+    prediction_cache=prediction_cache.stats,
+    prediction_log=prediction_log.stats,
+    startup=startup.stats,
+)
+
+startup.warm()
+
 if __name__ == "__main__":
     app.run(debug=os.environ.get("FLASK_DEBUG", "false").lower() == "true")
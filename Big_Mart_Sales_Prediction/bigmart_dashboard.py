@@ -0,0 +1,227 @@
+"""
+Pre-aggregated data for the Big Mart dashboard, served at /api/dashboard.
+
+The page used to download every row of bigmart_predictions into the
+browser and aggregate it there. The server now folds the rows into
+counts, sums and fixed-width predicted_sales histograms (overall and per
+outlet type, outlet location and item type), the daily prediction count,
+a sample of (item_mrp, predicted_sales) points and the latest rows.
+
+The aggregates live in the worker and are kept up to date incrementally:
+the first refresh scans the table once, later ones read only the rows
+created since DASHBOARD_OVERLAP_SECONDS (default 60) before the newest
+one already folded, and skip the ids they have folded before. The
+overlap is needed because created_at is the inserting transaction's
+start time: with several workers' log writers inserting at once, a row
+can commit after a newer one has already been read. Refreshes run at
+most once per DASHBOARD_CACHE_TTL seconds, and the JSON body is
+serialized and compressed once per change and served with an ETag
+(JSONSnapshot), so an unchanged dashboard is a 304.
+
+The layout is columnar, parallel arrays instead of one object per row:
+
+    {"total": 3, "sales_sum": 6512.4, "sales_max": 3120.0,
+     "histogram": {"bin_width": 500, "start": [1500, 2000, ...], "count": [1, 0, ...]},
+     "outlet_type": {"label": [...], "count": [...], "sales_sum": [...],
+                     "histogram": [[...], ...]},
+     "timeline": {"date": [...], "count": [...]},
+     "scatter": {"item_mrp": [...], "predicted_sales": [...]},
+     "recent": {"outlet_type": [...], ..., "created_at": [...]}}
+"""
+
+import math
+import os
+import re
+import threading
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+from ml_common.history import SCAN_PAGE_SIZE
+from ml_common.introspection import JSONSnapshot
+
+# Columns folded into the aggregates (created_at and id are always fetched)
+COLUMNS = (
+    "outlet_type,outlet_location,item_type,item_fat_content,item_mrp,"
+    "outlet_size,predicted_sales"
+)
+GROUPS = ("outlet_type", "outlet_location", "item_type")
+RECENT_COLUMNS = (
+    "outlet_type", "outlet_location", "item_type", "item_fat_content",
+    "item_mrp", "outlet_size", "predicted_sales", "created_at",
+)
+
+BIN_WIDTH = float(os.environ.get("DASHBOARD_BIN_WIDTH", 500))
+SCATTER_POINTS = int(os.environ.get("DASHBOARD_SCATTER_POINTS", 1000))
+OVERLAP = timedelta(seconds=float(os.environ.get("DASHBOARD_OVERLAP_SECONDS", 60)))
+RECENT_LIMIT = 10
+# Page size of the catch-up reads after the first full scan
+CATCH_UP_PAGE_SIZE = 100
+
+
+def _number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _timestamp(value):
+    """Aware datetime of a created_at string (Postgres or SQLite format)."""
+    text = value.replace(" ", "T").replace("Z", "+00:00")
+    # fromisoformat() before Python 3.11 wants 3 or 6 fraction digits
+    text = re.sub(r"\.(\d+)", lambda m: "." + m.group(1)[:6].ljust(6, "0"), text, count=1)
+    parsed = datetime.fromisoformat(text)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class DashboardAggregates:
+    """Running counts, sums and histograms over the folded rows."""
+
+    def __init__(self):
+        self.total = 0
+        self.sales_sum = 0.0
+        self.sales_max = None
+        self.bins = {}  # bin index -> count
+        self.by_date = {}
+        # group -> label -> [count, sales_sum, {bin index: count}]
+        self.groups = {name: {} for name in GROUPS}
+        self.scatter = deque(maxlen=SCATTER_POINTS)
+        self.recent = deque(maxlen=RECENT_LIMIT)
+
+    def add(self, row):
+        """Fold one row into the counts, sums and histograms."""
+        self.total += 1
+        date = (row.get("created_at") or "")[:10]
+        if date:
+            self.by_date[date] = self.by_date.get(date, 0) + 1
+
+        sales = _number(row.get("predicted_sales"))
+        b = None
+        if sales is not None:
+            self.sales_sum += sales
+            self.sales_max = sales if self.sales_max is None else max(self.sales_max, sales)
+            b = math.floor(sales / BIN_WIDTH)
+            self.bins[b] = self.bins.get(b, 0) + 1
+
+        for name in GROUPS:
+            entry = self.groups[name].setdefault(row.get(name) or "Unknown", [0, 0.0, {}])
+            entry[0] += 1
+            if b is not None:
+                entry[1] += sales
+                entry[2][b] = entry[2].get(b, 0) + 1
+
+    def add_latest(self, rows):
+        """Append rows, oldest first, to the recent-rows and scatter samples."""
+        for row in rows:
+            self.recent.append({c: row.get(c) for c in RECENT_COLUMNS})
+            mrp = _number(row.get("item_mrp"))
+            sales = _number(row.get("predicted_sales"))
+            if mrp is not None and sales is not None:
+                self.scatter.append((mrp, sales))
+
+    def payload(self):
+        first, last = (min(self.bins), max(self.bins)) if self.bins else (0, -1)
+        indices = range(first, last + 1)
+
+        def histogram(counts):
+            return [counts.get(b, 0) for b in indices]
+
+        def group(entries):
+            # Largest groups first
+            ranked = sorted(entries.items(), key=lambda item: (-item[1][0], item[0]))
+            return {
+                "label": [label for label, _ in ranked],
+                "count": [e[0] for _, e in ranked],
+                "sales_sum": [round(e[1], 2) for _, e in ranked],
+                "histogram": [histogram(e[2]) for _, e in ranked],
+            }
+
+        dates = sorted(self.by_date)
+        # Newest first; a late-committed row may have been appended after newer ones
+        recent = sorted(self.recent, key=lambda r: r["created_at"] or "", reverse=True)
+        payload = {
+            "success": True,
+            "total": self.total,
+            "sales_sum": round(self.sales_sum, 2),
+            "sales_max": self.sales_max,
+            "histogram": {
+                "bin_width": BIN_WIDTH,
+                "start": [b * BIN_WIDTH for b in indices],
+                "count": histogram(self.bins),
+            },
+            "timeline": {"date": dates, "count": [self.by_date[d] for d in dates]},
+            "scatter": {
+                "item_mrp": [p[0] for p in self.scatter],
+                "predicted_sales": [p[1] for p in self.scatter],
+            },
+            "recent": {c: [r[c] for r in recent] for c in RECENT_COLUMNS},
+        }
+        for name, entries in self.groups.items():
+            payload[name] = group(entries)
+        return payload
+
+
+class DashboardFeed:
+    """Incrementally refreshed DashboardAggregates of one history table."""
+
+    def __init__(self, history):
+        self.history = history
+        self.aggregates = DashboardAggregates()
+        self.head = None  # created_at of the newest folded row
+        self.seen = {}  # id -> created_at of folded rows inside the overlap
+        self.snapshot = None
+        self._lock = threading.Lock()
+        self.refreshes = 0
+        self.rows_read = 0
+
+    def refresh(self):
+        """Fold the rows logged since the last refresh; JSONSnapshot of the result."""
+        with self._lock:
+            try:
+                self._catch_up()
+            except Exception:
+                # A partial fold cannot be resumed; the next refresh starts over
+                self.aggregates = DashboardAggregates()
+                self.head = None
+                self.seen = {}
+                self.snapshot = None
+                raise
+            if self.snapshot is None:
+                self.snapshot = JSONSnapshot(self.aggregates.payload())
+            return self.snapshot
+
+    def _catch_up(self):
+        page_size = SCAN_PAGE_SIZE if self.head is None else CATCH_UP_PAGE_SIZE
+        stop = None if self.head is None else self.head - OVERLAP
+        head = self.head
+        latest = []  # newest first, as many as the samples keep
+        for row in self.history.scan(COLUMNS, page_size=page_size):
+            created = _timestamp(row["created_at"])
+            if stop is not None and created < stop:
+                break
+            # Rows come newest first, so the first one sets the new head
+            head = created if head is None else max(head, created)
+            if row["id"] in self.seen:
+                continue
+            self.aggregates.add(row)
+            self.rows_read += 1
+            if created >= head - OVERLAP:
+                self.seen[row["id"]] = created
+            if len(latest) < max(SCATTER_POINTS, RECENT_LIMIT):
+                latest.append(row)
+        self.refreshes += 1
+
+        self.head = head
+        if head is not None:
+            self.seen = {i: t for i, t in self.seen.items() if t >= head - OVERLAP}
+        if latest:
+            self.aggregates.add_latest(reversed(latest))
+            self.snapshot = None
+
+    def stats(self):
+        return {
+            "rows": self.aggregates.total,
+            "refreshes": self.refreshes,
+            "rows_read": self.rows_read,
+        }
@@ -0,0 +1,126 @@
+"""
+Big Mart model inputs and label encodings (replicated from training),
+shared by app.py and the bulk CSV scorer
+(python -m ml_common.scoring bigmart ...).
+"""
+
+# Explicit ordered feature list matching training
+MODEL_FEATURES = [
+    "Item_Weight",
+    "Item_Fat_Content",
+    "Item_Visibility",
+    "Item_Type",
+    "Item_MRP",
+    "Outlet_Identifier",
+    "Outlet_Establishment_Year",
+    "Outlet_Size",
+    "Outlet_Location_Type",
+    "Outlet_Type",
+]
+
+
+# ── Label encoding maps (replicated from training) ──
+ENCODINGS = {
+    "Item_Fat_Content": {
+        "Low Fat": 0,
+        "Regular": 1,
+    },
+    "Item_Type": {
+        "Baking Goods": 0, "Breads": 1, "Breakfast": 2, "Canned": 3,
+        "Dairy": 4, "Frozen Foods": 5, "Fruits and Vegetables": 6,
+        "Hard Drinks": 7, "Health and Hygiene": 8, "Household": 9,
+        "Meat": 10, "Others": 11, "Seafood": 12, "Snack Foods": 13,
+        "Soft Drinks": 14, "Starchy Foods": 15,
+    },
+    "Outlet_Identifier": {
+        "OUT010": 0, "OUT013": 1, "OUT017": 2, "OUT018": 3, "OUT019": 4,
+        "OUT027": 5, "OUT035": 6, "OUT045": 7, "OUT046": 8, "OUT049": 9,
+    },
+    "Outlet_Size": {
+        "High": 0, "Medium": 1, "Small": 2,
+    },
+    "Outlet_Location_Type": {
+        "Tier 1": 0, "Tier 2": 1, "Tier 3": 2,
+    },
+    "Outlet_Type": {
+        "Grocery Store": 0, "Supermarket Type1": 1,
+        "Supermarket Type2": 2, "Supermarket Type3": 3,
+    },
+}
+
+# Normalization guards — catch dirty values before encoding lookup
+NORMALIZERS = {
+    "Item_Fat_Content": {
+        "LF": "Low Fat", "low fat": "Low Fat",
+        "reg": "Regular", "REG": "Regular",
+    },
+    "Outlet_Size": {
+        "high": "High", "medium": "Medium", "small": "Small",
+        "": None,
+    },
+}
+
+
+def normalize(field, value):
+    """Apply normalization map for a field if one exists, else return as-is."""
+    if field in NORMALIZERS:
+        return NORMALIZERS[field].get(value, value)
+    return value
+
+
+def encode(scenario):
+    """Normalize and label-encode all categorical inputs."""
+    def safe_encode(field, raw):
+        val = normalize(field, str(raw).strip() if raw is not None else "")
+        if val is None:
+            raise ValueError(f"Missing value for {field}")
+        if val not in ENCODINGS[field]:
+            raise ValueError(
+                f"Unknown value '{val}' for {field}. "
+                f"Valid options: {list(ENCODINGS[field].keys())}"
+            )
+        return ENCODINGS[field][val]
+
+    return {
+        "Item_Weight":               float(scenario["Item_Weight"]),
+        "Item_Fat_Content":          safe_encode("Item_Fat_Content", scenario.get("Item_Fat_Content")),
+        "Item_Visibility":           float(scenario["Item_Visibility"]),
+        "Item_Type":                 safe_encode("Item_Type", scenario.get("Item_Type")),
+        "Item_MRP":                  float(scenario["Item_MRP"]),
+        "Outlet_Identifier":         safe_encode("Outlet_Identifier", scenario.get("Outlet_Identifier")),
+        "Outlet_Establishment_Year": int(scenario["Outlet_Establishment_Year"]),
+        "Outlet_Size":               safe_encode("Outlet_Size", scenario.get("Outlet_Size")),
+        "Outlet_Location_Type":      safe_encode("Outlet_Location_Type", scenario.get("Outlet_Location_Type")),
+        "Outlet_Type":               safe_encode("Outlet_Type", scenario.get("Outlet_Type")),
+    }
+
+
+def encode_frame(frame):
+    """
+    (float feature frame in MODEL_FEATURES order, per-row error messages)
+    for Train.csv-shaped rows. Values encode() would reject (missing,
+    unknown or non-numeric) become row errors instead of exceptions.
+    """
+    import pandas as pd
+
+    missing = [f for f in MODEL_FEATURES if f not in frame.columns]
+    if missing:
+        raise ValueError(f"Input is missing column(s): {', '.join(missing)}")
+
+    X = pd.DataFrame(index=frame.index)
+    errors = pd.Series("", index=frame.index)
+    for field in MODEL_FEATURES:
+        raw = frame[field].fillna("").astype(str).str.strip()
+        if field in ENCODINGS:
+            values = raw.map(lambda v: normalize(field, v))
+            codes = values.map(ENCODINGS[field])
+            unset = values.isna() | (values == "")
+            errors[unset & (errors == "")] = f"Missing value for {field}"
+            errors[codes.isna() & ~unset & (errors == "")] = (
+                "Unknown value '" + values[codes.isna() & ~unset] + f"' for {field}"
+            )
+            X[field] = codes
+        else:
+            X[field] = pd.to_numeric(raw, errors="coerce")
+            errors[X[field].isna() & (errors == "")] = f"Invalid numeric value for {field}"
+    return X.astype("float64"), errors
@@ -5,6 +5,8 @@
   FLOW:
   1. User fills shared item fields + two outlet columns
   2. Clicks Compare → both scenarios sent to /api/compare in one request
+     (shared fields as "base", outlets as named "scenarios", scored in one
+     model call; the API takes any number of scenarios and ranks them)
   3. Results revealed: scores, bar chart, % diff, input diff table, recommendation
 
   SHARED vs SCENARIO FIELDS:
@@ -92,19 +94,26 @@ async function runCompare() {
   btn.textContent = "Comparing...";
 
   try {
-    const res = await fetch("/api/compare", {
+    const res = await fetch((window.SCRIPT_ROOT || "") + "/api/compare", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({
-        a: { ...shared, ...scenA },
-        b: { ...shared, ...scenB },
+        base: shared,
+        scenarios: [
+          { name: "a", ...scenA },
+          { name: "b", ...scenB },
+        ],
+        baseline: "a",
       }),
     });
 
     const data = await res.json();
     if (!data.success) throw new Error(data.error);
 
-    renderResults(data.a, data.b, shared, scenA, scenB);
+    const byName = Object.fromEntries(
+      data.results.map((r) => [r.name, r.prediction]),
+    );
+    renderResults(byName.a, byName.b, shared, scenA, scenB);
   } catch (err) {
     errorEl.textContent = "Error: " + err.message;
     errorEl.classList.remove("hidden");
@@ -1,9 +1,6 @@
-// Credentials injected by Flask via dashboard.html
-const SUPABASE_URL      = window.SUPABASE_URL;
-const SUPABASE_ANON_KEY = window.SUPABASE_ANON_KEY;
-
-const { createClient } = supabase;
-const sb = createClient(SUPABASE_URL, SUPABASE_ANON_KEY);
+// Aggregates are computed server-side; /api/dashboard returns them in a
+// columnar layout (parallel arrays per group), gzip-compressed with an ETag
+const DASHBOARD_URL = (window.SCRIPT_ROOT || '') + '/api/dashboard';
 
 Chart.defaults.color       = '#6b6b7e';
 Chart.defaults.font.family = 'Inter, sans-serif';
@@ -15,31 +12,25 @@ const GREEN   = '#34d399';
 const PALETTE = ['#6366f1', '#34d399', '#f59e0b', '#ec4899', '#22d3ee', '#a78bfa'];
 
 const fmt     = v => '\u20B9' + Number(v).toLocaleString('en-IN', { maximumFractionDigits: 0 });
-const groupBy = (arr, key) =>
-  arr.reduce((acc, r) => { const k = r[key] || 'Unknown'; (acc[k] = acc[k] || []).push(r); return acc; }, {});
-const avgOf   = (arr, key) =>
-  arr.reduce((s, r) => s + (parseFloat(r[key]) || 0), 0) / arr.length;
 
 async function loadData() {
   try {
-    const { data, error } = await sb
-      .from('bigmart_predictions')
-      .select('*')
-      .order('created_at', { ascending: false });
+    const res  = await fetch(DASHBOARD_URL);
+    const data = await res.json();
 
-    if (error) throw error;
-    if (!data || data.length === 0) { showEmpty(); return; }
+    if (!data.success) throw new Error(data.error || 'Request failed');
+    if (data.total === 0) { showEmpty(); return; }
 
     renderKPIs(data);
-    renderTimeline(data);
-    renderOutletType(data);
-    renderHistogram(data);
-    renderLocation(data);
-    renderScatter(data);
-    renderTable(data.slice(0, 10));
+    renderTimeline(data.timeline);
+    renderOutletType(data.outlet_type);
+    renderHistogram(data.histogram, data.outlet_type);
+    renderLocation(data.outlet_location);
+    renderScatter(data.scatter);
+    renderTable(data.recent);
   } catch (err) {
     document.getElementById('tableWrap').innerHTML =
-      `<div class="state-box"><strong>Could not connect to Supabase</strong>${err.message}<br><br>Ensure SUPABASE_URL and SUPABASE_KEY are set as environment variables.</div>`;
+      `<div class="state-box"><strong>Could not load the dashboard</strong>${err.message}<br><br>Check that the prediction storage is reachable (SUPABASE_URL / SUPABASE_KEY or STORAGE_BACKEND=sqlite).</div>`;
   }
 }
 
@@ -50,13 +41,12 @@ function showEmpty() {
 
 /* ── KPIs ── */
 function renderKPIs(data) {
-  const sales       = data.map(r => parseFloat(r.predicted_sales) || 0);
-  const avg         = sales.reduce((a, b) => a + b, 0) / sales.length;
-  const max         = Math.max(...sales);
+  const avg         = data.sales_sum / data.total;
+  const max         = data.sales_max || 0;
   const DATASET_AVG = 2181;
   const diff        = ((avg - DATASET_AVG) / DATASET_AVG * 100).toFixed(1);
 
-  document.getElementById('kpiTotal').textContent    = data.length.toLocaleString();
+  document.getElementById('kpiTotal').textContent    = data.total.toLocaleString();
   document.getElementById('kpiTotalSub').textContent = 'all time';
 
   document.getElementById('kpiAvg').textContent = fmt(avg);
@@ -67,30 +57,23 @@ function renderKPIs(data) {
   document.getElementById('kpiMax').textContent    = fmt(max);
   document.getElementById('kpiMaxSub').textContent = 'single prediction';
 
-  const byOutlet  = groupBy(data, 'outlet_type');
-  const topOutlet = Object.entries(byOutlet).sort((a, b) => b[1].length - a[1].length)[0];
-  if (topOutlet) {
-    document.getElementById('kpiOutlet').textContent    = topOutlet[0];
+  // Groups arrive largest first
+  const outlets = data.outlet_type;
+  if (outlets.label.length) {
+    document.getElementById('kpiOutlet').textContent    = outlets.label[0];
     document.getElementById('kpiOutletSub').textContent =
-      topOutlet[1].length + ' of ' + data.length + ' predictions';
+      outlets.count[0] + ' of ' + data.total + ' predictions';
   }
 }
 
 /* ── Timeline ── */
-function renderTimeline(data) {
-  const byDate = {};
-  data.forEach(r => {
-    const d = (r.created_at || '').slice(0, 10);
-    if (d) byDate[d] = (byDate[d] || 0) + 1;
-  });
-  const sorted = Object.entries(byDate).sort((a, b) => a[0].localeCompare(b[0]));
-
+function renderTimeline(timeline) {
   new Chart(document.getElementById('chartTimeline'), {
     type: 'line',
     data: {
-      labels: sorted.map(([d]) => d),
+      labels: timeline.date,
       datasets: [{
-        data: sorted.map(([, c]) => c),
+        data: timeline.count,
         borderColor: ACCENT,
         backgroundColor: 'rgba(99,102,241,0.08)',
         borderWidth: 2,
@@ -112,10 +95,9 @@ function renderTimeline(data) {
 }
 
 /* ── Outlet Type bar ── */
-function renderOutletType(data) {
-  const groups = groupBy(data, 'outlet_type');
-  const labels = Object.keys(groups);
-  const avgs   = labels.map(k => avgOf(groups[k], 'predicted_sales'));
+function renderOutletType(outlets) {
+  const labels = outlets.label;
+  const avgs   = labels.map((_, i) => outlets.count[i] ? outlets.sales_sum[i] / outlets.count[i] : 0);
 
   new Chart(document.getElementById('chartOutletType'), {
     type: 'bar',
@@ -143,50 +125,43 @@ function renderOutletType(data) {
 }
 
 /* ── Histogram ── */
-function renderHistogram(data) {
-  const vals    = data.map(r => parseFloat(r.predicted_sales) || 0).filter(Boolean);
-  const min     = Math.min(...vals);
-  const max     = Math.max(...vals);
-  const BIN_N   = 10;
-  const binSize = (max - min) / BIN_N;
-  const bins    = Array(BIN_N).fill(0);
-  const labels  = Array.from({ length: BIN_N }, (_, i) =>
-    '\u20B9' + Math.round((min + i * binSize) / 1000) + 'k');
-
-  vals.forEach(v => {
-    const idx = Math.min(Math.floor((v - min) / binSize), BIN_N - 1);
-    bins[idx]++;
-  });
+function renderHistogram(histogram, outlets) {
+  // Fixed-width bins from the server, stacked by outlet type
+  const labels = histogram.start.map(v => '\u20B9' + (v / 1000).toFixed(1) + 'k');
 
   new Chart(document.getElementById('chartHistogram'), {
     type: 'bar',
     data: {
       labels,
-      datasets: [{
-        data: bins,
-        backgroundColor: 'rgba(99,102,241,0.55)',
-        borderColor: ACCENT,
-        borderWidth: 1,
+      datasets: outlets.label.map((label, i) => ({
+        label,
+        data: outlets.histogram[i],
+        backgroundColor: PALETTE[i % PALETTE.length],
+        borderWidth: 0,
         borderRadius: 3,
         borderSkipped: false,
-      }]
+      }))
     },
     options: {
       responsive: true, maintainAspectRatio: false,
-      plugins: { legend: { display: false } },
+      plugins: {
+        legend: {
+          position: 'bottom',
+          labels: { padding: 10, usePointStyle: true, pointStyleWidth: 8, font: { size: 10 } }
+        }
+      },
       scales: {
-        x: { grid: { display: false } },
-        y: { grid: { color: 'rgba(255,255,255,0.04)' }, beginAtZero: true, ticks: { precision: 0 } }
+        x: { stacked: true, grid: { display: false } },
+        y: { stacked: true, grid: { color: 'rgba(255,255,255,0.04)' }, beginAtZero: true, ticks: { precision: 0 } }
       }
     }
   });
 }
 
 /* ── Location doughnut ── */
-function renderLocation(data) {
-  const groups = groupBy(data, 'outlet_location');
-  const labels = Object.keys(groups);
-  const counts = labels.map(k => groups[k].length);
+function renderLocation(locations) {
+  const labels = locations.label;
+  const counts = locations.count;
 
   new Chart(document.getElementById('chartLocation'), {
     type: 'doughnut',
@@ -213,10 +188,8 @@ function renderLocation(data) {
 }
 
 /* ── MRP vs Sales scatter ── */
-function renderScatter(data) {
-  const points = data
-    .filter(r => r.item_mrp && r.predicted_sales)
-    .map(r => ({ x: parseFloat(r.item_mrp), y: parseFloat(r.predicted_sales) }));
+function renderScatter(scatter) {
+  const points = scatter.item_mrp.map((x, i) => ({ x, y: scatter.predicted_sales[i] }));
 
   new Chart(document.getElementById('chartScatter'), {
     type: 'scatter',
@@ -249,7 +222,11 @@ function renderScatter(data) {
 }
 
 /* ── Recent predictions table ── */
-function renderTable(rows) {
+function renderTable(recent) {
+  // Columnar -> one object per row
+  const rows = recent.created_at.map((_, i) =>
+    Object.fromEntries(Object.keys(recent).map(c => [c, recent[c][i]])));
+
   const thead = `<thead><tr>
     <th>#</th>
     <th>Outlet Type</th>
@@ -50,7 +50,7 @@ const TAKEAWAYS = {
 
 async function loadInsights() {
   try {
-    const res = await fetch("/api/feature-importance");
+    const res = await fetch((window.SCRIPT_ROOT || "") + "/api/feature-importance");
     const json = await res.json();
 
     if (!json.success) throw new Error(json.error);
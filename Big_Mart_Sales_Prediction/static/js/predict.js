@@ -48,7 +48,7 @@ async function submitPrediction() {
   resultBox.classList.remove("has-result");
 
   try {
-    const response = await fetch("/api/predict", {
+    const response = await fetch((window.SCRIPT_ROOT || "") + "/api/predict", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify(fields),
@@ -87,7 +87,7 @@ async function runPrediction() {
   resultMain.classList.add("updating");
 
   try {
-    const res = await fetch("/api/predict", {
+    const res = await fetch((window.SCRIPT_ROOT || "") + "/api/simulate", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify(inputs),
@@ -1,52 +1,305 @@
 from flask import Flask, request, jsonify, render_template
-import pickle
-import pandas as pd
-from supabase import create_client
+import csv
+import io
+import json
 import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml_common.batching import MicroBatcher
+from ml_common.cache import PredictionCache, TTLCache, feature_key
+from ml_common.executor import InferencePool
+from ml_common.history import HistoryTable
+from ml_common.inference import BinaryClassifier
+from ml_common.metrics import instrument, stage
+from ml_common.prediction_log import PredictionLogWriter
+from ml_common.registry import ArtifactWatch, load_pickle, registry
+from ml_common.startup import Startup
+from ml_common.storage import open_storage
+from churn_scoring import churn_label, feature_names, numeric_features, risk_level
 
 app = Flask(__name__)
 
+# Model, encoders and storage client load after boot (STARTUP_MODE), so
+# the landing page answers while they are still loading
+startup = Startup("churn")
+
 # -------------------------------
 # Load Model + Encoders
 # -------------------------------
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-model_data = pickle.load(open(os.path.join(BASE_DIR, "customer_churn_model.pkl"), "rb"))
-
-model = model_data["model"]
-feature_names = [
-    "gender",
-    "SeniorCitizen",
-    "Partner",
-    "Dependents",
-    "tenure",
-    "PhoneService",
-    "MultipleLines",
-    "InternetService",
-    "OnlineSecurity",
-    "OnlineBackup",
-    "DeviceProtection",
-    "TechSupport",
-    "StreamingTV",
-    "StreamingMovies",
-    "Contract",
-    "PaperlessBilling",
-    "PaymentMethod",
-    "MonthlyCharges",
-    "TotalCharges",
-]
-encoders = pickle.load(open(os.path.join(BASE_DIR, "encoders.pkl"), "rb"))
+# Estimator calls run in worker processes when INFERENCE_PROCESSES > 0
+inference_pool = InferencePool.from_env("churn")
+
+
+def load_model():
+    with startup.phase("import"):
+        from ml_common.features import FastModel
+
+    with startup.phase("unpickle"):
+        model_data = registry.load(
+            "churn", os.path.join(BASE_DIR, "customer_churn_model.pkl"), load_pickle
+        )
+
+    # Single rows are scored from a reusable NumPy buffer instead of a DataFrame
+    fast_model = inference_pool.attach(
+        FastModel(model_data["model"], feature_names, "customer_churn_model.pkl")
+    )
+
+    # Decision threshold on the churn probability (CHURN_THRESHOLD, default 0.5)
+    return BinaryClassifier.from_env(fast_model, "CHURN_THRESHOLD")
+
+
+def load_encoder():
+    with startup.phase("import"):
+        from category_encoding import CategoryEncoder
+
+    with startup.phase("unpickle"):
+        encoders = registry.load(
+            "churn_encoders", os.path.join(BASE_DIR, "encoders.pkl"), load_pickle
+        )
+    return CategoryEncoder(encoders)
+
+
+# Memo of churn probabilities keyed on the encoded feature row
+prediction_cache = PredictionCache.from_env(
+    [
+        os.path.join(BASE_DIR, "customer_churn_model.pkl"),
+        os.path.join(BASE_DIR, "encoders.pkl"),
+    ]
+)
+
+# A retrained model or encoders.pkl is loaded in the background, checked,
+# and swapped in without a restart (MODEL_RELOAD_INTERVAL)
+classifier = startup.defer(
+    "model",
+    load_model,
+    watch=ArtifactWatch.from_env(["churn"]),
+    on_reload=[prediction_cache.clear],
+)
+category_encoder = startup.defer(
+    "encoders",
+    load_encoder,
+    watch=ArtifactWatch.from_env(["churn_encoders"]),
+    on_reload=[prediction_cache.clear],
+)
+
+
+def churn_probability(encoded):
+    model = classifier.get()
+    return float(model.probabilities(model.model.vector.fill(encoded))[0])
+
+
+def churn_probabilities(rows):
+    model = classifier.get()
+    return [float(p) for p in model.probabilities(model.model.vector.matrix(rows))]
+
+
+# Single-row predictions from concurrent requests share one model call
+# (INFERENCE_BATCH_SIZE rows at most, INFERENCE_BATCH_WAIT_MS window)
+inference_batcher = MicroBatcher.from_env(churn_probabilities, churn_probability)
+
+# Upper bound on rows accepted by /predict/batch in a single call
+BATCH_MAX_ROWS = int(os.environ.get("BATCH_MAX_ROWS", 20000))
 
 # -------------------------------
-# Supabase Client
+# Storage Client (Supabase or SQLite, STORAGE_BACKEND)
 # -------------------------------
 
-supabase = create_client(
-    os.environ.get("SUPABASE_URL"),
-    os.environ.get("SUPABASE_KEY"),
+
+def load_storage():
+    with startup.phase("client init"):
+        return open_storage(
+            os.environ.get("SUPABASE_URL"),
+            os.environ.get("SUPABASE_KEY"),
+        )
+
+
+storage = startup.defer("storage", load_storage)
+
+# Predictions are logged from a background thread in bulk inserts
+prediction_log = PredictionLogWriter.from_env(storage, BASE_DIR)
+
+# Columns shown on the /history page
+HISTORY_PAGE_COLUMNS = "churn_probability,prediction,risk_level,created_at"
+
+# -------------------------------
+# Helpers
+# -------------------------------
+
+
+def classify(prob):
+    """Turn a churn probability into (label, percent, risk level)."""
+    prob_percent = round(float(prob) * 100, 2)
+    return churn_label(classifier.is_positive(prob)), prob_percent, risk_level(prob_percent)
+
+
+def integer_value(value):
+    """
+    A whole number for an integer column. Requests (and validated batch rows)
+    carry 1.0 or "12", which PostgREST rejects for integer columns.
+    """
+    if value is None or str(value).strip() == "":
+        return None
+    return int(round(float(value)))
+
+
+def prediction_record(data, label, prob_percent, risk):
+    """Row written to the churn_predictions table."""
+    return {
+        "gender":             data.get("gender"),
+        "senior_citizen":     integer_value(data.get("SeniorCitizen")),
+        "partner":            data.get("Partner"),
+        "dependents":         data.get("Dependents"),
+        "tenure":             integer_value(data.get("tenure")),
+        "phone_service":      data.get("PhoneService"),
+        "multiple_lines":     data.get("MultipleLines"),
+        "internet_service":   data.get("InternetService"),
+        "online_security":    data.get("OnlineSecurity"),
+        "online_backup":      data.get("OnlineBackup"),
+        "device_protection":  data.get("DeviceProtection"),
+        "tech_support":       data.get("TechSupport"),
+        "streaming_tv":       data.get("StreamingTV"),
+        "streaming_movies":   data.get("StreamingMovies"),
+        "contract":           data.get("Contract"),
+        "paperless_billing":  data.get("PaperlessBilling"),
+        "payment_method":     data.get("PaymentMethod"),
+        "monthly_charges":    data.get("MonthlyCharges"),
+        "total_charges":      data.get("TotalCharges"),
+        "churn_probability":  prob_percent,
+        "prediction":         label,
+        "risk_level":         risk,
+    }
+
+
+# Keyset-paginated reads of churn_predictions (/history, /api/history);
+# every column the app writes can be requested
+prediction_history = HistoryTable(
+    storage, "churn_predictions", list(prediction_record({}, None, None, None))
 )
 
+
+# -------------------------------
+# Dashboard Cache
+# -------------------------------
+
+# The dashboard aggregates are recomputed from storage at most once per TTL
+# per worker; predictions served by this worker are folded in immediately
+# (except while a recompute is running, which counts them anyway)
+DASHBOARD_CACHE_TTL = float(os.environ.get("DASHBOARD_CACHE_TTL", 30))
+dashboard_cache = TTLCache(DASHBOARD_CACHE_TTL)
+
+
+def empty_dashboard_state():
+    return {
+        "total": 0,
+        "prob_sum": 0.0,
+        "high_risk": 0,
+        "distribution": {"Low": 0, "Medium": 0, "High": 0, "Critical": 0},
+    }
+
+
+def add_to_dashboard_state(state, r):
+    """Fold one prediction row into the running dashboard aggregates."""
+    state["total"] += 1
+    state["prob_sum"] += r["churn_probability"]
+    if r["churn_probability"] >= 60:
+        state["high_risk"] += 1
+    if r["risk_level"] in state["distribution"]:
+        state["distribution"][r["risk_level"]] += 1
+    return state
+
+
+def load_dashboard_state():
+    # One pass over the table, one page of rows in memory at a time
+    state = empty_dashboard_state()
+    for r in prediction_history.scan("churn_probability,risk_level"):
+        add_to_dashboard_state(state, r)
+    return state
+
+
+def record_dashboard_predictions(rows):
+    """Update the cached dashboard (if any) with freshly logged predictions."""
+
+    def apply(state):
+        for r in rows:
+            add_to_dashboard_state(state, r)
+        return state
+
+    dashboard_cache.update("dashboard", apply)
+
+
+def read_batch_records():
+    """
+    Parse the batch payload into (records, parse_errors).
+
+    Accepts a JSON array (or {"records": [...]}), an NDJSON body, or a CSV /
+    NDJSON file uploaded as multipart field "file". parse_errors maps row
+    index -> message for NDJSON lines that are not valid JSON.
+    """
+    upload = request.files.get("file")
+    if upload is not None:
+        raw = upload.read().decode("utf-8-sig")
+        name = (upload.filename or "").lower()
+        fmt = "ndjson" if name.endswith((".ndjson", ".jsonl")) else "csv"
+    else:
+        raw = request.get_data(as_text=True)
+        if request.mimetype == "text/csv":
+            fmt = "csv"
+        elif request.mimetype in ("application/x-ndjson", "application/jsonl"):
+            fmt = "ndjson"
+        else:
+            fmt = "json"
+
+    if fmt == "csv":
+        return list(csv.DictReader(io.StringIO(raw))), {}
+
+    if fmt == "ndjson":
+        records, errors = [], {}
+        for line in raw.splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError as e:
+                errors[len(records)] = f"Invalid JSON: {e}"
+                records.append(None)
+        return records, errors
+
+    payload = json.loads(raw)
+    if isinstance(payload, dict):
+        payload = payload.get("records")
+    if not isinstance(payload, list):
+        raise ValueError("Expected a JSON array of records")
+    return payload, {}
+
+
+def validate_record(record):
+    """Return a clean feature row for one batch record, or raise ValueError."""
+    if not isinstance(record, dict):
+        raise ValueError("Record must be an object")
+
+    missing = [
+        f for f in feature_names
+        if record.get(f) is None or str(record.get(f)).strip() == ""
+    ]
+    if missing:
+        raise ValueError(f"Missing field(s): {', '.join(missing)}")
+
+    row = {f: record[f] for f in feature_names}
+    for f in category_encoder.lookups:
+        if isinstance(row.get(f), (dict, list)):
+            raise ValueError(f"Invalid value for {f}: {row[f]!r}")
+    for f in numeric_features:
+        try:
+            row[f] = float(row[f])
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid numeric value for {f}: {row[f]!r}")
+    return row
+
+
 # -------------------------------
 # Routes
 # -------------------------------
@@ -60,61 +313,22 @@ def home():
 @app.route("/predict", methods=["POST"])
 def predict():
     try:
-        data = request.json
-        df = pd.DataFrame([data])
-
-        # Encode categorical features safely
-        for col, enc in encoders.items():
-            if col in df.columns:
-                df[col] = df[col].apply(
-                    lambda x: enc.transform([x])[0] if x in enc.classes_ else -1
-                )
-
-        df = df[feature_names]
+        with stage("parse"):
+            data = request.json
+        with stage("encode"):
+            encoded = category_encoder.encode_record(data)
 
         # Prediction
-        prob = model.predict_proba(df)[0][1]
-        label = "Churn" if prob >= 0.5 else "No Churn"
-        prob_percent = round(prob * 100, 2)
-
-        # Risk Classification
-        if prob_percent >= 80:
-            risk = "Critical"
-        elif prob_percent >= 60:
-            risk = "High"
-        elif prob_percent >= 40:
-            risk = "Medium"
-        else:
-            risk = "Low"
+        prob = prediction_cache.cached(
+            feature_key(encoded[f] for f in feature_names),
+            lambda: inference_batcher(encoded),
+        )
+        label, prob_percent, risk = classify(prob)
 
-        # Save to Supabase
-        try:
-            supabase.table("churn_predictions").insert({
-                "gender":             data.get("gender"),
-                "senior_citizen":     data.get("SeniorCitizen"),
-                "partner":            data.get("Partner"),
-                "dependents":         data.get("Dependents"),
-                "tenure":             data.get("tenure"),
-                "phone_service":      data.get("PhoneService"),
-                "multiple_lines":     data.get("MultipleLines"),
-                "internet_service":   data.get("InternetService"),
-                "online_security":    data.get("OnlineSecurity"),
-                "online_backup":      data.get("OnlineBackup"),
-                "device_protection":  data.get("DeviceProtection"),
-                "tech_support":       data.get("TechSupport"),
-                "streaming_tv":       data.get("StreamingTV"),
-                "streaming_movies":   data.get("StreamingMovies"),
-                "contract":           data.get("Contract"),
-                "paperless_billing":  data.get("PaperlessBilling"),
-                "payment_method":     data.get("PaymentMethod"),
-                "monthly_charges":    data.get("MonthlyCharges"),
-                "total_charges":      data.get("TotalCharges"),
-                "churn_probability":  prob_percent,
-                "prediction":         label,
-                "risk_level":         risk,
-            }).execute()
-        except Exception as db_error:
-            print(f"Database save error: {db_error}")
+        # Save the prediction (queued, written in the background)
+        record = prediction_record(data, label, prob_percent, risk)
+        prediction_log.submit("churn_predictions", record)
+        record_dashboard_predictions([record])
 
         return jsonify(
             {"prediction": label, "churn_probability": prob_percent, "risk_level": risk}
@@ -124,16 +338,90 @@ def predict():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/predict/batch", methods=["POST"])
+def predict_batch():
+    """
+    Score many customers with one model call.
+
+    Rows that fail validation are reported individually in "results" and do
+    not stop the rest of the batch. Pass ?save=false to skip persisting.
+    """
+    try:
+        with stage("parse"):
+            records, parse_errors = read_batch_records()
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    if len(records) > BATCH_MAX_ROWS:
+        return jsonify(
+            {"error": f"Batch too large: {len(records)} rows (max {BATCH_MAX_ROWS})"}
+        ), 413
+
+    try:
+        results = [None] * len(records)
+        valid_index, valid_rows = [], []
+
+        with stage("parse"):
+            for i, record in enumerate(records):
+                if i in parse_errors:
+                    results[i] = {"index": i, "error": parse_errors[i]}
+                    continue
+                try:
+                    valid_rows.append(validate_record(record))
+                    valid_index.append(i)
+                except ValueError as e:
+                    results[i] = {"index": i, "error": str(e)}
+
+        to_save = []
+        if valid_rows:
+            import pandas as pd
+
+            with stage("encode"):
+                df = category_encoder.encode_frame(
+                    pd.DataFrame(valid_rows, columns=feature_names)
+                )
+            probs = classifier.probabilities(df)
+
+            for i, row, prob in zip(valid_index, valid_rows, probs):
+                label, prob_percent, risk = classify(prob)
+                result = {
+                    "index": i,
+                    "prediction": label,
+                    "churn_probability": prob_percent,
+                    "risk_level": risk,
+                }
+                customer_id = records[i].get("customerID")
+                if customer_id is not None:
+                    result["customerID"] = customer_id
+                results[i] = result
+                to_save.append(prediction_record(row, label, prob_percent, risk))
+
+        if to_save and request.args.get("save", "true").lower() != "false":
+            prediction_log.submit_many("churn_predictions", to_save)
+            record_dashboard_predictions(to_save)
+
+        return jsonify(
+            {
+                "total": len(records),
+                "scored": len(valid_rows),
+                "failed": len(records) - len(valid_rows),
+                "results": results,
+            }
+        )
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route("/history")
 def history():
+    next_cursor = None
     try:
-        response = (
-            supabase.table("churn_predictions")
-            .select("churn_probability, prediction, risk_level, created_at")
-            .order("created_at", desc=True)
-            .limit(20)
-            .execute()
+        # 20 rows per page; "Older" follows the keyset cursor
+        page = prediction_history.page(
+            20, request.args.get("cursor"), HISTORY_PAGE_COLUMNS
         )
+        next_cursor = page["next_cursor"]
         # Convert to tuples to match template's row[0], row[1], row[2], row[3] indexing
         rows = [
             (
@@ -142,47 +430,42 @@ def history():
                 row["risk_level"],
                 row["created_at"],
             )
-            for row in response.data
+            for row in page["rows"]
         ]
     except Exception as e:
         print(f"History fetch error: {e}")
         rows = []
 
-    return render_template("history.html", rows=rows)
+    return render_template("history.html", rows=rows, next_cursor=next_cursor)
 
 
-@app.route("/dashboard")
-def dashboard():
+@app.route("/api/history")
+def api_history():
+    """Logged predictions, newest first (?limit=, ?cursor=, ?columns=)."""
     try:
-        response = (
-            supabase.table("churn_predictions")
-            .select("churn_probability, risk_level")
-            .execute()
-        )
-        records = response.data
-
-        # Aggregate in Python (replaces SQL aggregation)
-        total = len(records)
-        avg_prob = round(sum(r["churn_probability"] for r in records) / total, 2) if total else 0
-        high_risk = sum(1 for r in records if r["churn_probability"] >= 60)
+        return jsonify(prediction_history.page_from_args(request.args))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        distribution = {"Low": 0, "Medium": 0, "High": 0, "Critical": 0}
-        for r in records:
-            level = r["risk_level"]
-            if level in distribution:
-                distribution[level] += 1
 
+@app.route("/dashboard")
+def dashboard():
+    try:
+        # Aggregated in Python from a full scan, cached for DASHBOARD_CACHE_TTL
+        state = dashboard_cache.get("dashboard", load_dashboard_state)
     except Exception as e:
         print(f"Dashboard fetch error: {e}")
-        total, avg_prob, high_risk = 0, 0, 0
-        distribution = {"Low": 0, "Medium": 0, "High": 0, "Critical": 0}
+        state = empty_dashboard_state()
 
+    total = state["total"]
     return render_template(
         "dashboard.html",
         total=total,
-        avg_prob=avg_prob,
-        high_risk=high_risk,
-        distribution=distribution,
+        avg_prob=round(state["prob_sum"] / total, 2) if total else 0,
+        high_risk=state["high_risk"],
+        distribution=dict(state["distribution"]),
     )
 
 
@@ -190,6 +473,19 @@ def dashboard():
 # Run App
 # -------------------------------
 
+# Stage timings, request latency and cache / writer / startup stats at /metrics
+instrument(
+    app,
+    "churn",
+    inference_pool=inference_pool.stats,
+    inference_batcher=inference_batcher.stats,
+    prediction_cache=prediction_cache.stats,
+    prediction_log=prediction_log.stats,
+    startup=startup.stats,
+)
+
+startup.warm()
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000)
 
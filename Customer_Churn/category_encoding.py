@@ -0,0 +1,46 @@
+"""
+Precompiled categorical encoding for the churn model.
+
+The LabelEncoders in encoders.pkl are turned into lookup tables once at
+startup, so requests never call sklearn's transform(). Values the encoder
+has not seen map to -1, matching the original per-cell behaviour.
+"""
+
+import pandas as pd
+
+UNSEEN = -1
+
+
+class CategoryEncoder:
+    """Dict / categorical lookup tables built from fitted LabelEncoders."""
+
+    def __init__(self, encoders):
+        # LabelEncoder.transform returns the position of the value in classes_
+        self.lookups = {
+            col: {value: code for code, value in enumerate(enc.classes_)}
+            for col, enc in encoders.items()
+        }
+        self.dtypes = {
+            col: pd.CategoricalDtype(categories=list(enc.classes_))
+            for col, enc in encoders.items()
+        }
+
+    def encode_record(self, record):
+        """Encode a single input dict; cheaper than a frame for one row."""
+        encoded = dict(record)
+        for col, lookup in self.lookups.items():
+            if col in encoded:
+                value = encoded[col]
+                try:
+                    encoded[col] = lookup.get(value, UNSEEN)
+                except TypeError:  # unhashable input can never be a known class
+                    encoded[col] = UNSEEN
+        return encoded
+
+    def encode_frame(self, df):
+        """Encode every categorical column of a DataFrame in place."""
+        for col, dtype in self.dtypes.items():
+            if col in df.columns:
+                codes = pd.Categorical(df[col], dtype=dtype).codes
+                df[col] = codes.astype("int64")
+        return df
@@ -0,0 +1,61 @@
+"""
+Churn model inputs and risk bands, shared by app.py and the bulk CSV
+scorer (python -m ml_common.scoring churn ...).
+"""
+
+feature_names = [
+    "gender",
+    "SeniorCitizen",
+    "Partner",
+    "Dependents",
+    "tenure",
+    "PhoneService",
+    "MultipleLines",
+    "InternetService",
+    "OnlineSecurity",
+    "OnlineBackup",
+    "DeviceProtection",
+    "TechSupport",
+    "StreamingTV",
+    "StreamingMovies",
+    "Contract",
+    "PaperlessBilling",
+    "PaymentMethod",
+    "MonthlyCharges",
+    "TotalCharges",
+]
+numeric_features = ["SeniorCitizen", "tenure", "MonthlyCharges", "TotalCharges"]
+
+
+def churn_label(churn):
+    return "Churn" if churn else "No Churn"
+
+
+def risk_level(prob_percent):
+    if prob_percent >= 80:
+        return "Critical"
+    if prob_percent >= 60:
+        return "High"
+    if prob_percent >= 40:
+        return "Medium"
+    return "Low"
+
+
+def encode_frame(frame, category_encoder):
+    """
+    (float feature frame in feature_names order, per-row error messages)
+    for Telco-shaped rows. Unseen categories encode to -1, as in the app.
+    """
+    import pandas as pd
+
+    missing = [f for f in feature_names if f not in frame.columns]
+    if missing:
+        raise ValueError(f"Input is missing column(s): {', '.join(missing)}")
+
+    X = frame[feature_names].copy()
+    errors = pd.Series("", index=frame.index)
+    for f in numeric_features:
+        X[f] = pd.to_numeric(X[f], errors="coerce")
+        errors[X[f].isna() & (errors == "")] = f"Invalid numeric value for {f}"
+    X = category_encoder.encode_frame(X)
+    return X.astype("float64"), errors
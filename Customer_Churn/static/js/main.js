@@ -44,7 +44,7 @@ document.getElementById("churnForm").addEventListener("submit", async (e) => {
   };
 
   try {
-    const response = await fetch("/predict", {
+    const response = await fetch((window.SCRIPT_ROOT || "") + "/predict", {
       method: "POST",
       headers: {
         "Content-Type": "application/json",
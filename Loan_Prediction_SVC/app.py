@@ -1,8 +1,6 @@
 from flask import Flask, request, jsonify, render_template
-import joblib
-import numpy as np
 import os
-from supabase import create_client
+import sys
 
 try:
     from dotenv import load_dotenv
@@ -15,21 +13,149 @@ app = Flask(__name__)
 
 # ── Load Model ─────────────────────────────────────────────────────────────────
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-model = joblib.load(os.path.join(BASE_DIR, "loan_model.pkl"))
-model_columns = joblib.load(os.path.join(BASE_DIR, "model_columns.pkl"))
+sys.path.append(os.path.dirname(BASE_DIR))
+from ml_common import sweep
+from ml_common.cache import PredictionCache, feature_key
+from ml_common.executor import InferencePool
+from ml_common.history import HistoryTable
+from ml_common.inference import BinaryClassifier
+from ml_common.introspection import ModelJSON, coefficients
+from ml_common.metrics import instrument, stage
+from ml_common.prediction_log import PredictionLogWriter
+from ml_common.registry import ArtifactWatch, registry
+from ml_common.startup import Startup
+from ml_common.storage import open_storage
+from dashboard_stats import dashboard_context, fetch_stats
+from loan_scoring import (
+    approval_label,
+    education_map,
+    gender_map,
+    married_map,
+    property_map,
+    self_employed_map,
+)
+
+# Model and storage client load after boot (STARTUP_MODE), so the static
+# pages answer while they are still loading
+startup = Startup("loan")
+
+
+# Estimator calls run in worker processes when INFERENCE_PROCESSES > 0
+inference_pool = InferencePool.from_env("loan")
+
+
+def load_model():
+    with startup.phase("import"):
+        import joblib
+        from ml_common.features import FastModel
+
+    with startup.phase("unpickle"):
+        model = registry.load("loan", os.path.join(BASE_DIR, "loan_model.pkl"), joblib.load)
+        model_columns = registry.load(
+            "loan_columns", os.path.join(BASE_DIR, "model_columns.pkl"), joblib.load
+        )
+
+    # Checks model_columns against the names the model was fitted with;
+    # classifier.model.vector.columns is the ordered feature list from here on
+    fast_model = inference_pool.attach(FastModel(model, model_columns, "loan_model.pkl"))
+
+    # Decision threshold on the approval probability (LOAN_APPROVAL_THRESHOLD, default 0.5)
+    model = BinaryClassifier.from_env(fast_model, "LOAN_APPROVAL_THRESHOLD")
+    coefficient_json.get(model)
+    return model
+
+
+def coefficient_payload(model):
+    """/api/coefficients body, read from the fitted estimator behind the classifier."""
+    fast_model = model.model
+    return {
+        "success": True,
+        **coefficients(fast_model.model, fast_model.vector.columns, model.positive_class),
+    }
+
+
+# Built once per loaded model
+coefficient_json = ModelJSON(coefficient_payload)
+
+
+# ── Prediction Cache ───────────────────────────────────────────────────────────
+# Memo of model outputs keyed on the ordered feature row
+prediction_cache = PredictionCache.from_env(
+    [
+        os.path.join(BASE_DIR, "loan_model.pkl"),
+        os.path.join(BASE_DIR, "model_columns.pkl"),
+    ]
+)
 
-# ── Supabase ───────────────────────────────────────────────────────────────────
-supabase = create_client(
-    os.environ.get("SUPABASE_URL"),
-    os.environ.get("SUPABASE_KEY"),
+# A retrained loan_model.pkl / model_columns.pkl is loaded in the background,
+# checked, and swapped in without a restart (MODEL_RELOAD_INTERVAL)
+classifier = startup.defer(
+    "model",
+    load_model,
+    watch=ArtifactWatch.from_env(["loan", "loan_columns"]),
+    on_reload=[prediction_cache.clear],
 )
 
-# ── Encoding Maps ──────────────────────────────────────────────────────────────
-gender_map = {"Male": 1, "Female": 0}
-married_map = {"Yes": 1, "No": 0}
-education_map = {"Graduate": 1, "Not Graduate": 0}
-self_employed_map = {"Yes": 1, "No": 0}
-property_map = {"Urban": 2, "Semiurban": 1, "Rural": 0}
+# ── Storage ────────────────────────────────────────────────────────────────────
+
+
+def load_storage():
+    # Supabase, or the embedded SQLite database (STORAGE_BACKEND)
+    with startup.phase("client init"):
+        return open_storage(
+            os.environ.get("SUPABASE_URL"),
+            os.environ.get("SUPABASE_KEY"),
+        )
+
+
+storage = startup.defer("storage", load_storage)
+
+# Predictions are logged from a background thread in bulk inserts
+prediction_log = PredictionLogWriter.from_env(storage, BASE_DIR)
+
+# Keyset-paginated reads of loan_predictions (dashboard table, /api/history)
+prediction_history = HistoryTable(
+    storage,
+    "loan_predictions",
+    [
+        "gender",
+        "married",
+        "dependents",
+        "education",
+        "self_employed",
+        "applicant_income",
+        "coapplicant_income",
+        "loan_amount",
+        "loan_term",
+        "credit_history",
+        "property_area",
+        "prediction",
+        "confidence",
+    ],
+)
+
+
+def score_rows(rows):
+    """Approval probability for each encoded feature dict."""
+    # One model version for the whole call, even if a reload lands meanwhile
+    model = classifier.get()
+    columns = model.model.vector.columns
+    ordered = [[row[col] for col in columns] for row in rows]
+
+    def compute(missing):
+        if len(missing) == 1:
+            X = model.model.vector.fill(missing[0])
+        else:
+            X = model.model.vector.matrix(missing)
+        return [float(p) for p in model.probabilities(X)]
+
+    return prediction_cache.cached_many([feature_key(row) for row in ordered], compute)
+
+
+def decide(approval_probability):
+    """(label, confidence %) for an approval probability."""
+    return approval_label(classifier.is_positive(approval_probability), approval_probability)
+
 
 # ── Routes ─────────────────────────────────────────────────────────────────────
 
@@ -47,70 +173,67 @@ def predict_page():
 @app.route("/predict", methods=["POST"])
 def predict():
     try:
-        data = request.json
-
-        required = [
-            "gender",
-            "married",
-            "dependents",
-            "education",
-            "self_employed",
-            "applicant_income",
-            "coapplicant_income",
-            "loan_amount",
-            "loan_term",
-            "credit_history",
-            "property_area",
-        ]
-        for field in required:
-            if field not in data:
-                return jsonify({"error": f"Missing field: {field}"}), 400
-
-        if float(data["applicant_income"]) <= 0:
-            return jsonify({"error": "Applicant income must be greater than 0"}), 400
-        if float(data["loan_amount"]) <= 0:
-            return jsonify({"error": "Loan amount must be greater than 0"}), 400
-
-        input_data = {
-            "Gender": gender_map.get(data["gender"], 1),
-            "Married": married_map.get(data["married"], 0),
-            "Dependents": int(data["dependents"]),
-            "Education": education_map.get(data["education"], 1),
-            "Self_Employed": self_employed_map.get(data["self_employed"], 0),
-            "ApplicantIncome": float(data["applicant_income"]),
-            "CoapplicantIncome": float(data["coapplicant_income"]),
-            "LoanAmount": float(data["loan_amount"]),
-            "Loan_Amount_Term": float(data["loan_term"]),
-            "Credit_History": float(data["credit_history"]),
-            "Property_Area": property_map.get(data["property_area"], 1),
-        }
-
-        input_array = np.array([[input_data[col] for col in model_columns]])
-        prediction = model.predict(input_array)[0]
-        proba = model.predict_proba(input_array)[0]
-        confidence = round(float(max(proba)) * 100, 1)
-        result_label = "Approved" if prediction == 1 else "Rejected"
-
-        try:
-            supabase.table("loan_predictions").insert(
-                {
-                    "gender": data["gender"],
-                    "married": data["married"],
-                    "dependents": int(data["dependents"]),
-                    "education": data["education"],
-                    "self_employed": data["self_employed"],
-                    "applicant_income": float(data["applicant_income"]),
-                    "coapplicant_income": float(data["coapplicant_income"]),
-                    "loan_amount": float(data["loan_amount"]),
-                    "loan_term": float(data["loan_term"]),
-                    "credit_history": float(data["credit_history"]),
-                    "property_area": data["property_area"],
-                    "prediction": result_label,
-                    "confidence": confidence,
-                }
-            ).execute()
-        except Exception as db_err:
-            print(f"DB save error: {db_err}")
+        with stage("parse"):
+            data = request.json
+
+            required = [
+                "gender",
+                "married",
+                "dependents",
+                "education",
+                "self_employed",
+                "applicant_income",
+                "coapplicant_income",
+                "loan_amount",
+                "loan_term",
+                "credit_history",
+                "property_area",
+            ]
+            for field in required:
+                if field not in data:
+                    return jsonify({"error": f"Missing field: {field}"}), 400
+
+            if float(data["applicant_income"]) <= 0:
+                return jsonify({"error": "Applicant income must be greater than 0"}), 400
+            if float(data["loan_amount"]) <= 0:
+                return jsonify({"error": "Loan amount must be greater than 0"}), 400
+
+        with stage("encode"):
+            input_data = {
+                "Gender": gender_map.get(data["gender"], 1),
+                "Married": married_map.get(data["married"], 0),
+                "Dependents": int(data["dependents"]),
+                "Education": education_map.get(data["education"], 1),
+                "Self_Employed": self_employed_map.get(data["self_employed"], 0),
+                "ApplicantIncome": float(data["applicant_income"]),
+                "CoapplicantIncome": float(data["coapplicant_income"]),
+                "LoanAmount": float(data["loan_amount"]),
+                "Loan_Amount_Term": float(data["loan_term"]),
+                "Credit_History": float(data["credit_history"]),
+                "Property_Area": property_map.get(data["property_area"], 1),
+            }
+
+        approval = score_rows([input_data])[0]
+        result_label, confidence = decide(approval)
+
+        prediction_log.submit(
+            "loan_predictions",
+            {
+                "gender": data["gender"],
+                "married": data["married"],
+                "dependents": int(data["dependents"]),
+                "education": data["education"],
+                "self_employed": data["self_employed"],
+                "applicant_income": float(data["applicant_income"]),
+                "coapplicant_income": float(data["coapplicant_income"]),
+                "loan_amount": float(data["loan_amount"]),
+                "loan_term": float(data["loan_term"]),
+                "credit_history": float(data["credit_history"]),
+                "property_area": data["property_area"],
+                "prediction": result_label,
+                "confidence": confidence,
+            },
+        )
 
         return jsonify({"prediction": result_label, "confidence": confidence})
 
@@ -121,102 +244,35 @@ def predict():
 @app.route("/dashboard")
 def dashboard():
     try:
-        response = (
-            supabase.table("loan_predictions")
-            .select(
-                "prediction, confidence, property_area, education, gender, applicant_income, credit_history"
-            )
-            .order("created_at", desc=False)
-            .execute()
-        )
-        records = response.data
-
-        # Fetch last 15 for history table
-        history_resp = (
-            supabase.table("loan_predictions")
-            .select("*")
-            .order("created_at", desc=True)
-            .limit(15)
-            .execute()
-        )
-        history_rows = history_resp.data
+        # Pre-aggregated counters, maintained by a trigger on loan_predictions
+        context = dashboard_context(fetch_stats(storage))
 
-        total = len(records)
-        approved = sum(1 for r in records if r["prediction"] == "Approved")
-        rejected = total - approved
-        avg_conf = (
-            round(sum(r["confidence"] for r in records) / total, 1) if total else 0
-        )
-        avg_income = (
-            round(sum(r["applicant_income"] for r in records) / total, 0)
-            if total
-            else 0
-        )
-
-        area_counts = {"Urban": 0, "Semiurban": 0, "Rural": 0}
-        for r in records:
-            a = r["property_area"]
-            if a in area_counts:
-                area_counts[a] += 1
-
-        edu_counts = {"Graduate": 0, "Not Graduate": 0}
-        for r in records:
-            e = r["education"]
-            if e in edu_counts:
-                edu_counts[e] += 1
-
-        good_credit_approved = sum(
-            1
-            for r in records
-            if r["credit_history"] == 1.0 and r["prediction"] == "Approved"
-        )
-        good_credit_rejected = sum(
-            1
-            for r in records
-            if r["credit_history"] == 1.0 and r["prediction"] == "Rejected"
-        )
-        bad_credit_approved = sum(
-            1
-            for r in records
-            if r["credit_history"] == 0.0 and r["prediction"] == "Approved"
-        )
-        bad_credit_rejected = sum(
-            1
-            for r in records
-            if r["credit_history"] == 0.0 and r["prediction"] == "Rejected"
-        )
-
-        predictions_timeline = [r["prediction"] for r in records]
+        # Last 15 for the history table
+        history_rows = prediction_history.page(15)["rows"]
 
     except Exception as e:
         print(f"Dashboard error: {e}")
-        total = approved = rejected = avg_conf = avg_income = 0
-        area_counts = {"Urban": 0, "Semiurban": 0, "Rural": 0}
-        edu_counts = {"Graduate": 0, "Not Graduate": 0}
-        good_credit_approved = good_credit_rejected = bad_credit_approved = (
-            bad_credit_rejected
-        ) = 0
-        predictions_timeline = []
-        history_rows = []  # ← fallback added here
+        context = dashboard_context({})
+        history_rows = []
 
     return render_template(
         "dashboard.html",
-        total=total,
-        approved=approved,
-        rejected=rejected,
-        avg_conf=avg_conf,
-        avg_income=int(avg_income),
-        area_counts=area_counts,
-        edu_counts=edu_counts,
-        good_credit_approved=good_credit_approved,
-        good_credit_rejected=good_credit_rejected,
-        bad_credit_approved=bad_credit_approved,
-        bad_credit_rejected=bad_credit_rejected,
-        predictions_timeline=predictions_timeline,
-        history_rows=history_rows,  # ← added here
+        history_rows=history_rows,
+        **context,
     )
 
 
+@app.route("/api/history")
+def api_history():
+    """Logged predictions, newest first (?limit=, ?cursor=, ?columns=)."""
+    try:
+        return jsonify(prediction_history.page_from_args(request.args))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 # ── Add these two routes to app.py before the if __name__ block ───────────────
 
 
@@ -225,6 +281,40 @@ def simulate_page():
     return render_template("simulate.html")
 
 
+def simulate_features(data):
+    """Model inputs for a simulator scenario, filling defaults for missing fields."""
+    return {
+        "Gender": gender_map.get(data.get("gender", "Male"), 1),
+        "Married": married_map.get(data.get("married", "Yes"), 0),
+        "Dependents": int(data.get("dependents", 0)),
+        "Education": education_map.get(data.get("education", "Graduate"), 1),
+        "Self_Employed": self_employed_map.get(data.get("self_employed", "No"), 0),
+        "ApplicantIncome": float(data.get("applicant_income", 0)),
+        "CoapplicantIncome": float(data.get("coapplicant_income", 0)),
+        "LoanAmount": float(data.get("loan_amount", 0)),
+        "Loan_Amount_Term": float(data.get("loan_term", 360)),
+        "Credit_History": float(data.get("credit_history", 1)),
+        "Property_Area": property_map.get(
+            data.get("property_area", "Semiurban"), 1
+        ),
+    }
+
+
+SWEEP_FIELDS = [
+    "gender",
+    "married",
+    "dependents",
+    "education",
+    "self_employed",
+    "applicant_income",
+    "coapplicant_income",
+    "loan_amount",
+    "loan_term",
+    "credit_history",
+    "property_area",
+]
+
+
 @app.route("/api/simulate", methods=["POST"])
 def simulate():
     """
@@ -232,29 +322,14 @@ def simulate():
     Keeps dashboard analytics clean (only real submissions counted).
     """
     try:
-        data = request.json
-
-        input_data = {
-            "Gender": gender_map.get(data.get("gender", "Male"), 1),
-            "Married": married_map.get(data.get("married", "Yes"), 0),
-            "Dependents": int(data.get("dependents", 0)),
-            "Education": education_map.get(data.get("education", "Graduate"), 1),
-            "Self_Employed": self_employed_map.get(data.get("self_employed", "No"), 0),
-            "ApplicantIncome": float(data.get("applicant_income", 0)),
-            "CoapplicantIncome": float(data.get("coapplicant_income", 0)),
-            "LoanAmount": float(data.get("loan_amount", 0)),
-            "Loan_Amount_Term": float(data.get("loan_term", 360)),
-            "Credit_History": float(data.get("credit_history", 1)),
-            "Property_Area": property_map.get(
-                data.get("property_area", "Semiurban"), 1
-            ),
-        }
-
-        input_array = np.array([[input_data[col] for col in model_columns]])
-        prediction = model.predict(input_array)[0]
-        proba = model.predict_proba(input_array)[0]
-        confidence = round(float(max(proba)) * 100, 1)
-        result_label = "Approved" if prediction == 1 else "Rejected"
+        with stage("parse"):
+            data = request.json
+
+        with stage("encode"):
+            input_data = simulate_features(data)
+
+        approval = score_rows([input_data])[0]
+        result_label, confidence = decide(approval)
 
         return jsonify({"prediction": result_label, "confidence": confidence})
 
@@ -262,26 +337,73 @@ def simulate():
         return jsonify({"error": str(e)}), 500
 
 
-COEFFICIENTS = {
-    "Gender": 0.3,
-    "Married": 0.657,
-    "Dependents": -0.1148,
-    "Education": 0.4457,
-    "Self_Employed": -0.2078,
-    "ApplicantIncome": 0.0,
-    "CoapplicantIncome": -0.0,
-    "LoanAmount": -0.0035,
-    "Loan_Amount_Term": -0.007,
-    "Credit_History": 2.4715,
-    "Property_Area": 0.1468,
-}
+@app.route("/api/simulate/sweep", methods=["POST"])
+def simulate_sweep():
+    """
+    Score a base scenario across one or two varying fields in one model call.
+
+    Body: {"base": {...}, "axes": [{"field": "loan_amount", "start": 50,
+    "stop": 500, "steps": 10}, {"field": "loan_term", "values": [180, 360]}]}
+    Grids are returned row-major: grid[i][j] is axes[0][i] x axes[1][j].
+    No Supabase save.
+    """
+    try:
+        with stage("parse"):
+            data = request.json or {}
+            axes = sweep.parse_axes(data.get("axes"), SWEEP_FIELDS)
+            scenarios = sweep.expand(data.get("base") or {}, axes)
+        with stage("encode"):
+            rows = [simulate_features(scenario) for scenario in scenarios]
+    except (ValueError, KeyError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        scored = score_rows(rows)
+        decisions = [decide(p) for p in scored]
+
+        labels = [label for label, _ in decisions]
+        confidence = [conf for _, conf in decisions]
+        approval = [round(p * 100, 1) for p in scored]
+
+        return jsonify(
+            {
+                "axes": sweep.describe(axes),
+                "prediction": sweep.reshape(labels, axes),
+                "confidence": sweep.reshape(confidence, axes),
+                "approval_probability": sweep.reshape(approval, axes),
+            }
+        )
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
 
 @app.route("/insights")
 def insights():
-    return render_template("insights.html", coefficients=COEFFICIENTS)
+    return render_template("insights.html")
+
+
+@app.route("/api/coefficients")
+def api_coefficients():
+    """Coefficients of the loaded model (log-odds of approval per unit)."""
+    try:
+        return coefficient_json.get(classifier.get()).response(request)
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
 
 
 # ── Run ────────────────────────────────────────────────────────────────────────
+# Stage timings, request latency and cache / writer / startup stats at /metrics
+instrument(
+    app,
+    "loan",
+    inference_pool=inference_pool.stats,
+    prediction_cache=prediction_cache.stats,
+    prediction_log=prediction_log.stats,
+    startup=startup.stats,
+)
+
+startup.warm()
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000)
@@ -0,0 +1,79 @@
+"""
+Dashboard aggregates for the loan app.
+
+Counters and sums live in a single-row `loan_dashboard_stats` table that a
+trigger on `loan_predictions` keeps current (see sql/dashboard_stats.sql;
+the SQLite backend creates the same table and trigger), so /dashboard
+reads one row instead of scanning every prediction.
+
+Rebuild the aggregates from the raw table with:
+
+    python dashboard_stats.py rebuild
+"""
+
+import argparse
+import os
+import sys
+
+STATS_TABLE = "loan_dashboard_stats"
+
+
+def fetch_stats(storage):
+    """Return the aggregate row, or an empty dict if it has not been created."""
+    return storage.fetch(STATS_TABLE, 1) or {}
+
+
+def dashboard_context(stats):
+    """Template variables for dashboard.html derived from the aggregate row."""
+    total = int(stats.get("total") or 0)
+    approved = int(stats.get("approved") or 0)
+    confidence_sum = float(stats.get("confidence_sum") or 0)
+    income_sum = float(stats.get("income_sum") or 0)
+
+    return {
+        "total": total,
+        "approved": approved,
+        "rejected": total - approved,
+        "avg_conf": round(confidence_sum / total, 1) if total else 0,
+        "avg_income": int(round(income_sum / total, 0)) if total else 0,
+        "area_counts": {
+            "Urban": int(stats.get("area_urban") or 0),
+            "Semiurban": int(stats.get("area_semiurban") or 0),
+            "Rural": int(stats.get("area_rural") or 0),
+        },
+        "edu_counts": {
+            "Graduate": int(stats.get("edu_graduate") or 0),
+            "Not Graduate": int(stats.get("edu_not_graduate") or 0),
+        },
+        "good_credit_approved": int(stats.get("good_credit_approved") or 0),
+        "good_credit_rejected": int(stats.get("good_credit_rejected") or 0),
+        "bad_credit_approved": int(stats.get("bad_credit_approved") or 0),
+        "bad_credit_rejected": int(stats.get("bad_credit_rejected") or 0),
+    }
+
+
+def rebuild(storage):
+    """Recompute the aggregate row from every row in loan_predictions."""
+    storage.call("rebuild_loan_dashboard_stats")
+    return fetch_stats(storage)
+
+
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from ml_common.storage import open_storage
+
+    try:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+    except ImportError:
+        pass
+
+    parser = argparse.ArgumentParser(description="Loan dashboard aggregates")
+    parser.add_argument("command", choices=["rebuild", "show"])
+    args = parser.parse_args()
+
+    storage = open_storage()
+    stats = rebuild(storage) if args.command == "rebuild" else fetch_stats(storage)
+    for key, value in dashboard_context(stats).items():
+        print(f"{key}: {value}")
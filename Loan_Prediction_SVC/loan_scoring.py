@@ -0,0 +1,57 @@
+"""
+Loan model encodings and decision labels, shared by app.py and the bulk
+CSV scorer (python -m ml_common.scoring loan ...).
+"""
+
+# ── Encoding Maps ──────────────────────────────────────────────────────────────
+gender_map = {"Male": 1, "Female": 0}
+married_map = {"Yes": 1, "No": 0}
+education_map = {"Graduate": 1, "Not Graduate": 0}
+self_employed_map = {"Yes": 1, "No": 0}
+property_map = {"Urban": 2, "Semiurban": 1, "Rural": 0}
+
+# loan.csv column -> (map, value for anything the map does not know), as
+# the /predict route encodes them
+CATEGORICAL_COLUMNS = {
+    "Gender": (gender_map, 1),
+    "Married": (married_map, 0),
+    "Education": (education_map, 1),
+    "Self_Employed": (self_employed_map, 0),
+    "Property_Area": (property_map, 1),
+}
+NUMERIC_COLUMNS = [
+    "Dependents",
+    "ApplicantIncome",
+    "CoapplicantIncome",
+    "LoanAmount",
+    "Loan_Amount_Term",
+    "Credit_History",
+]
+
+
+def approval_label(approved, approval_probability):
+    """(label, confidence %) for a decision and its approval probability."""
+    confidence = approval_probability if approved else 1 - approval_probability
+    return ("Approved" if approved else "Rejected"), round(confidence * 100, 1)
+
+
+def encode_frame(frame):
+    """
+    (float feature frame keyed by model column, per-row error messages)
+    for loan.csv-shaped rows. Dependents "3+" is 4, as in training.
+    """
+    import pandas as pd
+
+    missing = [c for c in [*CATEGORICAL_COLUMNS, *NUMERIC_COLUMNS] if c not in frame.columns]
+    if missing:
+        raise ValueError(f"Input is missing column(s): {', '.join(missing)}")
+
+    X = pd.DataFrame(index=frame.index)
+    errors = pd.Series("", index=frame.index)
+    for col, (mapping, default) in CATEGORICAL_COLUMNS.items():
+        X[col] = frame[col].map(mapping).fillna(default)
+    for col in NUMERIC_COLUMNS:
+        raw = frame[col].replace("3+", "4") if col == "Dependents" else frame[col]
+        X[col] = pd.to_numeric(raw, errors="coerce")
+        errors[X[col].isna() & (errors == "")] = f"Invalid numeric value for {col}"
+    return X.astype("float64"), errors
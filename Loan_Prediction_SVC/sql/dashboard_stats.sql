@@ -0,0 +1,121 @@
+-- Incrementally maintained aggregates for the /dashboard page.
+--
+-- loan_dashboard_stats holds a single row (id = 1) of counters and sums.
+-- A statement-level trigger folds every insert into loan_predictions into
+-- that row, so the dashboard reads one row no matter how large the table
+-- grows. rebuild_loan_dashboard_stats() recomputes it from the raw table.
+
+create table if not exists public.loan_dashboard_stats (
+  id integer primary key default 1 check (id = 1),
+  total bigint not null default 0,
+  approved bigint not null default 0,
+  confidence_sum double precision not null default 0,
+  income_sum double precision not null default 0,
+  area_urban bigint not null default 0,
+  area_semiurban bigint not null default 0,
+  area_rural bigint not null default 0,
+  edu_graduate bigint not null default 0,
+  edu_not_graduate bigint not null default 0,
+  good_credit_approved bigint not null default 0,
+  good_credit_rejected bigint not null default 0,
+  bad_credit_approved bigint not null default 0,
+  bad_credit_rejected bigint not null default 0,
+  updated_at timestamp with time zone not null default now()
+);
+
+insert into public.loan_dashboard_stats (id) values (1) on conflict (id) do nothing;
+
+
+create or replace function public.loan_dashboard_stats_add()
+returns trigger
+language plpgsql
+as $$
+begin
+  update public.loan_dashboard_stats s set
+    total                = s.total + d.total,
+    approved             = s.approved + d.approved,
+    confidence_sum       = s.confidence_sum + d.confidence_sum,
+    income_sum           = s.income_sum + d.income_sum,
+    area_urban           = s.area_urban + d.area_urban,
+    area_semiurban       = s.area_semiurban + d.area_semiurban,
+    area_rural           = s.area_rural + d.area_rural,
+    edu_graduate         = s.edu_graduate + d.edu_graduate,
+    edu_not_graduate     = s.edu_not_graduate + d.edu_not_graduate,
+    good_credit_approved = s.good_credit_approved + d.good_credit_approved,
+    good_credit_rejected = s.good_credit_rejected + d.good_credit_rejected,
+    bad_credit_approved  = s.bad_credit_approved + d.bad_credit_approved,
+    bad_credit_rejected  = s.bad_credit_rejected + d.bad_credit_rejected,
+    updated_at           = now()
+  from (
+    select
+      count(*)                                                              as total,
+      count(*) filter (where prediction = 'Approved')                       as approved,
+      coalesce(sum(confidence), 0)                                          as confidence_sum,
+      coalesce(sum(applicant_income), 0)                                    as income_sum,
+      count(*) filter (where property_area = 'Urban')                       as area_urban,
+      count(*) filter (where property_area = 'Semiurban')                   as area_semiurban,
+      count(*) filter (where property_area = 'Rural')                       as area_rural,
+      count(*) filter (where education = 'Graduate')                        as edu_graduate,
+      count(*) filter (where education = 'Not Graduate')                    as edu_not_graduate,
+      count(*) filter (where credit_history = 1 and prediction = 'Approved') as good_credit_approved,
+      count(*) filter (where credit_history = 1 and prediction = 'Rejected') as good_credit_rejected,
+      count(*) filter (where credit_history = 0 and prediction = 'Approved') as bad_credit_approved,
+      count(*) filter (where credit_history = 0 and prediction = 'Rejected') as bad_credit_rejected
+    from inserted
+  ) d
+  where s.id = 1;
+  return null;
+end;
+$$;
+
+drop trigger if exists loan_dashboard_stats_add on public.loan_predictions;
+create trigger loan_dashboard_stats_add
+  after insert on public.loan_predictions
+  referencing new table as inserted
+  for each statement
+  execute function public.loan_dashboard_stats_add();
+
+
+create or replace function public.rebuild_loan_dashboard_stats()
+returns void
+language plpgsql
+as $$
+begin
+  -- Block concurrent inserts so no trigger update is lost during the recount
+  lock table public.loan_predictions in share mode;
+
+  update public.loan_dashboard_stats s set
+    total                = d.total,
+    approved             = d.approved,
+    confidence_sum       = d.confidence_sum,
+    income_sum           = d.income_sum,
+    area_urban           = d.area_urban,
+    area_semiurban       = d.area_semiurban,
+    area_rural           = d.area_rural,
+    edu_graduate         = d.edu_graduate,
+    edu_not_graduate     = d.edu_not_graduate,
+    good_credit_approved = d.good_credit_approved,
+    good_credit_rejected = d.good_credit_rejected,
+    bad_credit_approved  = d.bad_credit_approved,
+    bad_credit_rejected  = d.bad_credit_rejected,
+    updated_at           = now()
+  from (
+    select
+      count(*)                                                              as total,
+      count(*) filter (where prediction = 'Approved')                       as approved,
+      coalesce(sum(confidence), 0)                                          as confidence_sum,
+      coalesce(sum(applicant_income), 0)                                    as income_sum,
+      count(*) filter (where property_area = 'Urban')                       as area_urban,
+      count(*) filter (where property_area = 'Semiurban')                   as area_semiurban,
+      count(*) filter (where property_area = 'Rural')                       as area_rural,
+      count(*) filter (where education = 'Graduate')                        as edu_graduate,
+      count(*) filter (where education = 'Not Graduate')                    as edu_not_graduate,
+      count(*) filter (where credit_history = 1 and prediction = 'Approved') as good_credit_approved,
+      count(*) filter (where credit_history = 1 and prediction = 'Rejected') as good_credit_rejected,
+      count(*) filter (where credit_history = 0 and prediction = 'Approved') as bad_credit_approved,
+      count(*) filter (where credit_history = 0 and prediction = 'Rejected') as bad_credit_rejected
+    from public.loan_predictions
+  ) d
+  where s.id = 1;
+end;
+$$;
@@ -1,8 +1,8 @@
 /*
   insights.js — Coefficient Diverging Bar Chart
   ===============================================
-  Renders one ApexCharts horizontal bar chart using data injected
-  by Flask via window.COEFFICIENTS (set in insights.html script block).
+  Renders one ApexCharts horizontal bar chart from /api/coefficients,
+  which Flask derives from the fitted model (cached, ETag-validated).
 
   Chart is horizontal bar — positive values go right (green),
   negative go left (red). ApexCharts handles this automatically
@@ -12,8 +12,6 @@
   map each coefficient to green/red/grey based on sign.
 */
 
-const COEFFICIENTS = window.COEFFICIENTS;
-
 const FEATURE_LABELS = {
   Credit_History: "Credit History",
   Married: "Married",
@@ -38,9 +36,9 @@ function getColor(val) {
   return NEU_COLOR;
 }
 
-function renderChart() {
+function renderChart(coefficients) {
   // Sort by absolute value descending
-  const sorted = Object.entries(COEFFICIENTS).sort(
+  const sorted = Object.entries(coefficients).sort(
     (a, b) => Math.abs(b[1]) - Math.abs(a[1]),
   );
 
@@ -121,4 +119,18 @@ function renderChart() {
   }).render();
 }
 
-renderChart();
\ No newline at end of file
+async function loadCoefficients() {
+  try {
+    const res = await fetch((window.SCRIPT_ROOT || "") + "/api/coefficients");
+    const json = await res.json();
+
+    if (!json.success) throw new Error(json.error);
+
+    renderChart(json.coefficients);
+  } catch (err) {
+    document.getElementById("coeffChart").textContent =
+      "Could not load coefficients: " + err.message;
+  }
+}
+
+loadCoefficients();
\ No newline at end of file
@@ -59,7 +59,7 @@ if (loanForm) {
   submitBtn.textContent = "Analysing...";
 
   try {
-    const response = await fetch("/predict", {
+    const response = await fetch((window.SCRIPT_ROOT || "") + "/predict", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify(data),
@@ -86,7 +86,7 @@ async function runPrediction() {
   if (parseFloat(inputs.loan_amount) <= 0) return;
 
   try {
-    const res = await fetch("/api/simulate", {
+    const res = await fetch((window.SCRIPT_ROOT || "") + "/api/simulate", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify(inputs),
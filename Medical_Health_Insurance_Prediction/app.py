@@ -1,8 +1,7 @@
-from flask import Flask, request, jsonify, render_template, redirect, make_response
-import pickle
-import pandas as pd
-from supabase import create_client
+from flask import Flask, request, jsonify, render_template, redirect, make_response, url_for
 import os
+import sys
+from collections import deque
 from datetime import datetime, timezone
 
 try:
@@ -15,20 +14,241 @@ app = Flask(__name__)
 
 # ── Load Model ─────────────────────────────────────────────────────────────────
 BASE_DIR   = os.path.dirname(os.path.abspath(__file__))
-model_data = pickle.load(open(os.path.join(BASE_DIR, "insurance_model.pkl"), "rb"))
-model      = model_data["model"]
-feature_names = model_data["feature_names"]
-
-# ── Supabase ───────────────────────────────────────────────────────────────────
-supabase = create_client(
-    os.environ.get("SUPABASE_URL"),
-    os.environ.get("SUPABASE_KEY"),
+sys.path.append(os.path.dirname(BASE_DIR))
+from ml_common import sweep
+from ml_common.cache import PredictionCache, TTLCache, feature_key
+from ml_common.executor import InferencePool
+from ml_common.history import HistoryTable
+from ml_common.metrics import instrument, stage
+from ml_common.prediction_log import PredictionLogWriter
+from ml_common.registry import ArtifactWatch, load_pickle, registry
+from ml_common.startup import Startup
+from ml_common.storage import open_storage
+from insurance_scoring import region_map, risk_level, sex_map, smoker_map
+from response_surface import load_surface
+
+# Model and storage client load after boot (STARTUP_MODE), so the static
+# pages answer while they are still loading
+startup = Startup("insurance")
+
+
+# Estimator calls run in worker processes when INFERENCE_PROCESSES > 0
+inference_pool = InferencePool.from_env("insurance")
+
+# Answer in-domain rows from the precomputed response surface
+# (response_surface.py) instead of calling the model
+SURFACE_ENABLED = os.environ.get("INSURANCE_SURFACE", "0") == "1"
+
+
+def load_model():
+    with startup.phase("import"):
+        from ml_common.features import FastModel
+
+    with startup.phase("unpickle"):
+        model_data = registry.load(
+            "insurance", os.path.join(BASE_DIR, "insurance_model.pkl"), load_pickle
+        )
+    # Rows are scored from NumPy arrays in feature_names order, not DataFrames;
+    # fast_model.vector.columns is that order from here on
+    model = inference_pool.attach(
+        FastModel(model_data["model"], model_data["feature_names"], "insurance_model.pkl")
+    )
+
+    # The surface travels with the model it was built from, so a hot reload
+    # never pairs a new model with a stale surface
+    model.surface = None
+    if SURFACE_ENABLED:
+        with startup.phase("surface"):
+            model.surface = load_surface(os.path.join(BASE_DIR, "insurance_model.pkl"))
+    return model
+
+
+# ── Prediction Cache ───────────────────────────────────────────────────────────
+# Memo of model outputs keyed on the encoded feature row
+prediction_cache = PredictionCache.from_env([os.path.join(BASE_DIR, "insurance_model.pkl")])
+
+# A retrained insurance_model.pkl is loaded in the background, checked
+# against its feature_names, and swapped in without a restart
+# (MODEL_RELOAD_INTERVAL)
+fast_model = startup.defer(
+    "model",
+    load_model,
+    watch=ArtifactWatch.from_env(["insurance"]),
+    on_reload=[prediction_cache.clear],
 )
 
-# ── Encoding Maps ──────────────────────────────────────────────────────────────
-sex_map    = {"male": 0, "female": 1}
-smoker_map = {"yes": 1, "no": 0}
-region_map = {"southwest": 1, "southeast": 0, "northwest": 3, "northeast": 2}
+# ── Storage ────────────────────────────────────────────────────────────────────
+
+
+def load_storage():
+    # Supabase, or the embedded SQLite database (STORAGE_BACKEND)
+    with startup.phase("client init"):
+        return open_storage(
+            os.environ.get("SUPABASE_URL"),
+            os.environ.get("SUPABASE_KEY"),
+        )
+
+
+storage = startup.defer("storage", load_storage)
+
+# Predictions are logged from a background thread in bulk inserts
+prediction_log = PredictionLogWriter.from_env(storage, BASE_DIR)
+
+# Keyset-paginated reads of insurance_predictions (dashboard, /api/history)
+prediction_history = HistoryTable(
+    storage,
+    "insurance_predictions",
+    ["age", "sex", "bmi", "children", "smoker", "region", "predicted_charges", "risk_level"],
+)
+
+
+def predict_charges(rows):
+    """Rounded predicted charges for encoded feature dicts, memoized."""
+    # Snapshot so a reload landing mid-call cannot mix model versions
+    model = fast_model.get()
+
+    # In-domain rows are an array index into the surface; the rest are scored
+    if model.surface is not None:
+        looked_up = [model.surface.lookup(row) for row in rows]
+    else:
+        looked_up = [None] * len(rows)
+    pending = [row for row, charges in zip(rows, looked_up) if charges is None]
+    if not pending:
+        return [round(charges, 2) for charges in looked_up]
+
+    keys = [feature_key(row[f] for f in model.vector.columns) for row in pending]
+    rows_by_key = dict(zip(keys, pending))
+
+    def compute(missing):
+        if len(missing) == 1:
+            X = model.vector.fill(rows_by_key[missing[0]])
+        else:
+            X = model.vector.matrix(rows_by_key[k] for k in missing)
+        return [round(float(c), 2) for c in model.predict(X)]
+
+    scored = iter(prediction_cache.cached_many(keys, compute))
+    return [
+        round(charges, 2) if charges is not None else next(scored)
+        for charges in looked_up
+    ]
+
+
+# ── Dashboard Cache ────────────────────────────────────────────────────────────
+# The dashboard aggregates are recomputed from storage at most once per TTL
+# per worker; predictions served by this worker are folded in immediately,
+# except while a recompute is running (it will count them, or the next one)
+DASHBOARD_CACHE_TTL = float(os.environ.get("DASHBOARD_CACHE_TTL", 30))
+DASHBOARD_HISTORY_LIMIT = 10
+# Points on the "charges over time" chart: every prediction, unless
+# DASHBOARD_CHART_POINTS=N limits it to the latest N (unset or 0: all)
+DASHBOARD_CHART_POINTS = int(os.environ.get("DASHBOARD_CHART_POINTS") or 0) or None
+dashboard_cache = TTLCache(DASHBOARD_CACHE_TTL)
+
+DASHBOARD_COLUMNS = (
+    "age, sex, bmi, children, smoker, region, predicted_charges, risk_level, created_at"
+)
+
+
+def empty_dashboard_state():
+    return {
+        "total": 0,
+        "charges_sum": 0.0,
+        "high_cost": 0,
+        "smokers": 0,
+        "distribution": {"Low": 0, "Medium": 0, "High": 0, "Very High": 0},
+        "smoker_sum": 0.0,
+        "smoker_count": 0,
+        "nonsmoker_sum": 0.0,
+        "nonsmoker_count": 0,
+        "charges_over_time": deque(maxlen=DASHBOARD_CHART_POINTS),
+        "age_buckets": {"18-30": 0, "31-45": 0, "46-60": 0, "60+": 0},
+        "history_rows": [],
+    }
+
+
+def add_to_dashboard_state(state, r):
+    """Fold one prediction row into the running dashboard aggregates."""
+    charges = r["predicted_charges"]
+    state["total"] += 1
+    state["charges_sum"] += charges
+    if charges >= 25000:
+        state["high_cost"] += 1
+
+    if r["risk_level"] in state["distribution"]:
+        state["distribution"][r["risk_level"]] += 1
+
+    if r["smoker"] == "yes":
+        state["smokers"] += 1
+        state["smoker_sum"] += charges
+        state["smoker_count"] += 1
+    elif r["smoker"] == "no":
+        state["nonsmoker_sum"] += charges
+        state["nonsmoker_count"] += 1
+
+    age = r["age"]
+    if age <= 30:
+        state["age_buckets"]["18-30"] += 1
+    elif age <= 45:
+        state["age_buckets"]["31-45"] += 1
+    elif age <= 60:
+        state["age_buckets"]["46-60"] += 1
+    else:
+        state["age_buckets"]["60+"] += 1
+    return state
+
+
+def load_dashboard_state():
+    # One pass over the table, newest first, a page of rows at a time; the
+    # first rows double as the history table and the chart points
+    state = empty_dashboard_state()
+    latest = []
+    for r in prediction_history.scan(DASHBOARD_COLUMNS):
+        add_to_dashboard_state(state, r)
+        if len(state["history_rows"]) < DASHBOARD_HISTORY_LIMIT:
+            state["history_rows"].append(r)
+        if DASHBOARD_CHART_POINTS is None or len(latest) < DASHBOARD_CHART_POINTS:
+            latest.append(r["predicted_charges"])
+
+    state["charges_over_time"] = deque(reversed(latest), maxlen=DASHBOARD_CHART_POINTS)
+    return state
+
+
+def record_dashboard_prediction(row):
+    """Update the cached dashboard (if any) with a freshly logged prediction."""
+    row = dict(row, created_at=datetime.now(timezone.utc).isoformat())
+
+    def apply(state):
+        add_to_dashboard_state(state, row)
+        # The chart runs oldest to newest; the oldest point falls off the front
+        state["charges_over_time"].append(row["predicted_charges"])
+        state["history_rows"] = [row] + state["history_rows"][: DASHBOARD_HISTORY_LIMIT - 1]
+        return state
+
+    dashboard_cache.update("dashboard", apply)
+
+
+def dashboard_context(state):
+    total = state["total"]
+    return {
+        "total": total,
+        "avg_charges": round(state["charges_sum"] / total, 2) if total else 0,
+        "high_cost": state["high_cost"],
+        "smokers": state["smokers"],
+        "distribution": dict(state["distribution"]),
+        "smoker_avg": (
+            round(state["smoker_sum"] / state["smoker_count"], 2)
+            if state["smoker_count"]
+            else 0
+        ),
+        "nonsmoker_avg": (
+            round(state["nonsmoker_sum"] / state["nonsmoker_count"], 2)
+            if state["nonsmoker_count"]
+            else 0
+        ),
+        "history_rows": list(state["history_rows"]),
+        "charges_over_time": list(state["charges_over_time"]),
+        "age_buckets": dict(state["age_buckets"]),
+    }
 
 # ── Routes ─────────────────────────────────────────────────────────────────────
 
@@ -45,52 +265,46 @@ def predict_page():
 @app.route("/predict", methods=["POST"])
 def predict():
     try:
-        data = request.json
-
-        age      = int(data["age"])
-        bmi      = float(data["bmi"])
-        children = int(data["children"])
-
-        if not (1 <= age <= 100):
-            return jsonify({"error": "Age must be between 1 and 100"}), 400
-        if not (10 <= bmi <= 60):
-            return jsonify({"error": "BMI must be between 10 and 60"}), 400
-        if not (0 <= children <= 10):
-            return jsonify({"error": "Children must be between 0 and 10"}), 400
-
-        input_df = pd.DataFrame([{
-            "age":      age,
-            "sex":      sex_map[data["sex"].lower()],
-            "bmi":      bmi,
-            "children": children,
-            "smoker":   smoker_map[data["smoker"].lower()],
-            "region":   region_map[data["region"].lower()],
-        }])[feature_names]
-
-        predicted_charges = round(float(model.predict(input_df)[0]), 2)
-
-        if predicted_charges >= 40000:
-            risk = "Very High"
-        elif predicted_charges >= 25000:
-            risk = "High"
-        elif predicted_charges >= 12000:
-            risk = "Medium"
-        else:
-            risk = "Low"
-
-        try:
-            supabase.table("insurance_predictions").insert({
-                "age":               age,
-                "sex":               data["sex"].lower(),
-                "bmi":               bmi,
-                "children":          children,
-                "smoker":            data["smoker"].lower(),
-                "region":            data["region"].lower(),
-                "predicted_charges": predicted_charges,
-                "risk_level":        risk,
-            }).execute()
-        except Exception as db_error:
-            print(f"Database save error: {db_error}")
+        with stage("parse"):
+            data = request.json
+
+            age      = int(data["age"])
+            bmi      = float(data["bmi"])
+            children = int(data["children"])
+
+            if not (1 <= age <= 100):
+                return jsonify({"error": "Age must be between 1 and 100"}), 400
+            if not (10 <= bmi <= 60):
+                return jsonify({"error": "BMI must be between 10 and 60"}), 400
+            if not (0 <= children <= 10):
+                return jsonify({"error": "Children must be between 0 and 10"}), 400
+
+        with stage("encode"):
+            features = {
+                "age":      age,
+                "sex":      sex_map[data["sex"].lower()],
+                "bmi":      bmi,
+                "children": children,
+                "smoker":   smoker_map[data["smoker"].lower()],
+                "region":   region_map[data["region"].lower()],
+            }
+
+        predicted_charges = predict_charges([features])[0]
+
+        risk = risk_level(predicted_charges)
+
+        record = {
+            "age":               age,
+            "sex":               data["sex"].lower(),
+            "bmi":               bmi,
+            "children":          children,
+            "smoker":            data["smoker"].lower(),
+            "region":            data["region"].lower(),
+            "predicted_charges": predicted_charges,
+            "risk_level":        risk,
+        }
+        prediction_log.submit("insurance_predictions", record)
+        record_dashboard_prediction(record)
 
         return jsonify({"predicted_charges": predicted_charges, "risk_level": risk})
 
@@ -103,142 +317,117 @@ def simulate_page():
     return render_template("simulate.html")
 
 
+def simulate_features(data):
+    """Model inputs for a simulator scenario, filling defaults for missing fields."""
+    return {
+        "age":      int(data.get("age", 30)),
+        "sex":      sex_map.get(str(data.get("sex", "male")).lower(), 0),
+        "bmi":      float(data.get("bmi", 25)),
+        "children": int(data.get("children", 0)),
+        "smoker":   smoker_map.get(str(data.get("smoker", "no")).lower(), 0),
+        "region":   region_map.get(str(data.get("region", "southeast")).lower(), 0),
+    }
+
+
+SWEEP_FIELDS = ["age", "bmi", "children", "sex", "smoker", "region"]
+
+
 @app.route("/simulate", methods=["POST"])
 def simulate():
     try:
-        data = request.json
-
-        age      = int(data.get("age", 30))
-        bmi      = float(data.get("bmi", 25))
-        children = int(data.get("children", 0))
-        sex      = data.get("sex", "male").lower()
-        smoker   = data.get("smoker", "no").lower()
-        region   = data.get("region", "southeast").lower()
-
-        input_df = pd.DataFrame([{
-            "age":      age,
-            "sex":      sex_map.get(sex, 0),
-            "bmi":      bmi,
-            "children": children,
-            "smoker":   smoker_map.get(smoker, 0),
-            "region":   region_map.get(region, 0),
-        }])[feature_names]
-
-        predicted = round(float(model.predict(input_df)[0]), 2)
-
-        if predicted >= 40000:   risk = "Very High"
-        elif predicted >= 25000: risk = "High"
-        elif predicted >= 12000: risk = "Medium"
-        else:                    risk = "Low"
+        with stage("parse"):
+            data = request.json
+        with stage("encode"):
+            features = simulate_features(data)
+
+        predicted = predict_charges([features])[0]
+        risk = risk_level(predicted)
 
         return jsonify({"predicted_charges": predicted, "risk_level": risk})
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+
+@app.route("/simulate/sweep", methods=["POST"])
+def simulate_sweep():
+    """
+    Score a base scenario across one or two varying fields in one model call.
+
+    Body: {"base": {...}, "axes": [{"field": "age", "start": 18, "stop": 64,
+    "steps": 47}, {"field": "bmi", "values": [20, 25, 30, 35]}]}
+    Grids are returned row-major: grid[i][j] is axes[0][i] x axes[1][j].
+    """
+    try:
+        with stage("parse"):
+            data = request.json or {}
+            axes = sweep.parse_axes(data.get("axes"), SWEEP_FIELDS)
+            scenarios = sweep.expand(data.get("base") or {}, axes)
+        with stage("encode"):
+            rows = [simulate_features(scenario) for scenario in scenarios]
+    except (ValueError, KeyError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        charges = predict_charges(rows)
+
+        return jsonify(
+            {
+                "axes": sweep.describe(axes),
+                "predicted_charges": sweep.reshape(charges, axes),
+                "risk_level": sweep.reshape([risk_level(c) for c in charges], axes),
+            }
+        )
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route("/risk")
 def risk_page():
     return render_template("risk.html")
 
 @app.route("/history")
 def history():
-    return redirect("/dashboard")
+    return redirect(url_for("dashboard"))
 
 
-@app.route("/dashboard")
-def dashboard():
+@app.route("/api/history")
+def api_history():
+    """Logged predictions, newest first (?limit=, ?cursor=, ?columns=)."""
     try:
-        response = (
-            supabase.table("insurance_predictions")
-            .select(
-                "age, sex, bmi, children, smoker, region, predicted_charges, risk_level, created_at"
-            )
-            .order("created_at", desc=False)
-            .execute()
-        )
-        records = response.data
-
-        total = len(records)
-        avg_charges = (
-            round(sum(r["predicted_charges"] for r in records) / total, 2)
-            if total
-            else 0
-        )
-        high_cost = sum(1 for r in records if r["predicted_charges"] >= 25000)
-        smokers = sum(1 for r in records if r["smoker"] == "yes")
-
-        distribution = {"Low": 0, "Medium": 0, "High": 0, "Very High": 0}
-        for r in records:
-            level = r["risk_level"]
-            if level in distribution:
-                distribution[level] += 1
-
-        smoker_charges = [
-            r["predicted_charges"] for r in records if r["smoker"] == "yes"
-        ]
-        nonsmoker_charges = [
-            r["predicted_charges"] for r in records if r["smoker"] == "no"
-        ]
-        smoker_avg = (
-            round(sum(smoker_charges) / len(smoker_charges), 2) if smoker_charges else 0
-        )
-        nonsmoker_avg = (
-            round(sum(nonsmoker_charges) / len(nonsmoker_charges), 2)
-            if nonsmoker_charges
-            else 0
-        )
+        return jsonify(prediction_history.page_from_args(request.args))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        charges_over_time = [r["predicted_charges"] for r in records]
-
-        age_buckets = {"18-30": 0, "31-45": 0, "46-60": 0, "60+": 0}
-        for r in records:
-            age = r["age"]
-            if age <= 30:
-                age_buckets["18-30"] += 1
-            elif age <= 45:
-                age_buckets["31-45"] += 1
-            elif age <= 60:
-                age_buckets["46-60"] += 1
-            else:
-                age_buckets["60+"] += 1
-
-        history_response = (
-            supabase.table("insurance_predictions")
-            .select(
-                "age, sex, bmi, children, smoker, region, predicted_charges, risk_level, created_at"
-            )
-            .order("created_at", desc=True)
-            .limit(10)
-            .execute()
-        )
-        history_rows = history_response.data
 
+@app.route("/dashboard")
+def dashboard():
+    try:
+        state = dashboard_cache.get("dashboard", load_dashboard_state)
     except Exception as e:
         print(f"Dashboard fetch error: {e}")
-        total = avg_charges = high_cost = smokers = smoker_avg = nonsmoker_avg = 0
-        distribution = {"Low": 0, "Medium": 0, "High": 0, "Very High": 0}
-        charges_over_time = []
-        age_buckets = {"18-30": 0, "31-45": 0, "46-60": 0, "60+": 0}
-        history_rows = []
+        state = empty_dashboard_state()
 
     resp = make_response(
-        render_template(
-            "dashboard.html",
-            total=total,
-            avg_charges=avg_charges,
-            high_cost=high_cost,
-            smokers=smokers,
-            distribution=distribution,
-            smoker_avg=smoker_avg,
-            nonsmoker_avg=nonsmoker_avg,
-            history_rows=history_rows,
-            charges_over_time=charges_over_time,
-            age_buckets=age_buckets,
-        )
+        render_template("dashboard.html", **dashboard_context(state))
     )
     resp.headers["Cache-Control"] = "no-store"
     return resp
 
 # ── Run ────────────────────────────────────────────────────────────────────────
+# Stage timings, request latency and cache / writer / startup stats at /metrics
+instrument(
+    app,
+    "insurance",
+    inference_pool=inference_pool.stats,
+    prediction_cache=prediction_cache.stats,
+    prediction_log=prediction_log.stats,
+    startup=startup.stats,
+)
+
+startup.warm()
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000)
@@ -0,0 +1,42 @@
+"""
+Insurance model encodings and risk bands, shared by app.py and the bulk
+CSV scorer (python -m ml_common.scoring insurance ...).
+"""
+
+# ── Encoding Maps ──────────────────────────────────────────────────────────────
+sex_map    = {"male": 0, "female": 1}
+smoker_map = {"yes": 1, "no": 0}
+region_map = {"southwest": 1, "southeast": 0, "northwest": 3, "northeast": 2}
+
+CATEGORICAL_COLUMNS = {"sex": sex_map, "smoker": smoker_map, "region": region_map}
+NUMERIC_COLUMNS = ["age", "bmi", "children"]
+
+
+def risk_level(charges):
+    if charges >= 40000:   return "Very High"
+    elif charges >= 25000: return "High"
+    elif charges >= 12000: return "Medium"
+    else:                  return "Low"
+
+
+def encode_frame(frame):
+    """
+    (float feature frame keyed by model feature, per-row error messages)
+    for insurance.csv-shaped rows; unknown categories are row errors, as
+    they are for /predict.
+    """
+    import pandas as pd
+
+    missing = [c for c in [*NUMERIC_COLUMNS, *CATEGORICAL_COLUMNS] if c not in frame.columns]
+    if missing:
+        raise ValueError(f"Input is missing column(s): {', '.join(missing)}")
+
+    X = pd.DataFrame(index=frame.index)
+    errors = pd.Series("", index=frame.index)
+    for col in NUMERIC_COLUMNS:
+        X[col] = pd.to_numeric(frame[col], errors="coerce")
+        errors[X[col].isna() & (errors == "")] = f"Invalid numeric value for {col}"
+    for col, mapping in CATEGORICAL_COLUMNS.items():
+        X[col] = frame[col].str.strip().str.lower().map(mapping)
+        errors[X[col].isna() & (errors == "")] = f"Unknown value for {col}"
+    return X.astype("float64"), errors
@@ -0,0 +1,293 @@
+"""
+Precomputed response surface of the insurance model.
+
+/predict only accepts age 1-100, children 0-10 and bmi 10-60, and sex,
+smoker and region each take a handful of encoded values. A tree ensemble
+is piecewise constant in bmi between its split thresholds, so over that
+domain the model has a finite number of distinct answers. This module
+evaluates the model once per (age, children, sex, smoker, region, bmi
+interval) and stores the results in an array:
+
+    insurance_surface.npy    predictions, indexed by the encoded inputs
+    insurance_surface.json   bmi thresholds, domain, model file SHA-256
+
+With INSURANCE_SURFACE=1 the app answers rows inside the domain with an
+array index instead of a model call (rows outside it, e.g. from the
+simulator, still go to the model). The surface is only used with the
+exact insurance_model.pkl it was built from; after retraining, build it
+again:
+
+    python response_surface.py build
+    python response_surface.py verify     # compare with the live model
+
+Thresholds are compared the way the model compares them: XGBoost sends
+x < split left in float32, sklearn trees send float32(x) <= threshold left.
+"""
+
+import argparse
+import bisect
+import json
+import os
+import sys
+
+from insurance_scoring import region_map, sex_map, smoker_map
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(BASE_DIR, "insurance_model.pkl")
+SURFACE_PATH = os.path.join(BASE_DIR, "insurance_surface")
+
+# The domain /predict validates; dimension order of the table, bmi last
+DISCRETE = {
+    "age": list(range(1, 101)),
+    "children": list(range(0, 11)),
+    "sex": sorted(set(sex_map.values())),
+    "smoker": sorted(set(smoker_map.values())),
+    "region": sorted(set(region_map.values())),
+}
+BMI_RANGE = (10.0, 60.0)
+
+
+def _f32(value):
+    import numpy as np
+
+    return float(np.float32(value))
+
+
+def _xgboost_thresholds(estimator, index):
+    # The JSON model keeps split values exactly (shortest float32 repr);
+    # leaves are the nodes whose left child is -1
+    model = json.loads(estimator.get_booster().save_raw("json"))
+    booster = model["learner"]["gradient_booster"]
+    trees = (booster.get("model") or booster["gbtree"]["model"])["trees"]
+    found = set()
+    for tree in trees:
+        for feature, condition, left in zip(
+            tree["split_indices"], tree["split_conditions"], tree["left_children"]
+        ):
+            if left != -1 and feature == index:
+                found.add(_f32(condition))
+    return sorted(found), "right"
+
+
+def _sklearn_thresholds(estimator, index):
+    import numpy as np
+
+    trees = getattr(estimator, "estimators_", None)
+    if trees is None:
+        trees = [estimator] if hasattr(estimator, "tree_") else None
+    if trees is None:
+        raise ValueError(
+            f"{type(estimator).__name__} is not a tree model; it has no response surface"
+        )
+    found = set()
+    for tree in np.ravel(trees):
+        nodes = tree.tree_
+        found.update(float(t) for t in nodes.threshold[nodes.feature == index])
+    return sorted(found), "left"
+
+
+def bmi_thresholds(estimator, columns):
+    """
+    (sorted bmi split values, side): a bmi equal to a split value falls in
+    the interval to its right for side "right" (XGBoost), left for "left".
+    """
+    index = list(columns).index("bmi")
+    if hasattr(estimator, "get_booster"):
+        return _xgboost_thresholds(estimator, index)
+    return _sklearn_thresholds(estimator, index)
+
+
+class ResponseSurface:
+    """Lookup of precomputed predictions for rows inside the domain."""
+
+    def __init__(self, table, meta):
+        self.table = table
+        self.meta = meta
+        self.thresholds = meta["thresholds"]
+        self.first = meta["first_interval"]
+        self._bisect = bisect.bisect_right if meta["side"] == "right" else bisect.bisect_left
+        # Encoded value -> position along each dimension
+        self._positions = [
+            (name, {value: i for i, value in enumerate(values)})
+            for name, values in meta["domain"].items()
+        ]
+
+    def interval(self, bmi):
+        return self._bisect(self.thresholds, _f32(bmi)) - self.first
+
+    def lookup(self, row):
+        """Model output for an encoded feature dict, or None outside the domain."""
+        try:
+            index = tuple(positions[row[name]] for name, positions in self._positions)
+            bmi = float(row["bmi"])
+        except (KeyError, TypeError, ValueError):
+            return None
+        if not BMI_RANGE[0] <= bmi <= BMI_RANGE[1]:
+            return None
+        return float(self.table[index + (self.interval(bmi),)])
+
+
+def _interval_points(thresholds, side):
+    """
+    (first interval index, lowest bmi of every interval in BMI_RANGE,
+    highest bmi of every interval in BMI_RANGE), as float32 values.
+    """
+    import numpy as np
+
+    find = bisect.bisect_right if side == "right" else bisect.bisect_left
+    lo, hi = _f32(BMI_RANGE[0]), _f32(BMI_RANGE[1])
+    first, last = find(thresholds, lo), find(thresholds, hi)
+
+    def above(t):
+        # Smallest float32 that lands right of threshold t
+        x = np.float32(t)
+        if side == "left" and float(x) <= t:
+            x = np.nextafter(x, np.float32(np.inf))
+        return float(x)
+
+    def below(t):
+        # Largest float32 that lands left of threshold t
+        x = np.float32(t)
+        if side == "right" or float(x) > t:
+            x = np.nextafter(x, np.float32(-np.inf))
+        return float(x)
+
+    starts = [lo] + [above(thresholds[k - 1]) for k in range(first + 1, last + 1)]
+    ends = [below(thresholds[k]) for k in range(first, last)] + [hi]
+    for k, (start, end) in enumerate(zip(starts, ends), start=first):
+        assert find(thresholds, start) == k and find(thresholds, end) == k, (k, start, end)
+    return first, starts, ends
+
+
+def _grid(columns, age, bmis):
+    """Feature matrix for one age: every discrete combination x every bmi."""
+    import numpy as np
+
+    names = [n for n in DISCRETE if n != "age"] + ["bmi"]
+    mesh = np.meshgrid(*[DISCRETE[n] for n in names[:-1]], bmis, indexing="ij")
+    values = {n: m.ravel() for n, m in zip(names, mesh)}
+    values["age"] = np.full(values["bmi"].shape, age)
+    return np.column_stack([values[c] for c in columns]).astype(np.float64)
+
+
+def _evaluate(model, bmis):
+    """Model outputs over the whole domain for the given bmi per interval."""
+    import numpy as np
+
+    shape = tuple(len(v) for v in DISCRETE.values()) + (len(bmis),)
+    table = None
+    for i, age in enumerate(DISCRETE["age"]):
+        out = np.asarray(model.predict(_grid(model.vector.columns, age, bmis)))
+        if table is None:
+            table = np.empty(shape, dtype=out.dtype)
+        table[i] = out.reshape(shape[1:])
+    return table
+
+
+def build(model, model_path=MODEL_PATH, path=SURFACE_PATH):
+    """Evaluate model over the domain and write <path>.npy / <path>.json."""
+    import numpy as np
+    from ml_common.registry import file_digest
+
+    thresholds, side = bmi_thresholds(model.model, model.vector.columns)
+    first, starts, _ = _interval_points(thresholds, side)
+    table = _evaluate(model, starts)
+
+    meta = {
+        "model_sha256": file_digest(model_path),
+        "columns": list(model.vector.columns),
+        "domain": DISCRETE,
+        "bmi_range": list(BMI_RANGE),
+        "thresholds": thresholds,
+        "side": side,
+        "first_interval": first,
+        "shape": list(table.shape),
+    }
+    np.save(path + ".npy", table)
+    with open(path + ".json", "w") as f:
+        json.dump(meta, f)
+    return table, meta
+
+
+def load_surface(model_path=MODEL_PATH, path=SURFACE_PATH):
+    """
+    The surface built from the model file at model_path, or None (with a
+    message) if it is missing or was built from another version.
+    """
+    import numpy as np
+    from ml_common.registry import file_digest
+
+    try:
+        with open(path + ".json") as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        print(f"[surface] {os.path.basename(path)}.json not found; run response_surface.py build")
+        return None
+    if meta["model_sha256"] != file_digest(model_path):
+        print("[surface] built from another insurance_model.pkl; run response_surface.py build")
+        return None
+    # Memory-mapped: gunicorn workers share one page-cache copy
+    return ResponseSurface(np.load(path + ".npy", mmap_mode="r"), meta)
+
+
+def verify(model, surface, samples=100000, seed=0):
+    """
+    Compare the surface with the live model: every cell at both ends of
+    its bmi interval, then random rows (continuous bmi) through lookup().
+    Returns the number of mismatches.
+    """
+    import numpy as np
+
+    meta = surface.meta
+    if meta["columns"] != list(model.vector.columns):
+        raise ValueError("The model's columns differ from the surface's")
+    first, starts, ends = _interval_points(*bmi_thresholds(model.model, model.vector.columns))
+    if first != surface.first or len(starts) != surface.table.shape[-1]:
+        raise ValueError("The model's bmi splits differ from the surface's")
+
+    table = np.asarray(surface.table)
+    mismatches = 0
+    for label, bmis in (("interval starts", starts), ("interval ends", ends)):
+        bad = int(np.count_nonzero(_evaluate(model, bmis) != table))
+        print(f"{label}: {table.size} cells, {bad} mismatches")
+        mismatches += bad
+
+    rng = np.random.default_rng(seed)
+    rows = [
+        {
+            **{name: values[rng.integers(len(values))] for name, values in DISCRETE.items()},
+            "bmi": float(rng.uniform(*BMI_RANGE)),
+        }
+        for _ in range(samples)
+    ]
+    expected = np.asarray(model.predict(model.vector.matrix(rows)))
+    looked_up = np.array([surface.lookup(row) for row in rows], dtype=expected.dtype)
+    bad = int(np.count_nonzero(looked_up != expected))
+    print(f"random rows: {samples}, {bad} mismatches")
+    return mismatches + bad
+
+
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(BASE_DIR))
+    from ml_common.scoring import load_fast_model
+
+    parser = argparse.ArgumentParser(description="Insurance model response surface")
+    parser.add_argument("command", choices=["build", "verify"])
+    parser.add_argument("--samples", type=int, default=100000,
+                        help="random rows checked by verify (default 100000)")
+    args = parser.parse_args()
+
+    model = load_fast_model("insurance")
+    if args.command == "build":
+        table, meta = build(model)
+        print(
+            f"Wrote {SURFACE_PATH}.npy: {table.size} cells, "
+            f"{len(meta['thresholds'])} bmi splits, {table.nbytes / 1e6:.1f} MB"
+        )
+    else:
+        surface = load_surface()
+        if surface is None:
+            sys.exit(1)
+        mismatches = verify(model, surface, args.samples)
+        print("OK: surface equals the model" if not mismatches else f"FAILED: {mismatches} mismatches")
+        sys.exit(1 if mismatches else 0)
@@ -33,7 +33,7 @@ document
     };
 
     try {
-      const response = await fetch("/predict", {
+      const response = await fetch((window.SCRIPT_ROOT || "") + "/predict", {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify(data),
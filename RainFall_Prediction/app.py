@@ -1,20 +1,87 @@
-from flask import Flask, render_template, request
-import joblib
-import pandas as pd
-from supabase import create_client
 from flask import Flask, render_template, request, jsonify
 #from dotenv import load_dotenv
 import os
+import sys
 
 #load_dotenv()
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(BASE_DIR))
+from ml_common.cache import PredictionCache, feature_key
+from ml_common.executor import InferencePool
+from ml_common.history import HistoryTable
+from ml_common.inference import BinaryClassifier
+from ml_common.metrics import instrument, stage
+from ml_common.prediction_log import PredictionLogWriter
+from ml_common.registry import ArtifactWatch, registry
+from ml_common.startup import Startup
+from ml_common.storage import open_storage
+from rainfall_scoring import FEATURES, rain_label
+
 app = Flask(__name__)
 
-# Load trained model
-model = joblib.load("rainfall_model.pkl")
+# Model and storage client load after boot (STARTUP_MODE), so the static
+# pages answer while they are still loading
+startup = Startup("rainfall")
+
+# Estimator calls run in worker processes when INFERENCE_PROCESSES > 0
+inference_pool = InferencePool.from_env("rainfall")
+
+
+def load_model():
+    with startup.phase("import"):
+        import joblib
+        from ml_common.features import FastModel
+
+    # Load trained model
+    with startup.phase("unpickle"):
+        model = registry.load("rainfall", os.path.join(BASE_DIR, "rainfall_model.pkl"), joblib.load)
+
+    # Single rows are scored from a reusable NumPy buffer instead of a DataFrame
+    fast_model = inference_pool.attach(FastModel(model, FEATURES, "rainfall_model.pkl"))
+
+    # Decision threshold on the rain probability (RAINFALL_THRESHOLD, default 0.5)
+    return BinaryClassifier.from_env(fast_model, "RAINFALL_THRESHOLD")
+
+
+def load_storage():
+    # Supabase, or the embedded SQLite database (STORAGE_BACKEND)
+    with startup.phase("client init"):
+        return open_storage(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+
+
+# Memo of model outputs keyed on the input row (what-if page repeats a lot)
+prediction_cache = PredictionCache.from_env([os.path.join(BASE_DIR, "rainfall_model.pkl")])
+
+# A retrained rainfall_model.pkl is loaded in the background, checked, and
+# swapped in without a restart (MODEL_RELOAD_INTERVAL)
+classifier = startup.defer(
+    "model",
+    load_model,
+    watch=ArtifactWatch.from_env(["rainfall"]),
+    on_reload=[prediction_cache.clear],
+)
+
+# Init storage client
+storage = startup.defer("storage", load_storage)
+
+# Predictions are logged from a background thread in bulk inserts
+prediction_log = PredictionLogWriter.from_env(storage, BASE_DIR)
+
+# Keyset-paginated reads of the logged predictions (/api/history)
+prediction_history = HistoryTable(storage, "rain_predictions", FEATURES + ["prediction", "probability"])
 
-# Init Supabase client
-supabase = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+
+def predict_rainfall(input_data):
+    """Return (rain expected?, rain probability) for one ordered feature row."""
+
+    model = classifier.get()
+
+    def compute():
+        return float(model.probabilities(model.model.vector.fill(input_data))[0])
+
+    probability = prediction_cache.cached(feature_key(input_data), compute)
+    return model.is_positive(probability), probability
 
 
 @app.route("/")
@@ -30,35 +97,15 @@ def predict_page():
 @app.route("/result", methods=["POST"])
 def result():
     try:
-        input_data = [
-            float(request.form["pressure"]),
-            float(request.form["dewpoint"]),
-            float(request.form["humidity"]),
-            float(request.form["cloud"]),
-            float(request.form["sunshine"]),
-            float(request.form["winddirection"]),
-            float(request.form["windspeed"]),
-        ]
-
-        input_df = pd.DataFrame(
-            [input_data],
-            columns=[
-                "pressure",
-                "dewpoint",
-                "humidity",
-                "cloud",
-                "sunshine",
-                "winddirection",
-                "windspeed",
-            ],
-        )
+        with stage("parse"):
+            input_data = [float(request.form[f]) for f in FEATURES]
 
-        prediction = model.predict(input_df)[0]
-        probability = model.predict_proba(input_df)[0][1]
-        result_text = "Rainfall Expected" if prediction == 1 else "No Rainfall Expected"
+        rain, probability = predict_rainfall(input_data)
+        result_text = rain_label(rain)
 
-        # Store in Supabase
-        supabase.table("rain_predictions").insert(
+        # Store the prediction (queued, written in the background)
+        prediction_log.submit(
+            "rain_predictions",
             {
                 "pressure": input_data[0],
                 "dewpoint": input_data[1],
@@ -69,8 +116,8 @@ def result():
                 "windspeed": input_data[6],
                 "prediction": result_text,
                 "probability": round(probability * 100, 2),
-            }
-        ).execute()
+            },
+        )
 
         return render_template(
             "result.html",
@@ -91,29 +138,15 @@ def whatif_page():
 @app.route("/api/predict", methods=["POST"])
 def api_predict():
     try:
-        data = request.get_json()
-        input_df = pd.DataFrame(
-            [
-                {
-                    "pressure": float(data["pressure"]),
-                    "dewpoint": float(data["dewpoint"]),
-                    "humidity": float(data["humidity"]),
-                    "cloud": float(data["cloud"]),
-                    "sunshine": float(data["sunshine"]),
-                    "winddirection": float(data["winddirection"]),
-                    "windspeed": float(data["windspeed"]),
-                }
-            ]
-        )
+        with stage("parse"):
+            data = request.get_json()
+            input_data = [float(data[f]) for f in FEATURES]
 
-        prediction = model.predict(input_df)[0]
-        probability = model.predict_proba(input_df)[0][1]
+        rain, probability = predict_rainfall(input_data)
 
         return jsonify(
             {
-                "prediction": (
-                    "Rainfall Expected" if prediction == 1 else "No Rainfall Expected"
-                ),
+                "prediction": rain_label(rain),
                 "probability": round(probability * 100, 2),
             }
         )
@@ -121,5 +154,28 @@ def api_predict():
         return jsonify({"error": str(e)}), 400
 
 
+@app.route("/api/history")
+def api_history():
+    """Logged predictions, newest first: ?limit=&cursor=&columns= (see ml_common/history.py)."""
+    try:
+        return jsonify(prediction_history.page_from_args(request.args))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# Stage timings, request latency and cache / writer / startup stats at /metrics
+instrument(
+    app,
+    "rainfall",
+    inference_pool=inference_pool.stats,
+    prediction_cache=prediction_cache.stats,
+    prediction_log=prediction_log.stats,
+    startup=startup.stats,
+)
+
+startup.warm()
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000)
\ No newline at end of file
@@ -0,0 +1,34 @@
+"""
+Rainfall model inputs and labels, shared by app.py and the bulk CSV
+scorer (python -m ml_common.scoring rainfall ...).
+"""
+
+FEATURES = [
+    "pressure",
+    "dewpoint",
+    "humidity",
+    "cloud",
+    "sunshine",
+    "winddirection",
+    "windspeed",
+]
+
+
+def rain_label(rain):
+    return "Rainfall Expected" if rain else "No Rainfall Expected"
+
+
+def encode_frame(frame):
+    """(float feature frame in FEATURES order, per-row error messages)."""
+    import pandas as pd
+
+    missing = [f for f in FEATURES if f not in frame.columns]
+    if missing:
+        raise ValueError(f"Input is missing column(s): {', '.join(missing)}")
+
+    X = frame[FEATURES].apply(pd.to_numeric, errors="coerce").astype("float64")
+    errors = pd.Series("", index=frame.index)
+    bad = X.isna()
+    for f in FEATURES:
+        errors[bad[f] & (errors == "")] = f"Invalid numeric value for {f}"
+    return X, errors
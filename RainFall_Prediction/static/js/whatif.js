@@ -71,7 +71,7 @@ async function fetchPrediction() {
   });
 
   try {
-    const res = await fetch("/api/predict", {
+    const res = await fetch((window.SCRIPT_ROOT || "") + "/api/predict", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify(payload),
@@ -0,0 +1,112 @@
+"""
+Load time and memory of each model artifact: the original pickle against
+the converted copy written by `python -m ml_common.artifacts convert`.
+
+Every load runs in a fresh interpreter with the libraries already imported,
+so the numbers cover deserialization only. RSS counts memory-mapped file
+pages, which the page cache shares between workers; "private" is the part
+each worker holds on its own (Linux only, from /proc/self/smaps_rollup).
+
+Usage:
+    python -m ml_common.artifacts convert
+    python benchmarks/artifact_loading.py [--repeat 5] [--app churn]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ml_common import artifacts  # noqa: E402
+
+
+def memory_kb():
+    """(rss, private) in kB for this process; private is None off Linux."""
+    rss = private = None
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        rss = int(fields["Rss"].split()[0])
+        private = int(fields["Private_Clean"].split()[0]) + int(fields["Private_Dirty"].split()[0])
+    except (OSError, KeyError, ValueError):
+        import resource
+
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss, private
+
+
+def child(path, fmt):
+    import joblib
+
+    for module in ("sklearn.ensemble", "sklearn.linear_model", "sklearn.preprocessing", "xgboost"):
+        try:
+            __import__(module)
+        except ImportError:
+            pass
+
+    rss_before, private_before = memory_kb()
+    start = time.perf_counter()
+    if fmt == artifacts.PICKLE_FORMAT:
+        joblib.load(path)
+    else:
+        artifacts.load_artifact(path, joblib.load)
+    seconds = time.perf_counter() - start
+    rss_after, private_after = memory_kb()
+
+    print(json.dumps({
+        "seconds": seconds,
+        "rss_kb": rss_after - rss_before,
+        "private_kb": None if private_before is None else private_after - private_before,
+    }))
+
+
+def measure(path, fmt, repeat):
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", path, fmt],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+    private = [r["private_kb"] for r in runs if r["private_kb"] is not None]
+    return (
+        statistics.median(r["seconds"] for r in runs) * 1000,
+        statistics.median(r["rss_kb"] for r in runs),
+        statistics.median(private) if private else float("nan"),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--app", choices=sorted(artifacts.ARTIFACTS), action="append")
+    parser.add_argument("--child", nargs=2, metavar=("PATH", "FORMAT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    print(f"{'artifact':<42} {'format':<12} {'load ms':>9} {'RSS kB':>9} {'private kB':>11}")
+    for _, path in artifacts.artifact_paths(args.app):
+        relative = os.path.relpath(path, ROOT)
+        if not os.path.exists(path):
+            print(f"{relative:<42} missing, skipped")
+            continue
+        _, fmt = artifacts.resolve(path)
+        formats = [artifacts.PICKLE_FORMAT] + ([fmt] if fmt != artifacts.PICKLE_FORMAT else [])
+        for name in formats:
+            ms, rss, private = measure(path, name, args.repeat)
+            print(f"{relative:<42} {name:<12} {ms:>9.2f} {rss:>9.0f} {private:>11.0f}")
+        if fmt == artifacts.PICKLE_FORMAT:
+            print(f"{'':<42} (not converted; run python -m ml_common.artifacts convert)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Rows/sec of the churn categorical encoding: per-cell LabelEncoder.transform
+(the original app.py path) against the precompiled CategoryEncoder.
+
+Usage:
+    python benchmarks/churn_encoding.py [--rows 7043] [--repeat 3]
+"""
+
+import argparse
+import os
+import pickle
+import sys
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHURN_DIR = os.path.join(ROOT, "Customer_Churn")
+sys.path.insert(0, CHURN_DIR)
+
+from category_encoding import CategoryEncoder  # noqa: E402
+
+
+def legacy_encode(df, encoders):
+    """The per-cell encoding previously used in Customer_Churn/app.py."""
+    for col, enc in encoders.items():
+        if col in df.columns:
+            df[col] = df[col].apply(
+                lambda x: enc.transform([x])[0] if x in enc.classes_ else -1
+            )
+    return df
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=None, help="rows to encode (default: whole CSV)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    encoders = pickle.load(open(os.path.join(CHURN_DIR, "encoders.pkl"), "rb"))
+    data = pd.read_csv(os.path.join(CHURN_DIR, "WA_Fn-UseC_-Telco-Customer-Churn.csv"))
+    data = data[[c for c in data.columns if c in encoders]]
+    if args.rows:
+        data = pd.concat([data] * (args.rows // len(data) + 1), ignore_index=True).head(args.rows)
+    # A few unseen values so the -1 fallback is exercised too
+    data.iloc[::97, 0] = "Unknown"
+
+    build_time, encoder = timed(lambda: CategoryEncoder(encoders), 1)
+    legacy_time, legacy = timed(lambda: legacy_encode(data.copy(), encoders), args.repeat)
+    frame_time, fast = timed(lambda: encoder.encode_frame(data.copy()), args.repeat)
+
+    records = data.head(1000).to_dict("records")
+    record_time, _ = timed(lambda: [encoder.encode_record(r) for r in records], args.repeat)
+    legacy_record_time, _ = timed(
+        lambda: [legacy_encode(pd.DataFrame([r]), encoders) for r in records[:100]],
+        args.repeat,
+    )
+
+    assert legacy.astype("int64").equals(fast), "encodings differ"
+
+    rows = len(data)
+    print(f"rows: {rows}, categorical columns: {len(encoders)}")
+    print(f"lookup table build:          {build_time * 1000:10.2f} ms")
+    print(f"legacy frame encode:         {rows / legacy_time:12,.0f} rows/sec")
+    print(f"precompiled frame encode:    {rows / frame_time:12,.0f} rows/sec"
+          f"  ({legacy_time / frame_time:.0f}x)")
+    print(f"legacy single-row encode:    {100 / legacy_record_time:12,.0f} rows/sec")
+    print(f"precompiled encode_record:   {len(records) / record_time:12,.0f} rows/sec")
+
+
+if __name__ == "__main__":
+    main()
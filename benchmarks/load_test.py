@@ -0,0 +1,484 @@
+"""
+Throughput and latency of every prediction route, through the gateway.
+
+Each app's routes are driven with inputs built from its bundled CSV
+(Rainfall.csv, the Telco churn CSV, Train.csv, loan.csv, insurance.csv),
+either in-process with the Flask test client or over HTTP against a real
+`gunicorn --preload gateway:app`. Storage is a throwaway SQLite database
+(STORAGE_BACKEND=sqlite in a temporary directory), so no Supabase project
+is touched and database latency is local. The write routes run first and
+their logged rows are flushed, so the dashboards and history pages are
+measured over real data.
+
+Every response is checked: an HTTP error, or a 200 whose body is not
+what the route should return (an error page, a JSON error, a dashboard
+with no predictions), counts as an error, so error paths are never timed
+as successes. Results (requests/s, p50/p95/p99 ms, errors per route) are
+printed and saved as JSON under benchmarks/results/; pass an earlier file to --compare
+to print the change per route.
+
+Usage:
+    python benchmarks/load_test.py [--mode client|gunicorn] [--app loan]
+        [--requests 500] [--concurrency 1] [--workers 4]
+        [--output results.json] [--compare benchmarks/results/<earlier>.json]
+"""
+
+import argparse
+import csv
+import datetime
+import http.client
+import json
+import math
+import os
+import platform
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+# ── Inputs ─────────────────────────────────────────────────────────────────────
+
+def read_csv(relative):
+    """CSV rows with stripped header names; rows with an empty cell are skipped."""
+    with open(os.path.join(ROOT, relative), newline="", encoding="utf-8-sig") as f:
+        rows = []
+        for row in csv.DictReader(f):
+            row = {k.strip(): (v or "").strip() for k, v in row.items() if k}
+            if all(row.values()):
+                rows.append(row)
+    return rows
+
+
+RAINFALL_FEATURES = ["pressure", "dewpoint", "humidity", "cloud", "sunshine", "winddirection", "windspeed"]
+
+
+def rainfall_input(row):
+    return {f: float(row[f]) for f in RAINFALL_FEATURES}
+
+
+CHURN_NUMERIC = ["SeniorCitizen", "tenure", "MonthlyCharges", "TotalCharges"]
+
+
+def churn_input(row):
+    record = {k: v for k, v in row.items() if k not in ("customerID", "Churn")}
+    for f in CHURN_NUMERIC:
+        record[f] = float(record[f])
+    return record
+
+
+def bigmart_input(row):
+    record = {k: v for k, v in row.items() if k not in ("Item_Identifier", "Item_Outlet_Sales")}
+    for f in ("Item_Weight", "Item_Visibility", "Item_MRP"):
+        record[f] = float(record[f])
+    record["Outlet_Establishment_Year"] = int(record["Outlet_Establishment_Year"])
+    return record
+
+
+def loan_input(row):
+    return {
+        "gender": row["Gender"],
+        "married": row["Married"],
+        "dependents": int(row["Dependents"].rstrip("+")),
+        "education": row["Education"],
+        "self_employed": row["Self_Employed"],
+        "applicant_income": float(row["ApplicantIncome"]),
+        "coapplicant_income": float(row["CoapplicantIncome"]),
+        "loan_amount": float(row["LoanAmount"]),
+        "loan_term": float(row["Loan_Amount_Term"]),
+        "credit_history": float(row["Credit_History"]),
+        "property_area": row["Property_Area"],
+    }
+
+
+def insurance_input(row):
+    return {
+        "age": int(row["age"]),
+        "sex": row["sex"],
+        "bmi": float(row["bmi"]),
+        "children": int(row["children"]),
+        "smoker": row["smoker"],
+        "region": row["region"],
+    }
+
+
+# ── Response checks ────────────────────────────────────────────────────────────
+# check(body bytes) -> None if the response is what the route should return,
+# else a short reason
+
+def json_with(*keys, test=None):
+    """A JSON object with keys, no "error" and no success=false (and test(data) true)."""
+    def check(body):
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return "not JSON"
+        if not isinstance(data, dict):
+            return "not a JSON object"
+        if "error" in data or data.get("success") is False:
+            return f"error: {data.get('error')}"
+        missing = [k for k in keys if k not in data]
+        if missing:
+            return f"missing {', '.join(missing)}"
+        if test is not None and not test(data):
+            return "unexpected content"
+        return None
+    return check
+
+
+def html_with(pattern):
+    """A page matching the regular expression pattern (bytes)."""
+    def check(body):
+        return None if re.search(pattern, body) else f"no match for {pattern.decode()}"
+    return check
+
+
+def total_predictions(body):
+    """A dashboard page whose "Total Predictions" KPI is above zero."""
+    match = re.search(rb">\s*([\d,]+)\s*</\w+>\s*<[^>]+>\s*Total Predictions", body)
+    if match is None:
+        return "no Total Predictions value"
+    if int(match.group(1).replace(b",", b"")) == 0:
+        return "Total Predictions is 0"
+    return None
+
+
+HISTORY = json_with("rows", test=lambda data: len(data["rows"]) > 0)
+
+
+# app -> (CSV, row -> request input,
+#         [(method, path, body kind, body(inputs, i), check(body))]).
+# Body kinds: "json", "form" or None; routes that log predictions come first.
+APPS = {
+    "rainfall": ("RainFall_Prediction/Rainfall.csv", rainfall_input, [
+        ("POST", "/result", "form", lambda inputs, i: inputs[i],
+         html_with(rb"(No )?Rainfall Expected</div>")),
+        ("POST", "/api/predict", "json", lambda inputs, i: inputs[i],
+         json_with("prediction", "probability")),
+        ("GET", "/api/history", None, None, HISTORY),
+    ]),
+    "churn": ("Customer_Churn/WA_Fn-UseC_-Telco-Customer-Churn.csv", churn_input, [
+        ("POST", "/predict", "json", lambda inputs, i: inputs[i],
+         json_with("prediction", "churn_probability", "risk_level")),
+        ("GET", "/history", None, None, html_with(rb'<td class="timestamp">')),
+        ("GET", "/dashboard", None, None, total_predictions),
+        ("GET", "/api/history", None, None, HISTORY),
+    ]),
+    "bigmart": ("Big_Mart_Sales_Prediction/Train.csv", bigmart_input, [
+        ("POST", "/api/predict", "json", lambda inputs, i: inputs[i],
+         json_with("prediction")),
+        ("POST", "/api/simulate", "json", lambda inputs, i: inputs[i],
+         json_with("prediction")),
+        ("POST", "/api/compare", "json",
+         lambda inputs, i: {"a": inputs[i], "b": inputs[(i + 1) % len(inputs)]},
+         json_with("a", "b", "results")),
+        ("GET", "/dashboard", None, None, html_with(rb"js/dashboard\.js")),
+        ("GET", "/api/dashboard", None, None,
+         json_with("total", "outlet_type", test=lambda data: data["total"] > 0)),
+        ("GET", "/api/history", None, None, HISTORY),
+    ]),
+    "loan": ("Loan_Prediction_SVC/loan.csv", loan_input, [
+        ("POST", "/predict", "json", lambda inputs, i: inputs[i],
+         json_with("prediction", "confidence")),
+        ("POST", "/api/simulate", "json", lambda inputs, i: inputs[i],
+         json_with("prediction", "confidence")),
+        ("GET", "/dashboard", None, None, total_predictions),
+        ("GET", "/api/history", None, None, HISTORY),
+    ]),
+    "insurance": ("Medical_Health_Insurance_Prediction/insurance.csv", insurance_input, [
+        ("POST", "/predict", "json", lambda inputs, i: inputs[i],
+         json_with("predicted_charges", "risk_level")),
+        ("POST", "/simulate", "json", lambda inputs, i: inputs[i],
+         json_with("predicted_charges", "risk_level")),
+        ("GET", "/dashboard", None, None, total_predictions),
+        ("GET", "/history", None, None, html_with(rb'<td class="charges">')),
+        ("GET", "/api/history", None, None, HISTORY),
+    ]),
+}
+
+
+def encode_body(kind, payload):
+    """(bytes, content type) for a request body."""
+    if kind == "json":
+        return json.dumps(payload).encode(), "application/json"
+    if kind == "form":
+        return urllib.parse.urlencode(payload).encode(), "application/x-www-form-urlencoded"
+    return None, None
+
+
+# ── Drivers ────────────────────────────────────────────────────────────────────
+
+class ClientDriver:
+    """Requests through Flask test clients (one per thread) on the gateway app."""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def send(self, method, path, body, content_type):
+        """(status, response body)."""
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        headers = {"Content-Type": content_type} if content_type else {}
+        response = client.open(path, method=method, data=body, headers=headers)
+        data = response.get_data()
+        response.close()
+        return response.status_code, data
+
+    def settle(self):
+        """Write every queued prediction log row now."""
+        for name, module in list(sys.modules.items()):
+            if name.endswith("_app") and hasattr(module, "prediction_log"):
+                module.prediction_log.flush()
+
+
+class HTTPDriver:
+    """Requests over keep-alive HTTP connections (one per thread)."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self._local = threading.local()
+
+    def send(self, method, path, body, content_type):
+        """(status, response body)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        headers = {"Content-Type": content_type} if content_type else {}
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+        except (http.client.HTTPException, OSError):
+            # The server closed the connection (sync workers do); retry once
+            conn.close()
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+        return response.status, data
+
+    def settle(self):
+        # Workers write their queued rows every PREDICTION_LOG_INTERVAL seconds
+        time.sleep(float(os.environ.get("PREDICTION_LOG_INTERVAL", 2.0)) * 1.5)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_gunicorn(workers, env, timeout=180):
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--preload", "-w", str(workers),
+         "-b", f"127.0.0.1:{port}", "--log-level", "warning", "gateway:app"],
+        cwd=ROOT, env=env,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {process.returncode}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return process, port
+        except OSError:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("gunicorn did not become healthy in time")
+
+
+# ── Measurement ────────────────────────────────────────────────────────────────
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return float("nan")
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def run_route(driver, app, route, inputs, requests, warmup, concurrency):
+    method, path, kind, build, check = route
+    url = f"/{app}{path}"
+    bodies = [
+        encode_body(kind, build(inputs, i % len(inputs))) if build else (None, None)
+        for i in range(requests + warmup)
+    ]
+
+    for body, content_type in bodies[:warmup]:
+        driver.send(method, url, body, content_type)
+
+    def timed(item):
+        body, content_type = item
+        start = time.perf_counter()
+        try:
+            status, data = driver.send(method, url, body, content_type)
+        except Exception as e:
+            return time.perf_counter() - start, f"{type(e).__name__}: {e}"
+        elapsed = time.perf_counter() - start
+        if status >= 400:
+            return elapsed, f"HTTP {status}"
+        # The body is checked outside the timed span
+        return elapsed, check(data)
+
+    start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = list(pool.map(timed, bodies[warmup:]))
+    else:
+        results = [timed(item) for item in bodies[warmup:]]
+    wall = time.perf_counter() - start
+
+    latencies = sorted(seconds * 1000 for seconds, _ in results)
+    failures = [reason for _, reason in results if reason is not None]
+    return {
+        "route": f"{method} {url}",
+        "requests": len(results),
+        "errors": len(failures),
+        "first_error": failures[0] if failures else None,
+        "rps": round(len(results) / wall, 1) if wall else float("nan"),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_results(results):
+    print(f"{'route':<34} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for r in results:
+        print(
+            f"{r['route']:<34} {r['rps']:>9.1f} {r['p50_ms']:>9.2f} "
+            f"{r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['errors']:>7}"
+        )
+    for r in results:
+        if r["errors"]:
+            print(f"  {r['route']}: {r['errors']} errors, first: {r['first_error']}")
+
+
+def print_comparison(baseline, results):
+    """Per-route change against an earlier results file (negative ms = faster)."""
+    before = {r["route"]: r for r in baseline["results"]}
+    print(f"\nAgainst {baseline.get('commit') or 'baseline'} ({baseline.get('timestamp')}):")
+    print(f"{'route':<34} {'req/s':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for r in results:
+        old = before.get(r["route"])
+        if old is None:
+            print(f"{r['route']:<34} (new route)")
+            continue
+
+        def change(key):
+            return f"{(r[key] - old[key]) / old[key] * 100:+.1f}%" if old[key] else "n/a"
+
+        print(
+            f"{r['route']:<34} {change('rps'):>9} {change('p50_ms'):>9} "
+            f"{change('p95_ms'):>9} {change('p99_ms'):>9}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mode", choices=["client", "gunicorn"], default="client")
+    parser.add_argument("--app", choices=sorted(APPS), action="append")
+    parser.add_argument("--requests", type=int, default=500, help="timed requests per route")
+    parser.add_argument("--warmup", type=int, default=20, help="untimed requests per route")
+    parser.add_argument("--concurrency", type=int, default=1, help="client threads")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn workers (--mode gunicorn)")
+    parser.add_argument("--output", help="results file (default benchmarks/results/<time>-<mode>.json)")
+    parser.add_argument("--compare", help="earlier results file to diff against")
+    args = parser.parse_args()
+
+    apps = args.app or list(APPS)
+    inputs = {}
+    for app in apps:
+        relative, to_input, _ = APPS[app]
+        inputs[app] = [to_input(row) for row in read_csv(relative)]
+
+    storage_dir = tempfile.mkdtemp(prefix="ml-loadtest-")
+    env = dict(
+        os.environ,
+        STORAGE_BACKEND="sqlite",
+        SQLITE_PATH=os.path.join(storage_dir, "predictions.sqlite3"),
+        PREDICTION_LOG_SPILL=os.path.join(storage_dir, "predictions.spill.jsonl"),
+        GATEWAY_APPS=",".join(apps),
+        STARTUP_MODE="eager",
+    )
+
+    process = None
+    try:
+        if args.mode == "gunicorn":
+            process, port = start_gunicorn(args.workers, env)
+            driver = HTTPDriver("127.0.0.1", port)
+        else:
+            os.environ.update(env)
+            sys.path.insert(0, ROOT)
+            import gateway
+
+            driver = ClientDriver(gateway.app)
+
+        results = []
+        for app in apps:
+            routes = APPS[app][2]
+            written = False
+            for route in routes:
+                if route[2] is None and not written:
+                    driver.settle()
+                    written = True
+                results.append(
+                    run_route(driver, app, route, inputs[app], args.requests, args.warmup, args.concurrency)
+                )
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(30)
+        shutil.rmtree(storage_dir, ignore_errors=True)
+
+    print_results(results)
+
+    timestamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    report = {
+        "timestamp": timestamp,
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "mode": args.mode,
+        "workers": args.workers if args.mode == "gunicorn" else None,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{timestamp}-{args.mode}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {os.path.relpath(output, ROOT)}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
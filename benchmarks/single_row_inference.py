@@ -0,0 +1,120 @@
+"""
+Per-app single-row inference latency: a one-row pandas DataFrame (the old
+request path) against the preallocated NumPy buffer used by FastModel.
+
+Both paths are checked to produce the same output before timing.
+
+Usage:
+    python benchmarks/single_row_inference.py [--iterations 2000] [--app loan]
+"""
+
+import argparse
+import os
+import pickle
+import sys
+import time
+
+import joblib
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ml_common.features import FastModel  # noqa: E402
+
+
+def load_rainfall():
+    model = joblib.load(os.path.join(ROOT, "RainFall_Prediction", "rainfall_model.pkl"))
+    columns = ["pressure", "dewpoint", "humidity", "cloud", "sunshine", "winddirection", "windspeed"]
+    row = dict(zip(columns, [1015.9, 19.9, 95.0, 81.0, 0.0, 40.0, 13.7]))
+    return model, columns, row, "predict_proba"
+
+
+def load_churn():
+    base = os.path.join(ROOT, "Customer_Churn")
+    path = os.path.join(base, "customer_churn_model.pkl")
+    if os.path.exists(path):
+        model = pickle.load(open(path, "rb"))["model"]
+    else:
+        model = pickle.load(open(os.path.join(base, "xgb_churn.pkl"), "rb"))
+    columns = [
+        "gender", "SeniorCitizen", "Partner", "Dependents", "tenure", "PhoneService",
+        "MultipleLines", "InternetService", "OnlineSecurity", "OnlineBackup",
+        "DeviceProtection", "TechSupport", "StreamingTV", "StreamingMovies", "Contract",
+        "PaperlessBilling", "PaymentMethod", "MonthlyCharges", "TotalCharges",
+    ]
+    values = [0, 0, 1, 0, 1, 0, 1, 0, 0, 2, 0, 0, 0, 0, 0, 1, 2, 29.85, 29.85]
+    return model, columns, dict(zip(columns, values)), "predict_proba"
+
+
+def load_bigmart():
+    base = os.path.join(ROOT, "Big_Mart_Sales_Prediction")
+    model = joblib.load(os.path.join(base, "best_model.pkl"))
+    columns = list(joblib.load(os.path.join(base, "model_columns.pkl")))
+    values = [12.86, 0, 0.066, 4, 140.99, 9, 1999, 1, 0, 1]
+    return model, columns, dict(zip(columns, values)), "predict"
+
+
+def load_loan():
+    base = os.path.join(ROOT, "Loan_Prediction_SVC")
+    model = joblib.load(os.path.join(base, "loan_model.pkl"))
+    columns = list(joblib.load(os.path.join(base, "model_columns.pkl")))
+    values = [1, 1, 0, 1, 0, 5000.0, 1500.0, 150.0, 360.0, 1.0, 2]
+    return model, columns, dict(zip(columns, values)), "predict_proba"
+
+
+def load_insurance():
+    data = pickle.load(
+        open(os.path.join(ROOT, "Medical_Health_Insurance_Prediction", "insurance_model.pkl"), "rb")
+    )
+    columns = list(data["feature_names"])
+    row = {"age": 35, "sex": 1, "bmi": 27.5, "children": 1, "smoker": 0, "region": 2}
+    return data["model"], columns, row, "predict"
+
+
+APPS = {
+    "rainfall": load_rainfall,
+    "churn": load_churn,
+    "bigmart": load_bigmart,
+    "loan": load_loan,
+    "insurance": load_insurance,
+}
+
+
+def per_call_us(fn, iterations):
+    for _ in range(min(50, iterations)):
+        fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--app", choices=sorted(APPS), action="append")
+    args = parser.parse_args()
+
+    print(f"{'app':<10} {'DataFrame us':>14} {'NumPy us':>10} {'speedup':>8}")
+    for name in args.app or APPS:
+        model, columns, row, method = APPS[name]()
+        fast = FastModel(model, columns, name)
+
+        def dataframe_path():
+            return getattr(model, method)(pd.DataFrame([row])[columns])[0]
+
+        def numpy_path():
+            return getattr(fast, method)(fast.vector.fill(row))[0]
+
+        expected, actual = dataframe_path(), numpy_path()
+        if not (pd.Series(expected).round(6) == pd.Series(actual).round(6)).all():
+            raise AssertionError(f"{name}: outputs differ ({expected} vs {actual})")
+
+        slow_us = per_call_us(dataframe_path, args.iterations)
+        fast_us = per_call_us(numpy_path, args.iterations)
+        print(f"{name:<10} {slow_us:>14.1f} {fast_us:>10.1f} {slow_us / fast_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
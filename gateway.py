@@ -0,0 +1,113 @@
+"""
+Single serving process for the five deployed prediction apps.
+
+Each app is imported unchanged from its own folder and mounted under a
+URL prefix:
+
+    /rainfall   RainFall_Prediction
+    /churn      Customer_Churn
+    /bigmart    Big_Mart_Sales_Prediction
+    /loan       Loan_Prediction_SVC
+    /insurance  Medical_Health_Insurance_Prediction
+
+Models are loaded once into ml_common.registry and the apps share one
+storage backend (ml_common/storage.py). Run with preload so the workers fork after the models are
+in memory and share those pages copy-on-write:
+
+    gunicorn --preload -w 4 -b 0.0.0.0:8000 gateway:app
+
+GATEWAY_APPS (comma separated prefixes, e.g. "loan,insurance") mounts a
+subset; by default all five are mounted.
+"""
+
+import gc
+import importlib.util
+import os
+import sys
+
+from flask import Flask, jsonify
+from werkzeug.middleware.dispatcher import DispatcherMiddleware
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT_DIR)
+
+from ml_common import metrics
+from ml_common.registry import registry
+
+APPS = {
+    "rainfall": "RainFall_Prediction",
+    "churn": "Customer_Churn",
+    "bigmart": "Big_Mart_Sales_Prediction",
+    "loan": "Loan_Prediction_SVC",
+    "insurance": "Medical_Health_Insurance_Prediction",
+}
+
+
+def load_app(prefix, folder):
+    """Import <folder>/app.py as module "<prefix>_app" and return its Flask app."""
+    app_dir = os.path.join(ROOT_DIR, folder)
+    # Apps import their own helper modules (category_encoding, dashboard_stats)
+    # by bare name, so their folder has to be importable.
+    if app_dir not in sys.path:
+        sys.path.append(app_dir)
+
+    module_name = f"{prefix}_app"
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(app_dir, "app.py"))
+    module = importlib.util.module_from_spec(spec)
+    # Flask resolves templates/ and static/ from sys.modules[__name__].
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module.app
+
+
+def selected_apps():
+    names = os.environ.get("GATEWAY_APPS")
+    if not names:
+        return list(APPS)
+    selected = [name.strip() for name in names.split(",") if name.strip()]
+    unknown = sorted(set(selected) - set(APPS))
+    if unknown:
+        raise RuntimeError(f"GATEWAY_APPS: unknown app(s) {', '.join(unknown)}")
+    return selected
+
+
+# Load every app's model and client at import time rather than in the
+# background, so they are in memory before gunicorn forks the workers.
+os.environ.setdefault("STARTUP_MODE", "eager")
+
+mounted = {prefix: load_app(prefix, APPS[prefix]) for prefix in selected_apps()}
+
+app = Flask(__name__)
+
+
+@app.route("/")
+def home():
+    return jsonify({"apps": {prefix: f"/{prefix}/" for prefix in mounted}})
+
+
+@app.route("/models")
+def models():
+    return jsonify(registry.describe())
+
+
+@app.route("/metrics")
+def process_metrics():
+    # One registry per process, so this covers every mounted app
+    return metrics.response()
+
+
+@app.route("/health")
+def health():
+    return jsonify({"status": "ok", "apps": list(mounted)})
+
+
+app.wsgi_app = DispatcherMiddleware(app.wsgi_app, {f"/{prefix}": sub for prefix, sub in mounted.items()})
+
+# Everything loaded so far (models, libraries) lives for the whole process.
+# Moving it out of the collector's generations stops the workers' GC passes
+# from touching those pages, which would otherwise un-share them after fork.
+gc.freeze()
+
+
+if __name__ == "__main__":
+    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 8000)))
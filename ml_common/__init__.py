@@ -0,0 +1 @@
+"""Serving helpers shared by the Flask prediction apps in this repository."""
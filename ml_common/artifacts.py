@@ -0,0 +1,166 @@
+"""
+Fast-loading copies of the apps' model artifacts.
+
+`python -m ml_common.artifacts convert` writes a converted copy next to
+every .pkl the apps load:
+
+* XGBoost models (bare or inside a {"model": ..., ...} dict) are saved in
+  xgboost's native binary JSON, <name>.ubj, with the wrapper class and the
+  other dict entries in <name>.meta.json. Loading it parses the booster
+  directly instead of running the pickle machinery.
+* Everything else (sklearn estimators, LabelEncoders, column lists) is
+  written as an uncompressed joblib dump, <name>.joblib, and loaded with
+  mmap_mode="r": numpy arrays are mapped from the file instead of copied,
+  so workers share one page-cache copy of them.
+
+ModelRegistry.load() goes through load_artifact(), which uses a converted
+copy when one exists and is at least as new as the pickle, and falls back
+to the pickle otherwise (so retraining and overwriting a .pkl never serves
+a stale converted model). Measure the difference with
+benchmarks/artifact_loading.py.
+"""
+
+import argparse
+import importlib
+import json
+import os
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Every artifact the deployed apps load, relative to the repository root
+ARTIFACTS = {
+    "rainfall": ["RainFall_Prediction/rainfall_model.pkl"],
+    "churn": ["Customer_Churn/customer_churn_model.pkl", "Customer_Churn/encoders.pkl"],
+    "bigmart": ["Big_Mart_Sales_Prediction/best_model.pkl"],
+    "loan": ["Loan_Prediction_SVC/loan_model.pkl", "Loan_Prediction_SVC/model_columns.pkl"],
+    "insurance": ["Medical_Health_Insurance_Prediction/insurance_model.pkl"],
+}
+
+XGBOOST_FORMAT = "xgboost-ubj"
+JOBLIB_FORMAT = "joblib-mmap"
+PICKLE_FORMAT = "pickle"
+
+
+def converted_paths(path):
+    base = os.path.splitext(path)[0]
+    return {
+        "ubj": base + ".ubj",
+        "meta": base + ".meta.json",
+        "joblib": base + ".joblib",
+    }
+
+
+def _fresh(converted, source):
+    if not os.path.exists(converted):
+        return False
+    return not os.path.exists(source) or os.path.getmtime(converted) >= os.path.getmtime(source)
+
+
+def _is_xgboost(model):
+    return type(model).__module__.split(".")[0] == "xgboost"
+
+
+def _load_xgboost(ubj_path, meta_path):
+    with open(meta_path) as f:
+        meta = json.load(f)
+    cls = getattr(importlib.import_module(meta["module"]), meta["class"])
+    model = cls()
+    model.load_model(ubj_path)
+    if meta.get("key") is None:
+        return model
+    artifact = dict(meta.get("extra", {}))
+    artifact[meta["key"]] = model
+    return artifact
+
+
+def resolve(path):
+    """(file to read, format) for an artifact path, without loading it."""
+    paths = converted_paths(path)
+    if _fresh(paths["ubj"], path) and _fresh(paths["meta"], path):
+        return paths["ubj"], XGBOOST_FORMAT
+    if _fresh(paths["joblib"], path):
+        return paths["joblib"], JOBLIB_FORMAT
+    return path, PICKLE_FORMAT
+
+
+def load_artifact(path, loader):
+    """Return (artifact, path actually read, format) for an artifact path.
+
+    Prefers a fresh converted copy of path; otherwise calls loader(path).
+    """
+    source, fmt = resolve(path)
+    if fmt == XGBOOST_FORMAT:
+        return _load_xgboost(source, converted_paths(path)["meta"]), source, fmt
+    if fmt == JOBLIB_FORMAT:
+        import joblib
+
+        return joblib.load(source, mmap_mode="r"), source, fmt
+    return loader(path), source, fmt
+
+
+def convert(path):
+    """Write the converted copy of one pickled artifact; return its format."""
+    import joblib
+
+    # joblib.load also reads plain pickle.dump files
+    artifact = joblib.load(path)
+    paths = converted_paths(path)
+
+    key, model, extra = None, artifact, {}
+    if isinstance(artifact, dict) and "model" in artifact:
+        key, model = "model", artifact["model"]
+        extra = {k: v for k, v in artifact.items() if k != key}
+
+    if _is_xgboost(model):
+        try:
+            meta = json.dumps({
+                "format": XGBOOST_FORMAT,
+                "module": type(model).__module__,
+                "class": type(model).__name__,
+                "key": key,
+                "extra": extra,
+            }, indent=2, default=list)
+        except TypeError:
+            meta = None  # extra entries that JSON cannot hold: use joblib below
+        if meta is not None:
+            tmp = paths["ubj"] + ".tmp.ubj"
+            model.save_model(tmp)
+            os.replace(tmp, paths["ubj"])
+            with open(paths["meta"] + ".tmp", "w") as f:
+                f.write(meta)
+            os.replace(paths["meta"] + ".tmp", paths["meta"])
+            return XGBOOST_FORMAT
+
+    tmp = paths["joblib"] + ".tmp"
+    # Uncompressed, so the arrays can be memory-mapped on load
+    joblib.dump(artifact, tmp)
+    os.replace(tmp, paths["joblib"])
+    return JOBLIB_FORMAT
+
+
+def artifact_paths(apps=None):
+    for app in apps or ARTIFACTS:
+        for relative in ARTIFACTS[app]:
+            yield app, os.path.join(ROOT_DIR, relative)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert model artifacts to fast-loading formats")
+    parser.add_argument("command", choices=["convert", "show"])
+    parser.add_argument("--app", choices=sorted(ARTIFACTS), action="append")
+    args = parser.parse_args()
+
+    for app, path in artifact_paths(args.app):
+        relative = os.path.relpath(path, ROOT_DIR)
+        if not os.path.exists(path):
+            print(f"{app:<10} {relative}: missing, skipped")
+            continue
+        if args.command == "convert":
+            print(f"{app:<10} {relative} -> {convert(path)}")
+        else:
+            source, fmt = resolve(path)
+            print(f"{app:<10} {relative}: loads {os.path.relpath(source, ROOT_DIR)} ({fmt})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Micro-batching of concurrent single-row inference calls.
+
+Under load, many request threads each call the model on one row, and for
+the XGBoost models the per-call overhead is far larger than the per-row
+cost. A MicroBatcher sits in front of the model: a handler calls
+batcher(row) and blocks, a dispatcher thread collects the rows that
+arrive within INFERENCE_BATCH_WAIT_MS of the first one (at most
+INFERENCE_BATCH_SIZE), runs one vectorized call for all of them and hands
+each handler its own result. A row with nothing queued behind it is
+scored at once, so a lone request never waits for the window; rows
+pile up for the next batch while the dispatcher is busy. If the batched
+call raises, the rows are scored again one by one, so a bad row fails
+only its own request.
+
+The dispatcher times the model call under each caller's app and route
+(rows from different routes are scored in separate calls), so the
+inference / vectorize stages stay attributed to the right endpoint.
+
+INFERENCE_BATCH_WAIT_MS=0 or INFERENCE_BATCH_SIZE=1 turns batching off;
+rows are then scored on the calling thread as before.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from ml_common.metrics import current_labels, labelled, stage
+
+
+class MicroBatcher:
+    """Coalesce single-row calls from many threads into batched calls."""
+
+    def __init__(self, predict_many, predict_one=None, max_batch=32, max_wait=0.002,
+                 name="inference-batcher"):
+        # predict_many(rows) -> one result per row; predict_one(row) -> result
+        # is used for batches of one and when batching is off
+        self.predict_many = predict_many
+        self.predict_one = predict_one or (lambda row: predict_many([row])[0])
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.name = name
+
+        self._queue = queue.SimpleQueue()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+        self.batches = 0
+        self.rows = 0
+        self.largest = 0
+        self.fallbacks = 0
+
+    @classmethod
+    def from_env(cls, predict_many, predict_one=None):
+        """Build a batcher configured by INFERENCE_BATCH_* environment variables."""
+        env = os.environ.get
+        return cls(
+            predict_many,
+            predict_one,
+            max_batch=int(env("INFERENCE_BATCH_SIZE", 32)),
+            max_wait=float(env("INFERENCE_BATCH_WAIT_MS", 2)) / 1000,
+        )
+
+    @property
+    def enabled(self):
+        return self.max_batch > 1 and self.max_wait > 0
+
+    def __call__(self, row):
+        """Result for one row, computed in the next batch. Re-raises its error."""
+        if not self.enabled:
+            return self.predict_one(row)
+        self._ensure_started()
+        future = Future()
+        self._queue.put((row, future, current_labels()))
+        with stage("batch"):
+            return future.result()
+
+    def _ensure_started(self):
+        # Started lazily and re-started after fork, like PredictionLogWriter
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # Rows queued in the parent belong to threads that are gone
+                self._queue = queue.SimpleQueue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, args=(self._queue,), name=self.name, daemon=True
+            )
+            self._thread.start()
+
+    def _run(self, pending):
+        while True:
+            batch = [pending.get()]
+            try:
+                batch.append(pending.get_nowait())
+            except queue.Empty:
+                # Nothing else waiting: no reason to hold the row back
+                self._dispatch(batch)
+                continue
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(pending.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        # One model call per (app, route), timed under those labels
+        by_labels = {}
+        for row, future, labels in batch:
+            by_labels.setdefault(labels, []).append((row, future))
+        for labels, items in by_labels.items():
+            with labelled(labels):
+                self._score(items)
+
+    def _score(self, items):
+        if len(items) == 1:
+            self._score_each(items)
+        else:
+            try:
+                results = list(self.predict_many([row for row, _ in items]))
+            except BaseException:
+                # Score each row on its own: every caller gets the result or
+                # the error its own call would give
+                self.fallbacks += 1
+                self._score_each(items)
+            else:
+                for (_, future), result in zip(items, results):
+                    future.set_result(result)
+
+        self.batches += 1
+        self.rows += len(items)
+        self.largest = max(self.largest, len(items))
+
+    def _score_each(self, items):
+        for row, future in items:
+            try:
+                future.set_result(self.predict_one(row))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "batches": self.batches,
+            "rows": self.rows,
+            "largest": self.largest,
+            "fallbacks": self.fallbacks,
+            "mean_size": round(self.rows / self.batches, 2) if self.batches else 0,
+        }
@@ -0,0 +1,239 @@
+"""
+In-process caches for computed responses and model outputs.
+
+TTLCache keeps a value per key for a fixed number of seconds. Loads are
+single-flight: when an entry expires, one thread recomputes it and
+concurrent callers wait for that result instead of all querying the
+backend at once. update() never waits for a load (request handlers call
+it on the hot path), and a load that was running when its key was
+invalidated is returned to its caller but not stored.
+
+LRUCache is a bounded memo table; PredictionCache specializes it for
+model outputs, with hit/miss/eviction counters and invalidation when the
+model artifact on disk changes.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe time-to-live cache with single-flight loading."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._loading = set()
+        # Bumped by invalidate(); a load only stores its value if the
+        # generation it started under is still current
+        self._generations = {}
+        self._epoch = 0
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _generation(self, key):
+        return self._epoch, self._generations.get(key, 0)
+
+    def _fresh(self, key):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry
+        return None
+
+    def get(self, key, loader):
+        """Return the cached value for key, calling loader() if it is stale."""
+        entry = self._fresh(key)
+        if entry is not None:
+            return entry[1]
+
+        with self._key_lock(key):
+            entry = self._fresh(key)
+            if entry is not None:
+                return entry[1]
+            with self._lock:
+                self._loading.add(key)
+                generation = self._generation(key)
+            try:
+                value = loader()
+            except BaseException:
+                with self._lock:
+                    self._loading.discard(key)
+                raise
+            with self._lock:
+                self._loading.discard(key)
+                if self.ttl > 0 and self._generation(key) == generation:
+                    self._entries[key] = (time.monotonic() + self.ttl, value)
+            return value
+
+    def update(self, key, fn):
+        """
+        Replace a live entry with fn(value), keeping its expiry time. Does
+        nothing (and returns False) if there is no live entry or a load of
+        key is in flight: the load reads the data the update describes, or
+        the next one will, and waiting for it would stall the caller.
+        """
+        with self._lock:
+            if key in self._loading:
+                return False
+            entry = self._fresh(key)
+            if entry is None:
+                return False
+            self._entries[key] = (entry[0], fn(entry[1]))
+            return True
+
+    def invalidate(self, key=None):
+        """Drop key (or every key); loads already running are not stored."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._epoch += 1
+            else:
+                self._entries.pop(key, None)
+                self._generations[key] = self._generations.get(key, 0) + 1
+
+
+class LRUCache:
+    """Thread-safe bounded mapping that evicts the least recently used key."""
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return self._data[key]
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def __len__(self):
+        return len(self._data)
+
+
+_MISSING = object()
+
+
+def feature_key(values):
+    """Normalize an encoded feature row into a hashable cache key."""
+    return tuple(float(v) for v in values)
+
+
+class PredictionCache(LRUCache):
+    """
+    LRU of model outputs keyed on encoded feature rows.
+
+    The cache watches the model artifact files and empties itself when any
+    of them changes on disk (checked at most once per check_interval), so a
+    retrained model never serves stale results. Apps that hot-reload their
+    model also call clear() when the new model is swapped in; results that
+    were being computed across a clear() are not stored.
+    """
+
+    def __init__(self, maxsize=4096, artifacts=(), check_interval=1.0):
+        super().__init__(maxsize)
+        self.artifacts = list(artifacts)
+        self.check_interval = check_interval
+        self.invalidations = 0
+        self.generation = 0
+        self._signature = self._artifact_signature()
+        self._next_check = time.monotonic() + check_interval
+
+    @classmethod
+    def from_env(cls, artifacts=()):
+        """Sized by PREDICTION_CACHE_SIZE (0 disables caching)."""
+        return cls(int(os.environ.get("PREDICTION_CACHE_SIZE", 4096)), artifacts)
+
+    def _artifact_signature(self):
+        signature = []
+        for path in self.artifacts:
+            try:
+                st = os.stat(path)
+                signature.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                signature.append(None)
+        return signature
+
+    def _check_artifacts(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        signature = self._artifact_signature()
+        if signature != self._signature:
+            self._signature = signature
+            self.invalidations += 1
+            self.clear()
+
+    def clear(self):
+        self.generation += 1
+        super().clear()
+
+    def get(self, key, default=None):
+        self._check_artifacts()
+        return super().get(key, default)
+
+    def cached(self, key, compute):
+        """Return the value for key, calling compute() on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            generation = self.generation
+            value = compute()
+            if generation == self.generation:
+                self.put(key, value)
+        return value
+
+    def cached_many(self, keys, compute):
+        """
+        Values for many keys. compute(missing_keys) is called once with the
+        distinct uncached keys and must return their values in order.
+        """
+        results = [self.get(key, _MISSING) for key in keys]
+        missing = list(dict.fromkeys(k for k, r in zip(keys, results) if r is _MISSING))
+        if not missing:
+            return results
+
+        generation = self.generation
+        computed = dict(zip(missing, compute(missing)))
+        if generation == self.generation:
+            for key, value in computed.items():
+                self.put(key, value)
+        return [computed[k] if r is _MISSING else r for k, r in zip(keys, results)]
+
+    def stats(self):
+        return dict(super().stats(), invalidations=self.invalidations)
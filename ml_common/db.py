@@ -0,0 +1,22 @@
+"""
+Shared Supabase client.
+
+create_client() is called once per (url, key) per process, so when several
+apps are hosted together (gateway.py) they reuse one client and its HTTP
+connection pool.
+"""
+
+import functools
+import os
+
+
+@functools.lru_cache(maxsize=None)
+def _client(url, key):
+    from supabase import create_client
+
+    return create_client(url, key)
+
+
+def supabase_client(url=None, key=None):
+    """Client for SUPABASE_URL / SUPABASE_KEY unless given explicitly."""
+    return _client(url or os.environ.get("SUPABASE_URL"), key or os.environ.get("SUPABASE_KEY"))
@@ -0,0 +1,345 @@
+"""
+Model inference in a pool of worker processes.
+
+With gunicorn threads, the encoding and the estimator call of every
+request serialize on the GIL; with more gunicorn processes, every process
+holds its own copy of the model. An InferencePool keeps a fixed number of
+worker processes (INFERENCE_PROCESSES, default 0 = off), each of which
+loads the app's model once, and sends them the feature arrays to score:
+
+    request thread                               worker process
+    X -> shared input buffer   --("predict", n)-->   view of the same buffer
+                                                      model.predict(view)
+    result <- shared output buffer <--("ok", cols)--  writes the result
+
+Arrays travel through one multiprocessing.shared_memory block per worker
+and direction, so only a tiny message is pickled per call; batches larger
+than INFERENCE_POOL_MAX_ROWS are sent in slices. Request threads wait on
+a pipe with the GIL released, so they stay free for storage and template
+work while inference runs on other cores.
+
+Workers are plain `python -m ml_common.executor` subprocesses (no fork of
+a threaded server, no re-import of app.py) that load the model with
+ml_common.scoring.load_fast_model(). Each one starts on its first call in
+the process that uses it, so a gunicorn --preload master never owns a
+pool its workers would inherit. A model hot reload in the app reloads the
+workers before their next call, and a worker that died is restarted.
+"""
+
+import atexit
+import os
+import pickle
+import queue
+import subprocess
+import sys
+import threading
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing.connection import Connection
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+METHODS = ("predict", "predict_proba")
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13 registers every attach with the tracker
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _array(shm, cols):
+    """(rows, cols) float64 view of a shared block (rows as many as fit)."""
+    import numpy as np
+
+    return np.ndarray((shm.size // (8 * cols), cols), dtype=np.float64, buffer=shm.buf)
+
+
+class _Worker:
+    """One worker process, its pipes and its input / output buffers."""
+
+    def __init__(self, app, max_rows):
+        self.app = app
+        self.max_rows = max_rows
+        self.process = None
+        self.shape = None
+        self.generation = None
+        self._buffers = ()
+
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self, generation, shape):
+        self.stop()
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+            p for p in (ROOT_DIR, os.environ.get("PYTHONPATH")) if p
+        ))
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "ml_common.executor", self.app],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=env,
+        )
+        self.requests = Connection(os.dup(self.process.stdin.fileno()), readable=False)
+        self.replies = Connection(os.dup(self.process.stdout.fileno()), writable=False)
+        self.shape = None
+        self.reload(generation, shape)
+
+    def reload(self, generation, shape):
+        """Load the current model; new buffers first if its shape changed."""
+        old = ()
+        if shape != self.shape:
+            old = self._buffers
+            n_features, n_outputs = shape
+            self._buffers = (
+                shared_memory.SharedMemory(create=True, size=self.max_rows * n_features * 8),
+                shared_memory.SharedMemory(create=True, size=self.max_rows * n_outputs * 8),
+            )
+            self.X = _array(self._buffers[0], n_features)
+            self.out = _array(self._buffers[1], n_outputs)
+            self.shape = shape
+        try:
+            self._send(("reload", self._buffers[0].name, self._buffers[1].name, *shape))
+            self._expect("ready")
+        finally:
+            # The worker has switched to the new buffers either way
+            _release(old)
+        self.generation = generation
+
+    def _send(self, message):
+        try:
+            self.requests.send(message)
+        except OSError:
+            raise RuntimeError("Inference worker exited") from None
+
+    def _expect(self, status):
+        try:
+            reply = self.replies.recv()
+        except (EOFError, OSError):
+            raise RuntimeError("Inference worker exited") from None
+        if reply[0] == "error":
+            raise RuntimeError(f"Inference worker failed: {reply[1]}")
+        if reply[0] != status:
+            raise RuntimeError(f"Unexpected reply from inference worker: {reply[0]}")
+        return reply
+
+    def call(self, method, X):
+        import numpy as np
+
+        results = []
+        for start in range(0, len(X), self.max_rows):
+            rows = X[start:start + self.max_rows]
+            self.X[: len(rows)] = rows
+            self._send((method, len(rows)))
+            _, cols = self._expect("ok")
+            results.append(self.out[: len(rows), :cols].copy())
+        out = results[0] if len(results) == 1 else np.concatenate(results)
+        return out[:, 0] if method == "predict" else out
+
+    def stop(self):
+        if self.process is None:
+            return
+        for conn in (self.requests, self.replies):
+            conn.close()
+        for stream in (self.process.stdin, self.process.stdout):
+            stream.close()
+        self.process.terminate()
+        self.process.wait()
+        self.process = None
+
+    def close(self):
+        self.stop()
+        _release(self._buffers)
+        self._buffers = ()
+
+
+def _release(buffers):
+    for shm in buffers:
+        shm.close()
+        shm.unlink()
+
+
+class InferencePool:
+    """A fixed pool of worker processes scoring one app's model."""
+
+    def __init__(self, app, processes=0, max_rows=1024):
+        self.app = app
+        self.processes = processes
+        self.max_rows = max_rows
+        self.generation = 0
+        self.shape = None
+
+        self._idle = queue.Queue()
+        self._workers = []
+        self._start_lock = threading.Lock()
+        self._pid = None
+        self.calls = 0
+        self.restarts = 0
+
+        atexit.register(self.close)
+
+    @classmethod
+    def from_env(cls, app):
+        """Build a pool configured by INFERENCE_PROCESSES / INFERENCE_POOL_MAX_ROWS."""
+        env = os.environ.get
+        return cls(
+            app,
+            processes=int(env("INFERENCE_PROCESSES", 0)),
+            max_rows=int(env("INFERENCE_POOL_MAX_ROWS", 1024)),
+        )
+
+    @property
+    def enabled(self):
+        return self.processes > 0
+
+    def attach(self, model):
+        """
+        Route a FastModel's predict / predict_proba through the pool (a no-op
+        when the pool is off). Called on every (re)load; workers follow lazily.
+        """
+        if not self.enabled:
+            return model
+        classes = getattr(model, "classes_", None)
+        self.shape = (len(model.vector.columns), 1 if classes is None else len(classes))
+        self.generation += 1
+        return PooledModel(model, self)
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # Workers inherited over a fork belong to the parent; leave them be
+            self._workers = [_Worker(self.app, self.max_rows) for _ in range(self.processes)]
+            self._idle = queue.Queue()
+            for worker in self._workers:
+                self._idle.put(worker)
+            self._pid = os.getpid()
+
+    def run(self, method, X):
+        """Result of model.<method>(X), computed by an idle worker."""
+        import numpy as np
+
+        self._ensure_started()
+        X = np.asarray(X, dtype=np.float64)
+        worker = self._idle.get()
+        try:
+            if not worker.alive():
+                if worker.generation is not None:
+                    self.restarts += 1
+                worker.start(self.generation, self.shape)
+            elif (worker.generation, worker.shape) != (self.generation, self.shape):
+                worker.reload(self.generation, self.shape)
+            result = worker.call(method, X)
+            self.calls += 1
+            return result
+        finally:
+            self._idle.put(worker)
+
+    def close(self):
+        if self._pid != os.getpid():
+            return
+        for worker in self._workers:
+            try:
+                worker.close()
+            except OSError:
+                pass
+        self._workers = []
+        self._pid = None
+
+    def stats(self):
+        mine = self._pid == os.getpid()
+        return {
+            "processes": sum(w.alive() for w in self._workers) if mine else 0,
+            "idle": self._idle.qsize() if mine else 0,
+            "calls": self.calls,
+            "restarts": self.restarts,
+        }
+
+
+class PooledModel:
+    """
+    Stands in for a FastModel; estimator calls run in an InferencePool.
+
+    The local model still answers everything else (vector, classes_,
+    coef_, get_booster) and owns the column order.
+    """
+
+    def __init__(self, local, pool):
+        self.local = local
+        self.vector = local.vector
+        self.pool = pool
+
+    def __getattr__(self, name):
+        if name == "local":
+            raise AttributeError(name)
+        return getattr(self.local, name)
+
+    def predict(self, X):
+        return self.pool.run("predict", X)
+
+    def predict_proba(self, X):
+        return self.pool.run("predict_proba", X)
+
+    def predict_one(self, values):
+        return self.predict(self.vector.fill(values))[0]
+
+    def predict_proba_one(self, values):
+        return self.predict_proba(self.vector.fill(values))[0]
+
+
+def _serve(app):
+    """Worker loop: read (method, rows) requests, answer through shared memory."""
+    import numpy as np
+    from ml_common.scoring import load_fast_model
+
+    # The protocol owns the original stdout; prints go to stderr instead
+    replies = Connection(os.dup(1), readable=False)
+    os.dup2(2, 1)
+    requests = Connection(os.dup(0), writable=False)
+
+    model = None
+    buffers = ()
+    while True:
+        try:
+            message = requests.recv()
+        except (EOFError, OSError, pickle.UnpicklingError):
+            break
+
+        if message[0] == "reload":
+            _, input_name, output_name, n_features, n_outputs = message
+            for shm in buffers:
+                shm.close()
+            buffers = (_attach(input_name), _attach(output_name))
+            X = _array(buffers[0], n_features)
+            out = _array(buffers[1], n_outputs)
+            try:
+                model = load_fast_model(app)
+            except Exception as e:
+                # The previous model (if any) keeps serving; the app retries
+                replies.send(("error", f"{type(e).__name__}: {e}"))
+                continue
+            replies.send(("ready",))
+            continue
+
+        method, n = message
+        try:
+            if model is None:
+                raise RuntimeError("No model loaded")
+            if method not in METHODS:
+                raise ValueError(f"Unknown method: {method}")
+            result = np.asarray(getattr(model, method)(X[:n]), dtype=np.float64).reshape(n, -1)
+            out[:n, : result.shape[1]] = result
+            replies.send(("ok", result.shape[1]))
+        except Exception as e:
+            replies.send(("error", f"{type(e).__name__}: {e}"))
+
+    for shm in buffers:
+        shm.close()
+
+
+if __name__ == "__main__":
+    _serve(sys.argv[1])
@@ -0,0 +1,122 @@
+"""
+DataFrame-free inference.
+
+For a single row, building a pandas DataFrame and reindexing its columns
+often costs more than a tree model's predict(). FastModel instead fills a
+preallocated (1, n_features) NumPy buffer, one per thread, in the model's
+column order and calls the estimator on the plain array. Feature names
+are checked once when the model is wrapped instead of on every call.
+"""
+
+import threading
+import warnings
+from collections.abc import Mapping
+
+import numpy as np
+
+from ml_common.metrics import stage
+
+
+def model_feature_names(model):
+    """Feature names recorded at fit time (sklearn or XGBoost), or None."""
+    names = getattr(model, "feature_names_in_", None)
+    if names is None and hasattr(model, "get_booster"):
+        try:
+            names = model.get_booster().feature_names
+        except Exception:
+            names = None
+    return None if names is None else [str(n) for n in names]
+
+
+def check_feature_names(model, columns, label="model"):
+    """Raise if the model was fitted on a different column list or order."""
+    expected = model_feature_names(model)
+    if expected is not None and expected != list(columns):
+        raise RuntimeError(
+            f"{label} was trained on features {expected}, "
+            f"but the app sends {list(columns)}"
+        )
+
+
+class FeatureVector:
+    """Reusable single-row float buffers in a fixed column order."""
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self._local = threading.local()
+
+    def fill(self, values):
+        """
+        Write one row into this thread's buffer and return it.
+
+        values is a mapping keyed by column name or a sequence already in
+        column order. The buffer is reused, so consume it before the next
+        fill() on the same thread.
+        """
+        with stage("vectorize"):
+            buf = getattr(self._local, "buf", None)
+            if buf is None:
+                buf = self._local.buf = np.empty((1, len(self.columns)), dtype=np.float64)
+            if isinstance(values, Mapping):
+                for i, col in enumerate(self.columns):
+                    buf[0, i] = values[col]
+            else:
+                buf[0, :] = values
+            return buf
+
+    def matrix(self, rows):
+        """Stack many rows (mappings or ordered sequences) into a 2-D array."""
+        with stage("vectorize"):
+            return np.array(
+                [
+                    [row[col] for col in self.columns] if isinstance(row, Mapping) else row
+                    for row in rows
+                ],
+                dtype=np.float64,
+            )
+
+
+class FastModel:
+    """
+    Wraps a fitted estimator so it can be called on plain arrays.
+
+    Attribute access falls through to the wrapped model, so this can stand
+    in for it (e.g. in BinaryClassifier, which reads classes_).
+    """
+
+    def __init__(self, model, columns, label="model"):
+        check_feature_names(model, columns, label)
+        self.model = model
+        self.vector = FeatureVector(columns)
+
+        if hasattr(model, "get_booster"):
+            # XGBoost would otherwise reject arrays without feature names
+            self._kwargs = {"validate_features": False}
+        else:
+            self._kwargs = {}
+            if getattr(model, "feature_names_in_", None) is not None:
+                # sklearn warns on every array call; names were checked above
+                warnings.filterwarnings(
+                    "ignore",
+                    message="X does not have valid feature names",
+                    category=UserWarning,
+                )
+
+    def __getattr__(self, name):
+        if name == "model":
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    def predict(self, X):
+        with stage("inference"):
+            return self.model.predict(X, **self._kwargs)
+
+    def predict_proba(self, X):
+        with stage("inference"):
+            return self.model.predict_proba(X, **self._kwargs)
+
+    def predict_one(self, values):
+        return self.predict(self.vector.fill(values))[0]
+
+    def predict_proba_one(self, values):
+        return self.predict_proba(self.vector.fill(values))[0]
@@ -0,0 +1,122 @@
+"""
+Keyset-paginated reads of the prediction log tables.
+
+Pages are ordered newest first on (created_at, id) and continue from an
+opaque cursor token instead of an OFFSET, so every page costs one index
+range scan however deep the reader has paged, and no request ever holds
+more than one page of rows.
+
+HistoryTable.page() backs the /api/history endpoints:
+
+    GET /api/history?limit=50&columns=prediction,created_at&cursor=<token>
+
+    {"rows": [...], "limit": 50, "next_cursor": "<token>" | null}
+
+HistoryTable.scan() walks the whole table page by page for aggregates
+that are folded row by row (it also avoids PostgREST's silent cap of 1000
+rows on an unbounded select).
+"""
+
+import base64
+import json
+import os
+import re
+from datetime import datetime
+
+DEFAULT_PAGE_SIZE = int(os.environ.get("HISTORY_PAGE_SIZE", 50))
+MAX_PAGE_SIZE = int(os.environ.get("HISTORY_MAX_PAGE_SIZE", 500))
+SCAN_PAGE_SIZE = 1000
+
+
+def encode_cursor(row):
+    raw = json.dumps([row["created_at"], row["id"]], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def parse_timestamp(value):
+    """datetime of a created_at string; ValueError if it is not ISO 8601."""
+    if not isinstance(value, str):
+        raise ValueError("Timestamp must be a string")
+    text = value.strip().replace(" ", "T", 1)
+    if text.endswith("Z"):
+        text = text[:-1] + "+00:00"
+    # fromisoformat() before Python 3.11 wants exactly 3 or 6 fraction digits
+    text = re.sub(r"\.(\d{1,6})\d*", lambda m: "." + m.group(1).ljust(6, "0"), text, count=1)
+    return datetime.fromisoformat(text)
+
+
+def decode_cursor(token):
+    """(created_at, id) from a cursor token; ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        created_at, row_id = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(created_at, str) or not isinstance(row_id, int):
+        raise ValueError("Invalid cursor")
+    # The timestamp ends up in a storage filter; accept nothing else
+    try:
+        parse_timestamp(created_at)
+    except ValueError as e:
+        raise ValueError("Invalid cursor") from e
+    return created_at, row_id
+
+
+class HistoryTable:
+    """Paged, projected access to one prediction log table."""
+
+    KEY_COLUMNS = ("created_at", "id")
+
+    def __init__(self, storage, table, columns, default_columns=None):
+        self.storage = storage
+        self.table = table
+        self.columns = list(columns)
+        self.default_columns = list(default_columns or columns)
+
+    def projection(self, requested=None):
+        """Comma-separated select list; requested is validated against columns."""
+        if requested:
+            names = [c.strip() for c in requested.split(",") if c.strip()]
+            unknown = [c for c in names if c not in self.columns and c not in self.KEY_COLUMNS]
+            if unknown:
+                raise ValueError(
+                    f"Unknown column(s): {', '.join(unknown)}. "
+                    f"Available: {', '.join(self.columns)}"
+                )
+        else:
+            names = list(self.default_columns)
+        # The cursor is built from the key columns, so they are always fetched
+        names += [c for c in self.KEY_COLUMNS if c not in names]
+        return ",".join(names)
+
+    def page(self, limit=None, cursor=None, columns=None):
+        """One page, newest first, plus the cursor for the next one."""
+        limit = DEFAULT_PAGE_SIZE if limit is None else int(limit)
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        after = decode_cursor(cursor) if cursor else None
+
+        # One extra row tells us whether there is a next page
+        rows = self.storage.page(self.table, self.projection(columns), after, limit + 1)
+        more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            "rows": rows,
+            "limit": limit,
+            "next_cursor": encode_cursor(rows[-1]) if more else None,
+        }
+
+    def page_from_args(self, args):
+        """page() driven by request query parameters (limit, cursor, columns)."""
+        return self.page(args.get("limit"), args.get("cursor"), args.get("columns"))
+
+    def scan(self, columns=None, page_size=SCAN_PAGE_SIZE):
+        """Yield every row, newest first, holding one page in memory at a time."""
+        select = self.projection(columns)
+        after = None
+        while True:
+            rows = self.storage.page(self.table, select, after, page_size)
+            yield from rows
+            if len(rows) < page_size:
+                return
+            after = (rows[-1]["created_at"], rows[-1]["id"])
@@ -0,0 +1,42 @@
+"""
+Classifier inference helpers.
+
+BinaryClassifier takes both the label and the probability from a single
+predict_proba() pass, so apps no longer call predict() and predict_proba()
+on the same input. Each app sets its own decision threshold; a row is
+positive when its probability is at or above it, the rule the churn app
+has always used (prob >= 0.5). At the default of 0.5 the labels match
+the model's own predict() except for a probability of exactly 0.5.
+"""
+
+import os
+
+
+class BinaryClassifier:
+    """Threshold-based labels on top of a fitted binary classifier."""
+
+    def __init__(self, model, threshold=0.5, positive_class=1):
+        if not 0 < threshold < 1:
+            raise ValueError(f"Decision threshold must be between 0 and 1, got {threshold}")
+        self.model = model
+        self.threshold = threshold
+        self.positive_class = positive_class
+        self.positive_index = list(model.classes_).index(positive_class)
+
+    @classmethod
+    def from_env(cls, model, env_var, default=0.5, positive_class=1):
+        """Read the decision threshold from an environment variable."""
+        return cls(model, float(os.environ.get(env_var, default)), positive_class)
+
+    def probabilities(self, X):
+        """Positive-class probability for each row of X."""
+        return self.model.predict_proba(X)[:, self.positive_index]
+
+    def is_positive(self, probability):
+        # At or above the threshold, as the apps' original prob >= 0.5 rule
+        return probability >= self.threshold
+
+    def predict(self, X):
+        """(positive-label mask, positive-class probabilities) for X."""
+        probabilities = self.probabilities(X)
+        return self.is_positive(probabilities), probabilities
@@ -0,0 +1,105 @@
+"""
+Model introspection served as precomputed JSON.
+
+Feature importances and linear coefficients only change when the model
+does, so apps compute them once per loaded model (ModelJSON) and serve the
+serialized bytes with an ETag. Browsers revalidate with If-None-Match and
+get an empty 304 back until a new model is swapped in. Bodies of at least
+GZIP_MIN_SIZE bytes are also compressed once and sent gzip-encoded to
+clients that accept it.
+"""
+
+import gzip
+import hashlib
+import json
+
+# Smaller bodies fit in one packet anyway; compressing them buys nothing
+GZIP_MIN_SIZE = 1024
+
+
+def grouped_importances(model, columns, groups=()):
+    """
+    [{"feature", "score", "pct"}] from model.feature_importances_, largest
+    first. Columns that start with one of groups (e.g. one-hot columns of a
+    categorical) are summed under that group; labels use spaces for "_".
+    """
+    totals = {}
+    for col, score in zip(columns, model.feature_importances_):
+        parent = next((group for group in groups if col.startswith(group)), col)
+        label = parent.replace("_", " ")
+        totals[label] = totals.get(label, 0.0) + float(score)
+
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+    total = sum(score for _, score in ranked) or 1.0
+    return [
+        {"feature": label, "score": round(score, 6), "pct": round(score / total * 100, 1)}
+        for label, score in ranked
+    ]
+
+
+def coefficients(model, columns, positive_class=1, digits=4):
+    """
+    {"coefficients": {column: value}, "intercept": value} of a fitted binary
+    linear model, signed so that positive values push towards positive_class.
+    """
+    # sklearn's coef_ points towards classes_[1]
+    sign = 1.0 if list(model.classes_).index(positive_class) == 1 else -1.0
+    return {
+        "coefficients": {
+            col: round(sign * float(coef), digits)
+            for col, coef in zip(columns, model.coef_[0])
+        },
+        "intercept": round(sign * float(model.intercept_[0]), digits),
+    }
+
+
+class JSONSnapshot:
+    """A JSON body serialized once, with a content-derived ETag."""
+
+    def __init__(self, payload):
+        self.body = json.dumps(payload, separators=(",", ":")).encode()
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+        self._gzipped = None
+
+    @property
+    def gzipped(self):
+        if self._gzipped is None:
+            # mtime=0: the same body always compresses to the same bytes
+            self._gzipped = gzip.compress(self.body, mtime=0)
+        return self._gzipped
+
+    def response(self, request):
+        """Flask response for request: 304 if the client already has this body."""
+        from flask import Response
+
+        use_gzip = len(self.body) >= GZIP_MIN_SIZE and "gzip" in request.accept_encodings
+        # Each encoding is its own representation, with its own strong ETag
+        etag = self.etag + "-gzip" if use_gzip else self.etag
+        if etag in request.if_none_match or self.etag in request.if_none_match:
+            response = Response(status=304)
+        elif use_gzip:
+            response = Response(self.gzipped, mimetype="application/json")
+            response.headers["Content-Encoding"] = "gzip"
+        else:
+            response = Response(self.body, mimetype="application/json")
+        response.set_etag(etag)
+        if len(self.body) >= GZIP_MIN_SIZE:
+            response.headers["Vary"] = "Accept-Encoding"
+        # Always revalidate: the body changes when a new model (or new data) is loaded
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
+
+class ModelJSON:
+    """JSONSnapshot of build(model), rebuilt only when a different model is passed."""
+
+    def __init__(self, build):
+        self._build = build
+        self._current = (None, None)
+
+    def get(self, model):
+        owner, snapshot = self._current
+        if owner is not model:
+            snapshot = JSONSnapshot(self._build(model))
+            self._current = (model, snapshot)
+        return snapshot
@@ -0,0 +1,259 @@
+"""
+Per-request stage timing, exported at /metrics in Prometheus text format.
+
+Request handlers (and the shared model wrappers) time the parts of the hot
+path with `with stage("encode"):`. Each stage is recorded in a histogram
+labelled with the app, the Flask endpoint and the stage:
+
+    parse      reading and validating the request body
+    encode     categorical lookups (encode(), CategoryEncoder, *_map dicts)
+    vectorize  building the feature array (FeatureVector.fill / matrix)
+    inference  the estimator call (FastModel.predict / predict_proba)
+    batch      waiting for a micro-batched model call (MicroBatcher)
+    log        queueing the prediction row for the background writer
+    render     template rendering (timed automatically via Flask signals)
+
+instrument(app, name) also records the whole request, serves /metrics, and
+exports the stats() of the objects it is given (prediction cache, log
+writer, startup) as gauges. The background writer records each bulk
+insert in ml_storage_write_seconds, outside of any request. Work done on
+another thread for a request (MicroBatcher's dispatcher) carries the
+request's labels over with current_labels() / labelled().
+
+Metrics live in the process: under gunicorn every worker keeps and serves
+its own, so scrape each worker (or run one) for complete counts.
+METRICS_ENABLED=0 turns the timers into no-ops.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+try:
+    from flask import current_app, g, has_request_context, request
+except ImportError:  # offline tools import the model wrappers without Flask
+    def has_request_context():
+        return False
+
+ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"
+
+# Seconds; dense below 10 ms where single-row stages live
+DEFAULT_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, help_text, labelnames, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, [list(s[0]), s[1], s[2]]) for labels, s in self._series.items())
+        names = self.labelnames + ("le",)
+        for labels, (counts, total, count) in series:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + (repr(bound),))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(names, labels + ('+Inf',))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total!r}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+def _gauges(prefix, app_name, stats):
+    """(name, labels, value) for the numeric entries of a stats() dict."""
+    for key, value in stats.items():
+        if isinstance(value, bool):
+            value = int(value)
+        if isinstance(value, (int, float)):
+            yield f"{prefix}_{key}", {"app": app_name}, value
+        elif isinstance(value, dict):
+            for sub, sub_value in value.items():
+                if isinstance(sub_value, (int, float)):
+                    yield f"{prefix}_{key}", {"app": app_name, "key": sub}, sub_value
+
+
+class MetricsRegistry:
+    """Every histogram and stats source of the process."""
+
+    def __init__(self):
+        self.stages = Histogram(
+            "ml_stage_seconds",
+            "Time spent in one stage of a request.",
+            ("app", "route", "stage"),
+        )
+        self.requests = Histogram(
+            "ml_request_seconds",
+            "Wall time of whole requests.",
+            ("app", "route", "method", "status"),
+        )
+        self.storage_writes = Histogram(
+            "ml_storage_write_seconds",
+            "Time of one bulk insert by the prediction log writer.",
+            ("table", "outcome"),
+            buckets=DEFAULT_BUCKETS[4:] + (10.0, 30.0),
+        )
+        self._sources = {}
+        self._lock = threading.Lock()
+
+    def add_stats(self, app_name, prefix, stats):
+        """Export stats() (a callable returning a dict) as ml_<prefix>_* gauges."""
+        with self._lock:
+            self._sources[(app_name, prefix)] = stats
+
+    def render(self):
+        lines = []
+        for histogram in (self.stages, self.requests, self.storage_writes):
+            lines += histogram.render()
+
+        gauges = {}
+        with self._lock:
+            sources = sorted(self._sources.items())
+        for (app_name, prefix), stats in sources:
+            try:
+                values = stats()
+            except Exception:
+                continue
+            for name, labels, value in _gauges(f"ml_{prefix}", app_name, values):
+                gauges.setdefault(name, []).append((labels, value))
+        for name, samples in gauges.items():
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(list(labels), list(labels.values()))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+_thread_labels = threading.local()
+
+
+def _request_labels():
+    if has_request_context():
+        return current_app.extensions.get("ml_metrics", "-"), request.endpoint or "-"
+    return getattr(_thread_labels, "value", ("-", "-"))
+
+
+def current_labels():
+    """(app, route) that stage() would label timings with on this thread."""
+    return _request_labels()
+
+
+@contextmanager
+def labelled(labels):
+    """Label stage() timings on this thread with (app, route) from another thread."""
+    previous = getattr(_thread_labels, "value", None)
+    _thread_labels.value = labels
+    try:
+        yield
+    finally:
+        if previous is None:
+            del _thread_labels.value
+        else:
+            _thread_labels.value = previous
+
+
+@contextmanager
+def _timed_stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.stages.observe(elapsed, _request_labels() + (name,))
+
+
+def stage(name):
+    """Context manager timing one stage of the current request."""
+    return _timed_stage(name) if ENABLED else nullcontext()
+
+
+def response(registry=None):
+    """Flask response with the registry in Prometheus text format."""
+    from flask import Response
+
+    return Response((registry or metrics).render(), content_type=CONTENT_TYPE)
+
+
+def instrument(app, app_name, **stats):
+    """
+    Time every request of a Flask app, its template rendering, and add a
+    /metrics route. Keyword arguments are exported as gauges, e.g.
+    prediction_cache=prediction_cache.stats -> ml_prediction_cache_hits.
+    """
+    from flask import before_render_template, template_rendered
+
+    app.extensions["ml_metrics"] = app_name
+    for prefix, source in stats.items():
+        metrics.add_stats(app_name, prefix, source)
+
+    app.add_url_rule("/metrics", "metrics", response)
+    if not ENABLED:
+        return app
+
+    @app.before_request
+    def start_timer():
+        g.ml_request_start = time.perf_counter()
+
+    @app.after_request
+    def record_request(resp):
+        start = g.pop("ml_request_start", None)
+        if start is not None:
+            metrics.requests.observe(
+                time.perf_counter() - start,
+                (app_name, request.endpoint or "-", request.method, str(resp.status_code)),
+            )
+        return resp
+
+    def render_started(sender, **extra):
+        g.ml_render_start = time.perf_counter()
+
+    def render_finished(sender, **extra):
+        start = g.pop("ml_render_start", None)
+        if start is not None:
+            metrics.stages.observe(
+                time.perf_counter() - start, (app_name, request.endpoint or "-", "render")
+            )
+
+    # weak=False: the receivers are local functions with no other reference
+    before_render_template.connect(render_started, app, weak=False)
+    template_rendered.connect(render_finished, app, weak=False)
+    return app
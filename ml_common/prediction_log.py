@@ -0,0 +1,232 @@
+"""
+Background, batched writer for prediction logs.
+
+Request handlers call submit() and return immediately; a daemon thread
+drains an in-memory queue and writes rows with one multi-row insert per
+table. When the backend is unreachable (or the queue is full) rows are
+appended to a local JSONL spill file and replayed once writes succeed
+again. Pending rows are flushed at interpreter shutdown.
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+
+from ml_common.metrics import metrics, stage
+
+
+class PredictionLogWriter:
+    """Queue prediction records and flush them to the database in bulk."""
+
+    def __init__(
+        self,
+        storage,
+        spill_path,
+        batch_size=100,
+        flush_interval=2.0,
+        max_queue=10000,
+        max_spill_bytes=50 * 1024 * 1024,
+        replay_interval=60.0,
+    ):
+        self.storage = storage
+        self.spill_path = spill_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_spill_bytes = max_spill_bytes
+        self.replay_interval = replay_interval
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._spill_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._last_replay = 0.0
+
+        self.written = 0
+        self.spilled = 0
+        self.dropped = 0
+
+        atexit.register(self.close)
+
+    @classmethod
+    def from_env(cls, storage, base_dir):
+        """Build a writer configured by PREDICTION_LOG_* environment variables."""
+        env = os.environ.get
+        return cls(
+            storage,
+            spill_path=env(
+                "PREDICTION_LOG_SPILL",
+                os.path.join(base_dir, "prediction_log.spill.jsonl"),
+            ),
+            batch_size=int(env("PREDICTION_LOG_BATCH", 100)),
+            flush_interval=float(env("PREDICTION_LOG_INTERVAL", 2.0)),
+            max_queue=int(env("PREDICTION_LOG_QUEUE", 10000)),
+        )
+
+    # ── Producer side ─────────────────────────────────────────────────────────
+
+    def submit(self, table, record):
+        """Queue one row for `table`. Never blocks and never raises."""
+        with stage("log"):
+            self._ensure_started()
+            try:
+                self._queue.put_nowait((table, record))
+            except queue.Full:
+                self._spill([(table, record)])
+
+    def submit_many(self, table, records):
+        for record in records:
+            self.submit(table, record)
+
+    # ── Consumer side ─────────────────────────────────────────────────────────
+
+    def _ensure_started(self):
+        # Started lazily and re-started after fork, so the writer is safe to
+        # create in a gunicorn --preload master.
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                # Locks and queue contents were copied from the parent process
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._spill_lock = threading.Lock()
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="prediction-log-writer", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect()
+            if batch:
+                self._write(batch)
+            elif time.monotonic() - self._last_replay >= self.replay_interval:
+                self._replay_spill()
+
+    def _collect(self):
+        """Block until a batch is full or flush_interval has passed."""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0 or self._stop.is_set():
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def _insert(self, items):
+        """Insert (table, record) pairs, one request per table; return failures."""
+        by_table = {}
+        for table, record in items:
+            by_table.setdefault(table, []).append(record)
+
+        failed = []
+        for table, rows in by_table.items():
+            start = time.perf_counter()
+            try:
+                self.storage.insert(table, rows)
+                self.written += len(rows)
+                outcome = "ok"
+            except Exception as db_error:
+                print(f"Database save error ({table}, {len(rows)} rows): {db_error}")
+                failed.extend((table, row) for row in rows)
+                outcome = "error"
+            metrics.storage_writes.observe(time.perf_counter() - start, (table, outcome))
+        return failed
+
+    def _write(self, batch):
+        failed = self._insert(batch)
+        if failed:
+            self._spill(failed)
+        elif os.path.exists(self.spill_path):
+            self._replay_spill()
+
+    # ── Spill file ────────────────────────────────────────────────────────────
+
+    def _spill(self, items):
+        if not items:
+            return
+        with self._spill_lock:
+            try:
+                size = os.path.getsize(self.spill_path) if os.path.exists(self.spill_path) else 0
+                if size >= self.max_spill_bytes:
+                    self.dropped += len(items)
+                    print(f"Prediction log spill file full, dropped {len(items)} rows")
+                    return
+                with open(self.spill_path, "a", encoding="utf-8") as f:
+                    for table, record in items:
+                        f.write(json.dumps({"table": table, "record": record}, default=str) + "\n")
+                self.spilled += len(items)
+            except OSError as e:
+                self.dropped += len(items)
+                print(f"Prediction log spill error: {e}")
+
+    def _replay_spill(self):
+        """Re-send spilled rows; anything that fails again is re-spilled."""
+        self._last_replay = time.monotonic()
+        replay_path = f"{self.spill_path}.{os.getpid()}.replay"
+        with self._spill_lock:
+            if not os.path.exists(self.spill_path):
+                return
+            try:
+                os.replace(self.spill_path, replay_path)
+            except OSError:
+                return
+
+        chunk = []
+        with open(replay_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    chunk.append((entry["table"], entry["record"]))
+                except (ValueError, KeyError):
+                    continue
+                if len(chunk) >= self.batch_size:
+                    self._spill(self._insert(chunk))
+                    chunk = []
+        if chunk:
+            self._spill(self._insert(chunk))
+        os.remove(replay_path)
+
+    # ── Shutdown ──────────────────────────────────────────────────────────────
+
+    def flush(self):
+        """Synchronously write everything queued so far."""
+        batch = self._drain()
+        for start in range(0, len(batch), self.batch_size):
+            self._write(batch[start:start + self.batch_size])
+
+    def close(self, timeout=5.0):
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self.flush()
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "spilled": self.spilled,
+            "dropped": self.dropped,
+        }
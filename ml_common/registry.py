@@ -0,0 +1,196 @@
+"""
+Process-wide model registry.
+
+Apps load their artifacts through registry.load() instead of calling
+pickle/joblib directly. In a standalone app this is just a named cache;
+in the gateway process (gateway.py) all five apps share one registry, so
+every model is loaded exactly once and can be listed in one place.
+
+Converted copies written by `python -m ml_common.artifacts convert` are
+picked up automatically (see ml_common/artifacts.py).
+
+load() also notices when an artifact changed on disk since it was loaded
+and reads the new version; ArtifactWatch tells a reloadable value (see
+ml_common/startup.py) when that has happened, so a retrained model can be
+swapped in without restarting the workers.
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+import time
+
+from .artifacts import load_artifact, resolve
+
+
+def file_signature(path):
+    """(file actually read, mtime, size) for an artifact path, or None if missing."""
+    source, _ = resolve(path)
+    try:
+        st = os.stat(source)
+    except OSError:
+        return None
+    return source, st.st_mtime_ns, st.st_size
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ModelRegistry:
+    """Named, load-once store of model artifacts."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def load(self, name, path, loader):
+        """Return the artifact registered as name, loading it from path once
+        (and again whenever the file has changed since)."""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry["path"] != path or self._changed(entry):
+                start = time.perf_counter()
+                signature = file_signature(path)
+                artifact, source, fmt = load_artifact(path, loader)
+                entry = {
+                    "artifact": artifact,
+                    "path": path,
+                    "source": source,
+                    "format": fmt,
+                    "signature": signature,
+                    "sha256": file_digest(source),
+                    "size_bytes": os.path.getsize(source),
+                    "load_seconds": round(time.perf_counter() - start, 4),
+                    "loaded_at": time.time(),
+                }
+                self._entries[name] = entry
+            return entry["artifact"]
+
+    def _changed(self, entry):
+        signature = file_signature(entry["path"])
+        if signature == entry["signature"]:
+            return False
+        if signature is None:
+            return False  # file removed mid-deploy: keep serving what we have
+        # Touched or rewritten with identical bytes: not a new version
+        if signature[0] == entry["source"] and file_digest(signature[0]) == entry["sha256"]:
+            entry["signature"] = signature
+            return False
+        return True
+
+    def changed(self, names):
+        """True if any of the named artifacts differs from the loaded version."""
+        with self._lock:
+            return any(self._changed(self._entries[name]) for name in names if name in self._entries)
+
+    def signatures(self, names):
+        return [file_signature(self._entries[name]["path"]) for name in names if name in self._entries]
+
+    def snapshot(self, names):
+        with self._lock:
+            return {name: self._entries[name] for name in names if name in self._entries}
+
+    def restore(self, snapshot):
+        """Put back entries taken with snapshot(), e.g. after a reload failed validation."""
+        with self._lock:
+            self._entries.update(snapshot)
+
+    def get(self, name):
+        return self._entries[name]["artifact"]
+
+    def names(self):
+        return sorted(self._entries)
+
+    def describe(self):
+        """JSON-friendly summary of every registered artifact."""
+        summary = {}
+        for name, entry in sorted(self._entries.items()):
+            artifact = entry["artifact"]
+            model = artifact.get("model", artifact) if isinstance(artifact, dict) else artifact
+            summary[name] = {
+                "type": type(model).__name__,
+                "path": os.path.basename(entry["source"]),
+                "format": entry["format"],
+                "size_bytes": entry["size_bytes"],
+                "load_seconds": entry["load_seconds"],
+                "sha256": entry["sha256"][:12],
+            }
+        return summary
+
+
+class ArtifactWatch:
+    """
+    Polls a group of registry entries for a new version on disk.
+
+    poll() is cheap and rate-limited (one stat per artifact every interval
+    seconds). A change is only reported once the files have looked the same
+    on two consecutive polls, so a half-copied file is never loaded, and a
+    version that failed to load is not retried until the files change again.
+    """
+
+    def __init__(self, registry, names, interval):
+        self.registry = registry
+        self.names = list(names)
+        self.interval = interval
+        self._next_check = time.monotonic() + interval
+        self._pending = None
+        self._failed = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, names):
+        """Watch of the shared registry, polled every MODEL_RELOAD_INTERVAL
+        seconds (default 5; 0 disables reloading and returns None)."""
+        interval = float(os.environ.get("MODEL_RELOAD_INTERVAL", 5))
+        if interval <= 0:
+            return None
+        return cls(registry, names, interval)
+
+    def poll(self):
+        """True when a settled new version of the artifacts is waiting to be loaded."""
+        now = time.monotonic()
+        if now < self._next_check or not self._lock.acquire(blocking=False):
+            return False
+        try:
+            self._next_check = now + self.interval
+            if not self.registry.changed(self.names):
+                self._pending = None
+                return False
+            current = self.registry.signatures(self.names)
+            if current != self._pending:
+                self._pending = current
+                return False
+            return current != self._failed
+        finally:
+            self._lock.release()
+
+    def begin(self):
+        """Snapshot the loaded versions before a reload."""
+        return self.registry.snapshot(self.names)
+
+    def failed(self, snapshot):
+        """Roll back to the snapshot and skip this version until it changes."""
+        self._failed = self.registry.signatures(self.names)
+        self.registry.restore(snapshot)
+
+    def describe(self):
+        """Which file versions are loaded, for log lines."""
+        snapshot = self.registry.snapshot(self.names)
+        return ", ".join(
+            f"{os.path.basename(entry['source'])}@{entry['sha256'][:12]}" for entry in snapshot.values()
+        )
+
+
+registry = ModelRegistry()
+
+
+def load_pickle(path):
+    """Loader for plain pickle files (joblib.load works as a loader as-is)."""
+    with open(path, "rb") as f:
+        return pickle.load(f)
@@ -0,0 +1,146 @@
+-- Prediction log tables for the embedded SQLite backend (ml_common/storage.py).
+--
+-- Same table and column names as the Supabase tables the apps write to.
+-- created_at is an ISO-8601 UTC string in one fixed format, so it sorts
+-- chronologically as text; id (the rowid) breaks ties between rows of the
+-- same insert. The (created_at) indexes serve the newest-first keyset pages.
+-- Every statement is idempotent and runs each time a database is opened.
+
+create table if not exists rain_predictions (
+  id integer primary key,
+  created_at text not null default (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  pressure real,
+  dewpoint real,
+  humidity real,
+  cloud real,
+  sunshine real,
+  winddirection real,
+  windspeed real,
+  prediction text,
+  probability real
+);
+create index if not exists rain_predictions_created_at on rain_predictions (created_at);
+
+create table if not exists churn_predictions (
+  id integer primary key,
+  created_at text not null default (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  gender text,
+  senior_citizen integer,
+  partner text,
+  dependents text,
+  tenure integer,
+  phone_service text,
+  multiple_lines text,
+  internet_service text,
+  online_security text,
+  online_backup text,
+  device_protection text,
+  tech_support text,
+  streaming_tv text,
+  streaming_movies text,
+  contract text,
+  paperless_billing text,
+  payment_method text,
+  monthly_charges real,
+  total_charges real,
+  churn_probability real,
+  prediction text,
+  risk_level text
+);
+create index if not exists churn_predictions_created_at on churn_predictions (created_at);
+
+create table if not exists bigmart_predictions (
+  id integer primary key,
+  created_at text not null default (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  item_weight real,
+  item_fat_content text,
+  item_visibility real,
+  item_type text,
+  item_mrp real,
+  outlet_identifier text,
+  outlet_year integer,
+  outlet_size text,
+  outlet_location text,
+  outlet_type text,
+  predicted_sales real
+);
+create index if not exists bigmart_predictions_created_at on bigmart_predictions (created_at);
+
+create table if not exists loan_predictions (
+  id integer primary key,
+  created_at text not null default (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  gender text,
+  married text,
+  dependents integer,
+  education text,
+  self_employed text,
+  applicant_income real,
+  coapplicant_income real,
+  loan_amount real,
+  loan_term real,
+  credit_history real,
+  property_area text,
+  prediction text,
+  confidence real
+);
+create index if not exists loan_predictions_created_at on loan_predictions (created_at);
+
+create table if not exists insurance_predictions (
+  id integer primary key,
+  created_at text not null default (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  age integer,
+  sex text,
+  bmi real,
+  children integer,
+  smoker text,
+  region text,
+  predicted_charges real,
+  risk_level text
+);
+create index if not exists insurance_predictions_created_at on insurance_predictions (created_at);
+
+
+-- Loan dashboard aggregates, kept current by a row trigger
+-- (the SQLite counterpart of Loan_Prediction_SVC/sql/dashboard_stats.sql;
+-- rebuild_loan_dashboard_stats lives in storage.SQLITE_FUNCTIONS)
+
+create table if not exists loan_dashboard_stats (
+  id integer primary key default 1 check (id = 1),
+  total integer not null default 0,
+  approved integer not null default 0,
+  confidence_sum real not null default 0,
+  income_sum real not null default 0,
+  area_urban integer not null default 0,
+  area_semiurban integer not null default 0,
+  area_rural integer not null default 0,
+  edu_graduate integer not null default 0,
+  edu_not_graduate integer not null default 0,
+  good_credit_approved integer not null default 0,
+  good_credit_rejected integer not null default 0,
+  bad_credit_approved integer not null default 0,
+  bad_credit_rejected integer not null default 0,
+  updated_at text not null default (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+insert or ignore into loan_dashboard_stats (id) values (1);
+
+create trigger if not exists loan_dashboard_stats_add
+after insert on loan_predictions
+begin
+  update loan_dashboard_stats set
+    total                = total + 1,
+    approved             = approved + (new.prediction is 'Approved'),
+    confidence_sum       = confidence_sum + coalesce(new.confidence, 0),
+    income_sum           = income_sum + coalesce(new.applicant_income, 0),
+    area_urban           = area_urban + (new.property_area is 'Urban'),
+    area_semiurban       = area_semiurban + (new.property_area is 'Semiurban'),
+    area_rural           = area_rural + (new.property_area is 'Rural'),
+    edu_graduate         = edu_graduate + (new.education is 'Graduate'),
+    edu_not_graduate     = edu_not_graduate + (new.education is 'Not Graduate'),
+    good_credit_approved = good_credit_approved + (new.credit_history is 1 and new.prediction is 'Approved'),
+    good_credit_rejected = good_credit_rejected + (new.credit_history is 1 and new.prediction is 'Rejected'),
+    bad_credit_approved  = bad_credit_approved + (new.credit_history is 0 and new.prediction is 'Approved'),
+    bad_credit_rejected  = bad_credit_rejected + (new.credit_history is 0 and new.prediction is 'Rejected'),
+    updated_at           = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')
+  where id = 1;
+end;
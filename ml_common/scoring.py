@@ -0,0 +1,302 @@
+"""
+Bulk scoring of CSV files, streamed in chunks.
+
+    python -m ml_common.scoring churn customers.csv scored.csv
+    python -m ml_common.scoring bigmart Train.csv scored.csv --chunk-size 20000 --workers 4
+
+The input is read --chunk-size rows at a time with pandas' chunked reader,
+encoded column-wise (the <app>_scoring helpers next to each app.py) and
+scored with one model call per chunk, so memory stays flat however large
+the file is. The output holds the input columns, the app's result columns
+and an `error` column; a row that cannot be scored (missing, unknown or
+non-numeric value) gets a message there and empty results instead of
+failing the run.
+
+Models load the same way the apps load them (load_artifact prefers a
+fresh converted copy), and the decision thresholds come from the same
+environment variables. --workers N scores chunks in N processes, each of
+which loads the model once; results are written in input order.
+"""
+
+import argparse
+import importlib
+import os
+import sys
+import time
+from collections import deque
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_CHUNK_SIZE = 10000
+
+# App name -> (app directory, scoring helper module)
+APPS = {
+    "rainfall": ("RainFall_Prediction", "rainfall_scoring"),
+    "churn": ("Customer_Churn", "churn_scoring"),
+    "bigmart": ("Big_Mart_Sales_Prediction", "bigmart_scoring"),
+    "loan": ("Loan_Prediction_SVC", "loan_scoring"),
+    "insurance": ("Medical_Health_Insurance_Prediction", "insurance_scoring"),
+}
+
+
+def _app_module(app, name):
+    app_dir = os.path.join(ROOT_DIR, APPS[app][0])
+    if app_dir not in sys.path:
+        sys.path.append(app_dir)
+    return importlib.import_module(name)
+
+
+def _load(app, filename, loader):
+    from ml_common.artifacts import load_artifact
+
+    return load_artifact(os.path.join(ROOT_DIR, APPS[app][0], filename), loader)[0]
+
+
+def _rainfall_model():
+    import joblib
+    from ml_common.features import FastModel
+
+    helpers = _app_module("rainfall", "rainfall_scoring")
+    model = _load("rainfall", "rainfall_model.pkl", joblib.load)
+    return FastModel(model, helpers.FEATURES, "rainfall_model.pkl")
+
+
+def _churn_model():
+    from ml_common.features import FastModel
+    from ml_common.registry import load_pickle
+
+    helpers = _app_module("churn", "churn_scoring")
+    model_data = _load("churn", "customer_churn_model.pkl", load_pickle)
+    return FastModel(model_data["model"], helpers.feature_names, "customer_churn_model.pkl")
+
+
+def _bigmart_model():
+    import joblib
+    from ml_common.features import FastModel
+
+    helpers = _app_module("bigmart", "bigmart_scoring")
+    model = _load("bigmart", "best_model.pkl", joblib.load)
+    return FastModel(model, helpers.MODEL_FEATURES, "best_model.pkl")
+
+
+def _loan_model():
+    import joblib
+    from ml_common.features import FastModel
+
+    return FastModel(
+        _load("loan", "loan_model.pkl", joblib.load),
+        _load("loan", "model_columns.pkl", joblib.load),
+        "loan_model.pkl",
+    )
+
+
+def _insurance_model():
+    from ml_common.features import FastModel
+    from ml_common.registry import load_pickle
+
+    model_data = _load("insurance", "insurance_model.pkl", load_pickle)
+    return FastModel(model_data["model"], model_data["feature_names"], "insurance_model.pkl")
+
+
+MODELS = {
+    "rainfall": _rainfall_model,
+    "churn": _churn_model,
+    "bigmart": _bigmart_model,
+    "loan": _loan_model,
+    "insurance": _insurance_model,
+}
+
+
+def load_fast_model(app):
+    """
+    The app's estimator as a FastModel over the same artifacts and column
+    order the app uses (also used by the inference pool's workers).
+    """
+    return MODELS[app]()
+
+
+def _rainfall_scorer():
+    from ml_common.inference import BinaryClassifier
+
+    helpers = _app_module("rainfall", "rainfall_scoring")
+    classifier = BinaryClassifier.from_env(load_fast_model("rainfall"), "RAINFALL_THRESHOLD")
+
+    def predict(X):
+        rain, probability = classifier.predict(X.to_numpy())
+        return {
+            "prediction": [helpers.rain_label(r) for r in rain],
+            "probability": (probability * 100).round(2),
+        }
+
+    return helpers.encode_frame, predict
+
+
+def _churn_scorer():
+    from ml_common.inference import BinaryClassifier
+    from ml_common.registry import load_pickle
+
+    helpers = _app_module("churn", "churn_scoring")
+    category_encoding = _app_module("churn", "category_encoding")
+    classifier = BinaryClassifier.from_env(load_fast_model("churn"), "CHURN_THRESHOLD")
+    encoder = category_encoding.CategoryEncoder(_load("churn", "encoders.pkl", load_pickle))
+
+    def predict(X):
+        churn, probability = classifier.predict(X.to_numpy())
+        percent = (probability * 100).round(2)
+        return {
+            "prediction": [helpers.churn_label(c) for c in churn],
+            "churn_probability": percent,
+            "risk_level": [helpers.risk_level(p) for p in percent],
+        }
+
+    return (lambda frame: helpers.encode_frame(frame, encoder)), predict
+
+
+def _bigmart_scorer():
+    helpers = _app_module("bigmart", "bigmart_scoring")
+    model = load_fast_model("bigmart")
+
+    def predict(X):
+        return {"predicted_sales": model.predict(X.to_numpy()).round(2)}
+
+    return helpers.encode_frame, predict
+
+
+def _loan_scorer():
+    import numpy as np
+    from ml_common.inference import BinaryClassifier
+
+    helpers = _app_module("loan", "loan_scoring")
+    model = load_fast_model("loan")
+    classifier = BinaryClassifier.from_env(model, "LOAN_APPROVAL_THRESHOLD")
+
+    def predict(X):
+        approved, probability = classifier.predict(X[model.vector.columns].to_numpy())
+        confidence = np.where(approved, probability, 1 - probability)
+        return {
+            "prediction": np.where(approved, "Approved", "Rejected"),
+            "confidence": (confidence * 100).round(1),
+        }
+
+    return helpers.encode_frame, predict
+
+
+def _insurance_scorer():
+    helpers = _app_module("insurance", "insurance_scoring")
+    model = load_fast_model("insurance")
+
+    def predict(X):
+        charges = model.predict(X[model.vector.columns].to_numpy()).round(2)
+        return {
+            "predicted_charges": charges,
+            "risk_level": [helpers.risk_level(c) for c in charges],
+        }
+
+    return helpers.encode_frame, predict
+
+
+# App name -> builder of (encode_frame, predict) and the columns predict adds
+SCORERS = {
+    "rainfall": (_rainfall_scorer, ["prediction", "probability"]),
+    "churn": (_churn_scorer, ["prediction", "churn_probability", "risk_level"]),
+    "bigmart": (_bigmart_scorer, ["predicted_sales"]),
+    "loan": (_loan_scorer, ["prediction", "confidence"]),
+    "insurance": (_insurance_scorer, ["predicted_charges", "risk_level"]),
+}
+
+
+class ChunkScorer:
+    """Scores one input chunk into an output chunk for one app."""
+
+    def __init__(self, app):
+        build, self.result_columns = SCORERS[app]
+        self.encode, self.predict = build()
+
+    def __call__(self, chunk):
+        import pandas as pd
+
+        chunk.columns = chunk.columns.str.strip()
+        X, errors = self.encode(chunk)
+        ok = (errors == "").to_numpy()
+        # Rows with errors are left out of the model call (and get no results)
+        results = self.predict(X[ok]) if ok.any() else {}
+
+        out = chunk.copy()
+        for name in self.result_columns:
+            values = list(results.get(name, []))
+            out[name] = pd.Series(values, index=chunk.index[ok], dtype=object)
+        out["error"] = errors
+        return out
+
+
+# ProcessPoolExecutor workers build their scorer once, in the initializer
+_worker_scorer = None
+
+
+def _init_worker(app):
+    global _worker_scorer
+    _worker_scorer = ChunkScorer(app)
+
+
+def _score_in_worker(chunk):
+    return _worker_scorer(chunk)
+
+
+def score_file(app, input_path, output_path, chunk_size=DEFAULT_CHUNK_SIZE, workers=0):
+    """Score input_path into output_path; returns (rows, error rows, seconds)."""
+    import pandas as pd
+
+    start = time.perf_counter()
+    reader = pd.read_csv(input_path, chunksize=chunk_size, dtype=str, keep_default_na=False)
+    totals = {"rows": 0, "errors": 0, "header": True}
+
+    def write(out):
+        out.to_csv(output_path, mode="w" if totals["header"] else "a",
+                   header=totals["header"], index=False)
+        totals["header"] = False
+        totals["rows"] += len(out)
+        totals["errors"] += int((out["error"] != "").sum())
+
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(app,)) as pool:
+            # At most two chunks per worker in flight, written in input order
+            pending = deque()
+            for chunk in reader:
+                pending.append(pool.submit(_score_in_worker, chunk))
+                if len(pending) >= 2 * workers:
+                    write(pending.popleft().result())
+            while pending:
+                write(pending.popleft().result())
+    else:
+        scorer = ChunkScorer(app)
+        for chunk in reader:
+            write(scorer(chunk))
+
+    if totals["header"]:  # no rows at all
+        open(output_path, "w").close()
+    return totals["rows"], totals["errors"], time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a CSV file with one of the app models.")
+    parser.add_argument("app", choices=sorted(APPS))
+    parser.add_argument("input", help="CSV with the app's training columns")
+    parser.add_argument("output", help="CSV to write (input columns + results + error)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"rows read and scored at a time (default {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="score chunks in this many processes (default: in process)")
+    args = parser.parse_args()
+
+    rows, errors, elapsed = score_file(
+        args.app, args.input, args.output, args.chunk_size, args.workers
+    )
+    rate = rows / elapsed if elapsed else 0
+    print(f"Scored {rows} rows ({errors} with errors) in {elapsed:.2f}s, {rate:,.0f} rows/s")
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Deferred loading of heavy app state, and a startup timing report.
+
+An app wraps its expensive setup (pandas/xgboost imports, unpickling the
+model, opening the storage client) in Deferred values instead of doing
+it at import time, so Flask starts serving static pages right away. How
+the deferred values get built is controlled by STARTUP_MODE:
+
+    background  (default) a daemon thread builds them right after boot
+    lazy        each one is built by the first request that needs it
+    eager       built synchronously before the app module finishes
+                importing (what gateway.py uses, so gunicorn --preload
+                shares the loaded models between workers)
+
+Each phase is timed and one summary line is printed once every deferred
+value has loaded (in any mode), e.g.
+
+    [startup] rainfall: import 0.412s, unpickle 0.031s, client init 0.188s; ready 0.655s after boot
+
+A deferred model can also be given an ArtifactWatch (ml_common/registry.py):
+once it has loaded, get() polls the watch and, when a new artifact version
+lands on disk, rebuilds the value in a background thread. If the factory
+succeeds (including its feature-name checks) the new value replaces the
+old one in a single assignment and the on_reload callbacks run; requests
+that already hold the old value finish with it. If it fails the old value
+stays in service.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+STARTUP_MODES = ("background", "lazy", "eager")
+
+
+class Deferred:
+    """A value built once by factory(), on first use or by Startup.warm().
+
+    Attribute access is forwarded to the built value, so a Deferred can
+    stand in for a client or model object (client.table(...) works as
+    before). Use get() where the value itself is needed, e.g. to iterate
+    over it or to pass it to code that checks its type.
+    """
+
+    def __init__(self, name, factory, on_ready=None, watch=None, on_reload=()):
+        self.name = name
+        self._factory = factory
+        self._on_ready = on_ready
+        self._watch = watch
+        self._on_reload = list(on_reload)
+        self._value = None
+        self._ready = False
+        self._reloading = False
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    @property
+    def ready(self):
+        return self._ready
+
+    def get(self):
+        if self._ready:
+            if self._watch is not None and not self._reloading and self._watch.poll():
+                self._start_reload()
+            return self._value
+        if self._pid != os.getpid():
+            # Forked mid-build: the parent's lock may be held by a thread
+            # that does not exist in this process.
+            self._lock = threading.Lock()
+            self._pid = os.getpid()
+        with self._lock:
+            if self._ready:
+                return self._value
+            self._value = self._factory()
+            self._ready = True
+        if self._on_ready is not None:
+            self._on_ready()
+        return self._value
+
+    def _start_reload(self):
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+        threading.Thread(target=self._reload, name=f"{self.name}-reload", daemon=True).start()
+
+    def _reload(self):
+        snapshot = self._watch.begin()
+        start = time.perf_counter()
+        try:
+            value = self._factory()
+        except Exception as e:
+            self._watch.failed(snapshot)
+            print(f"[reload] {self.name}: new version rejected, keeping the current one: {e}")
+        else:
+            self._value = value
+            self.reloads += 1
+            for callback in self._on_reload:
+                callback()
+            print(
+                f"[reload] {self.name}: swapped in {self._watch.describe()} "
+                f"in {time.perf_counter() - start:.3f}s"
+            )
+        finally:
+            self._reloading = False
+
+    def __getattr__(self, attr):
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self.get(), attr)
+
+
+class Startup:
+    """Per-app registry of deferred values plus phase timings."""
+
+    def __init__(self, app_name, mode=None):
+        self.app_name = app_name
+        self.mode = (mode or os.environ.get("STARTUP_MODE", "background")).lower()
+        if self.mode not in STARTUP_MODES:
+            raise ValueError(f"STARTUP_MODE must be one of {', '.join(STARTUP_MODES)}")
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.deferred = []
+        self._lock = threading.Lock()
+        self._reported = False
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block and add it to the named phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def defer(self, name, factory, watch=None, on_reload=()):
+        value = Deferred(name, factory, on_ready=self._loaded, watch=watch, on_reload=on_reload)
+        self.deferred.append(value)
+        return value
+
+    def _loaded(self):
+        if self.ready:
+            self.report()
+
+    def load_all(self):
+        """Build every deferred value in registration order."""
+        for value in self.deferred:
+            try:
+                value.get()
+            except Exception as e:
+                print(f"[startup] {self.app_name}: loading {value.name} failed: {e}")
+                if self.mode == "eager":
+                    raise
+                return
+
+    def warm(self):
+        """Start loading according to STARTUP_MODE; call once at the end of the app module."""
+        if self.mode == "eager":
+            self.load_all()
+        elif self.mode == "background":
+            threading.Thread(target=self.load_all, name=f"{self.app_name}-startup", daemon=True).start()
+
+    @property
+    def ready(self):
+        return all(value.ready for value in self.deferred)
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "ready": self.ready,
+            "phases": {name: round(seconds, 4) for name, seconds in self.phases.items()},
+        }
+
+    def report(self):
+        with self._lock:
+            if self._reported:
+                return
+            self._reported = True
+            phases = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in self.phases.items())
+        ready_after = time.perf_counter() - self.started
+        print(f"[startup] {self.app_name}: {phases or 'nothing deferred'}; ready {ready_after:.3f}s after boot")
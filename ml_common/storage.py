@@ -0,0 +1,259 @@
+"""
+Storage backends for the prediction log tables.
+
+The apps touch their database through four operations only:
+
+    insert(table, rows)                   one multi-row insert
+    page(table, columns, after, limit)    rows newest first on (created_at, id),
+                                          strictly older than the after key
+    fetch(table, row_id)                  one row by id, or None
+    call(function, params)                a server-side function, e.g. a rebuild
+
+(Not get(): the apps hold storage through a startup Deferred, whose own
+get() returns the storage object itself.)
+
+STORAGE_BACKEND picks the implementation behind them:
+
+    supabase  (default) the hosted Postgres tables, through the shared
+              client for SUPABASE_URL / SUPABASE_KEY (ml_common/db.py)
+    sqlite    an embedded SQLite database in WAL mode at SQLITE_PATH
+              (default predictions.sqlite3 in the repository root), with
+              the same table names (schema.sqlite.sql). Writes are local
+              disk commits instead of WAN round trips, and the apps run,
+              load-test and benchmark without network access.
+
+Gunicorn workers and the gateway can share one SQLite file: WAL lets
+readers run alongside the single writer, and a busy writer is waited on
+(SQLITE_BUSY_TIMEOUT ms) rather than failing the insert.
+"""
+
+import functools
+import os
+import sqlite3
+import threading
+
+from ml_common.history import parse_timestamp
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema.sqlite.sql")
+
+STORAGE_BACKENDS = ("supabase", "sqlite")
+
+
+class SupabaseStorage:
+    """Storage over a supabase-py client (PostgREST)."""
+
+    backend = "supabase"
+
+    def __init__(self, client):
+        self.client = client
+
+    def insert(self, table, rows):
+        self.client.table(table).insert(rows).execute()
+
+    def page(self, table, columns, after=None, limit=50):
+        query = self.client.table(table).select(columns)
+        if after is not None:
+            # Re-serialized, so no text from a client cursor reaches the filter
+            created_at = parse_timestamp(after[0]).isoformat()
+            row_id = int(after[1])
+            query = query.or_(
+                f'created_at.lt."{created_at}",'
+                f'and(created_at.eq."{created_at}",id.lt.{row_id})'
+            )
+        return (
+            query.order("created_at", desc=True)
+            .order("id", desc=True)
+            .limit(limit)
+            .execute()
+            .data
+        )
+
+    def fetch(self, table, row_id):
+        response = self.client.table(table).select("*").eq("id", row_id).limit(1).execute()
+        return response.data[0] if response.data else None
+
+    def call(self, function, params=None):
+        return self.client.rpc(function, params or {}).execute().data
+
+
+# Server-side functions the apps call(), as single SQLite statements
+SQLITE_FUNCTIONS = {
+    # Loan_Prediction_SVC/sql/dashboard_stats.sql: rebuild_loan_dashboard_stats()
+    "rebuild_loan_dashboard_stats": """
+        update loan_dashboard_stats set (
+            total, approved, confidence_sum, income_sum,
+            area_urban, area_semiurban, area_rural,
+            edu_graduate, edu_not_graduate,
+            good_credit_approved, good_credit_rejected,
+            bad_credit_approved, bad_credit_rejected,
+            updated_at
+        ) = (
+            select
+                count(*),
+                coalesce(sum(prediction is 'Approved'), 0),
+                coalesce(sum(confidence), 0),
+                coalesce(sum(applicant_income), 0),
+                coalesce(sum(property_area is 'Urban'), 0),
+                coalesce(sum(property_area is 'Semiurban'), 0),
+                coalesce(sum(property_area is 'Rural'), 0),
+                coalesce(sum(education is 'Graduate'), 0),
+                coalesce(sum(education is 'Not Graduate'), 0),
+                coalesce(sum(credit_history is 1 and prediction is 'Approved'), 0),
+                coalesce(sum(credit_history is 1 and prediction is 'Rejected'), 0),
+                coalesce(sum(credit_history is 0 and prediction is 'Approved'), 0),
+                coalesce(sum(credit_history is 0 and prediction is 'Rejected'), 0),
+                strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')
+            from loan_predictions
+        )
+        where id = 1
+    """,
+}
+
+
+class SQLiteStorage:
+    """Storage in an embedded SQLite database file, one connection per thread."""
+
+    backend = "sqlite"
+
+    def __init__(self, path, busy_timeout=5000):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._pid = os.getpid()
+        self._columns = {}
+
+        conn = self._connect()
+        with open(SCHEMA_PATH, encoding="utf-8") as f:
+            conn.executescript(f.read())
+        self._load_columns(conn)
+
+    @classmethod
+    def from_env(cls):
+        return cls(*_sqlite_settings())
+
+    def _connect(self):
+        # isolation_level=None: transactions are opened explicitly below
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout / 1000, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("pragma journal_mode = wal")
+        # Durable at every checkpoint, not every commit; a crash can lose
+        # the last few log rows but never corrupts the file
+        conn.execute("pragma synchronous = normal")
+        conn.execute(f"pragma busy_timeout = {int(self.busy_timeout)}")
+        self._local.conn = conn
+        return conn
+
+    @property
+    def conn(self):
+        if self._pid != os.getpid():
+            # Connections must not cross a fork; each worker opens its own
+            self._local = threading.local()
+            self._pid = os.getpid()
+        conn = getattr(self._local, "conn", None)
+        return conn if conn is not None else self._connect()
+
+    def _load_columns(self, conn):
+        tables = conn.execute("select name from sqlite_master where type = 'table'").fetchall()
+        for (table,) in tables:
+            info = conn.execute(f'pragma table_info("{table}")').fetchall()
+            self._columns[table] = [row["name"] for row in info]
+
+    def _checked(self, table, columns):
+        """Quoted identifiers for columns of table; ValueError for unknown names."""
+        if table not in self._columns:
+            raise ValueError(f"Unknown table: {table}")
+        known = self._columns[table]
+        unknown = [c for c in columns if c not in known]
+        if unknown:
+            raise ValueError(f"Unknown column(s) for {table}: {', '.join(unknown)}")
+        return ", ".join(f'"{c}"' for c in columns)
+
+    def insert(self, table, rows):
+        if not rows:
+            return
+        # Rows with the same keys share one prepared statement
+        by_keys = {}
+        for row in rows:
+            by_keys.setdefault(tuple(row), []).append(row)
+
+        conn = self.conn
+        conn.execute("begin immediate")
+        try:
+            for keys, group in by_keys.items():
+                names = self._checked(table, keys)
+                placeholders = ", ".join("?" for _ in keys)
+                conn.executemany(
+                    f'insert into "{table}" ({names}) values ({placeholders})',
+                    [tuple(row[k] for k in keys) for row in group],
+                )
+        except BaseException:
+            conn.execute("rollback")
+            raise
+        conn.execute("commit")
+
+    def page(self, table, columns, after=None, limit=50):
+        names = [c.strip() for c in columns.split(",") if c.strip()]
+        select = "*" if names == ["*"] else self._checked(table, names)
+        sql = f'select {select} from "{table}"'
+        params = []
+        if after is not None:
+            created_at, row_id = after
+            sql += " where created_at < ? or (created_at = ? and id < ?)"
+            params += [created_at, created_at, row_id]
+        sql += " order by created_at desc, id desc limit ?"
+        params.append(int(limit))
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def fetch(self, table, row_id):
+        self._checked(table, [])
+        row = self.conn.execute(f'select * from "{table}" where id = ?', (row_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def call(self, function, params=None):
+        if function not in SQLITE_FUNCTIONS:
+            raise ValueError(f"Unknown function: {function}")
+        conn = self.conn
+        # begin immediate blocks other writers for the duration, like the
+        # share lock in the Postgres version
+        conn.execute("begin immediate")
+        try:
+            conn.execute(SQLITE_FUNCTIONS[function], params or {})
+        except BaseException:
+            conn.execute("rollback")
+            raise
+        conn.execute("commit")
+        return None
+
+
+def _sqlite_settings():
+    env = os.environ.get
+    return (
+        env("SQLITE_PATH", os.path.join(ROOT_DIR, "predictions.sqlite3")),
+        int(env("SQLITE_BUSY_TIMEOUT", 5000)),
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _sqlite_storage(path, busy_timeout):
+    return SQLiteStorage(path, busy_timeout)
+
+
+def storage_backend():
+    """Name of the backend selected by STORAGE_BACKEND."""
+    backend = os.environ.get("STORAGE_BACKEND", "supabase").lower()
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"STORAGE_BACKEND must be one of {', '.join(STORAGE_BACKENDS)}")
+    return backend
+
+
+def open_storage(url=None, key=None):
+    """
+    The storage backend selected by STORAGE_BACKEND. Apps hosted in one
+    process share it (one Supabase client, or one SQLiteStorage per file).
+    """
+    if storage_backend() == "sqlite":
+        return _sqlite_storage(*_sqlite_settings())
+    from ml_common.db import supabase_client
+
+    return SupabaseStorage(supabase_client(url, key))
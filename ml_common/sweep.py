@@ -0,0 +1,76 @@
+"""
+Parameter sweeps for the simulator APIs.
+
+A sweep request is a base scenario plus one or two axes. Each axis names
+an input field and either lists its values explicitly or gives a numeric
+range:
+
+    {"field": "loan_amount", "values": [100, 150, 200]}
+    {"field": "bmi", "start": 18, "stop": 40, "steps": 23}
+
+The grid is expanded in row-major order so the whole surface can be
+scored in one model call and reshaped back to axis order.
+"""
+
+import itertools
+import math
+
+MAX_AXES = 2
+MAX_STEPS = 200
+
+
+def parse_axes(axes, fields, max_points=2500):
+    """Validate axis specs against the allowed fields; return [(field, values)]."""
+    if not isinstance(axes, list) or not 1 <= len(axes) <= MAX_AXES:
+        raise ValueError(f"'axes' must be a list of 1 to {MAX_AXES} axis objects")
+
+    parsed = []
+    for axis in axes:
+        if not isinstance(axis, dict):
+            raise ValueError("Each axis must be an object")
+        field = axis.get("field")
+        if field not in fields:
+            raise ValueError(f"Unknown sweep field: {field!r}. Valid fields: {list(fields)}")
+        if any(field == f for f, _ in parsed):
+            raise ValueError(f"Field {field!r} is swept twice")
+
+        if "values" in axis:
+            values = axis["values"]
+            if not isinstance(values, list) or not values:
+                raise ValueError(f"'values' for {field} must be a non-empty list")
+        else:
+            start, stop = float(axis["start"]), float(axis["stop"])
+            steps = int(axis.get("steps", 20))
+            if not 2 <= steps <= MAX_STEPS:
+                raise ValueError(f"'steps' for {field} must be between 2 and {MAX_STEPS}")
+            values = [
+                round(start + (stop - start) * i / (steps - 1), 6) for i in range(steps)
+            ]
+        parsed.append((field, values))
+
+    points = math.prod(len(values) for _, values in parsed)
+    if points > max_points:
+        raise ValueError(f"Sweep has {points} points (max {max_points})")
+    return parsed
+
+
+def expand(base, axes):
+    """Scenario dicts for every grid point, row-major over the axes."""
+    fields = [field for field, _ in axes]
+    return [
+        dict(base, **dict(zip(fields, combo)))
+        for combo in itertools.product(*(values for _, values in axes))
+    ]
+
+
+def reshape(flat, axes):
+    """Turn a flat row-major result list back into a 1-D or 2-D grid."""
+    flat = list(flat)
+    if len(axes) == 1:
+        return flat
+    width = len(axes[1][1])
+    return [flat[i:i + width] for i in range(0, len(flat), width)]
+
+
+def describe(axes):
+    return [{"field": field, "values": values} for field, values in axes]